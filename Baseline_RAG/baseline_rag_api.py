@@ -1,10 +1,13 @@
 import json
 import requests
 import os
+import sys
 import csv
 from collections import defaultdict
 from sentence_transformers import SentenceTransformer
 from pymilvus import connections, Collection
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.text_retrieval import search_question, format_hit
 
 
 # ========== 參數設定 ==========
@@ -47,20 +50,11 @@ print(f"✅ Collection {MILVUS_COLLECTION} 已載入")
 # ========== 工具函式 ==========
 # 在指定的 Milvus collection 裡檢索相似向量。
 def search_milvus(query_text, top_k=5):
-    """將 query 向量化，並在 Milvus 檢索最相似的片段"""
+    """將 query 向量化，並在 Milvus 檢索最相似的片段（依意圖路由 partition，問題指名實體時只在該實體的三元組內檢索）"""
     q_emb = embedder.encode(query_text).tolist()
-    search_res = collection.search(
-        data=[q_emb],
-        anns_field="embedding", # 搜尋的基礎是 embedding 欄位。
-        param={"metric_type": "IP", "nprobe": 10}, 
-        limit=top_k,
-        output_fields=["source_name", "relation_type", "target_name"]
-    )
+    hits = search_question(collection, query_text, q_emb, top_k=top_k)
     # 把原本三個分開的欄位 → 合併成一段文字，提供給 LLM 當 context。
-    hits = [f"{hit.entity.get('source_name')} {hit.entity.get('relation_type')} {hit.entity.get('target_name')}"  # 指定要取出的欄位。
-        for hit in search_res[0]]
-
-    return hits # 回傳檢索到的文字片段清單
+    return [format_hit(hit) for hit in hits]
 
 def ask_llm(query_text, context, model=LLM_MODEL):
     """用 requests 呼叫 Ollama API"""
@@ -1,9 +1,16 @@
 import os
 import json
+from collections import Counter
 from sentence_transformers import SentenceTransformer
 from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType, utility
 from backend.neo4j_connect import Neo4jConnection
 from backend.milvus_connection import connect_milvus, create_collection
+from backend.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.side_table import write_side_table
+
+EMBED_MODEL = "all-mpnet-base-v2"
+ENCODE_BATCH_SIZE = 256     # SentenceTransformer 每批句數
+INSERT_BATCH_SIZE = 2000    # 每次寫入 Milvus / JSON 的筆數
 
 # === Step 1: 建立 Milvus Collection ===
 def create_collection(name="collection_multi_hop", dim=768):
@@ -22,41 +29,67 @@ def create_collection(name="collection_multi_hop", dim=768):
     collection = Collection(name, schema)
     return collection
 
-# === Step 2: 從 Neo4j 抽取 multi-hop 子圖 ===
-def extract_multi_hop(entity_name: str, conn: Neo4jConnection, limit=200):
-    query = f"""
-    MATCH (d:disease)<-[:indication]-(drug:drug)-[:drug_protein]-(g:gene__protein)
-    WHERE d.node_name CONTAINS "{entity_name}"
-    RETURN d.node_name AS disease, drug.node_name AS drug, g.node_name AS gene
-    LIMIT {limit}
+# === Step 2: 從 Neo4j 一次抽取所有 query entity 的 multi-hop 子圖 ===
+def extract_multi_hop(entity_names, conn: Neo4jConnection, limit=200):
+    """以單一參數化 UNWIND 查詢取回所有 entity 的 Disease→Drug→Gene 路徑（每個 entity 最多 limit 筆）"""
+    query = """
+    UNWIND $entities AS entity
+    CALL {
+        WITH entity
+        MATCH (d:disease)<-[:indication]-(drug:drug)-[:drug_protein]-(g:gene__protein)
+        WHERE d.node_name CONTAINS entity
+        RETURN d.node_name AS disease, drug.node_name AS drug, g.node_name AS gene
+        LIMIT $limit
+    }
+    RETURN entity, disease, drug, gene
     """
-    return conn.query(query)
-
-# === Step 3: 插入 Milvus ===
-def insert_embeddings(data, model, collection, entity_name, json_rows):
-    rows = []
-    for record in data:
-        disease = record["disease"]
-        drug = record["drug"]
-        gene = record["gene"]
-
-        path_text = f"{disease} treated_by {drug} targets {gene}"
-        emb = model.encode(path_text).tolist()
-
-        row = {
-            "query_entity": disease,
-            "drug_name": drug,
-            "target_gene": gene,
-            "path_text": path_text,
-            "embedding": emb
-        }
-        rows.append(row)
-        json_rows.append(row)  # 也存到 JSON
-
-    if rows:
-        collection.insert(rows)
-        collection.flush()
-    return len(rows)
+    return conn.query(query, {"entities": list(entity_names), "limit": limit})
+
+SIDE_TABLE_FIELDS = ["query_entity", "drug_name", "target_gene"]
+
+# === Step 3: 去重 → 批次向量化 → 分批插入 Milvus，同時串流寫出 JSON 備份與 side table ===
+def insert_embeddings(records, model, collection, json_file, batch_size=INSERT_BATCH_SIZE):
+    seen = set()
+    unique_paths = []
+    for record in records:
+        key = (record["disease"], record["drug"], record["gene"])
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_paths.append(key)
+    print(f"🧹 共 {len(records)} 條路徑，去重後 {len(unique_paths)} 條")
+
+    ids = []
+    json_file.write("[\n")
+    for i in range(0, len(unique_paths), batch_size):
+        chunk = unique_paths[i:i+batch_size]
+        path_texts = [f"{disease} treated_by {drug} targets {gene}" for disease, drug, gene in chunk]
+        embeddings = encode_with_cache(model, path_texts, EMBED_MODEL, batch_size=ENCODE_BATCH_SIZE)
+
+        rows = [
+            {
+                "query_entity": disease,
+                "drug_name": drug,
+                "target_gene": gene,
+                "path_text": path_text,
+                "embedding": emb.tolist()
+            }
+            for (disease, drug, gene), path_text, emb in zip(chunk, path_texts, embeddings)
+        ]
+        ids.extend(collection.insert(rows).primary_keys)
+
+        for j, row in enumerate(rows):
+            if i + j > 0:
+                json_file.write(",\n")
+            json_file.write(json.dumps(row, ensure_ascii=False))
+        print(f"   → 已插入 {i + len(rows)} / {len(unique_paths)} 筆")
+    json_file.write("\n]\n")
+
+    collection.flush()
+    write_side_table(collection.name, ids, {
+        field: [path[j] for path in unique_paths] for j, field in enumerate(SIDE_TABLE_FIELDS)
+    })
+    return len(unique_paths)
 
 # === Main ===
 if __name__ == "__main__":
@@ -67,27 +100,27 @@ if __name__ == "__main__":
     # 連線 Neo4j & Milvus
     conn = Neo4jConnection()
     connect_milvus()
-    model = SentenceTransformer("all-mpnet-base-v2")
+    model = SentenceTransformer(EMBED_MODEL)
 
     collection_name = "collection_multi_hop"
     collection = create_collection(name=collection_name)
     print(f"✅ 建立新的 Milvus collection: {collection_name}")
 
-    total_inserted = 0
-    all_json_rows = []
-
-    for q in queries:
-        entity = q["question"].replace("治療", "").replace("的藥物作用於哪些基因？", "").strip() # e.g. "治療 mental disorder ..." → 取 disease
-        print(f"🔍 抽取 multi-hop 子圖 for entity: {entity}")
-        data = extract_multi_hop(entity, conn)
-        inserted = insert_embeddings(data, model, collection, entity, all_json_rows)
-        print(f"   → 插入 {inserted} 筆")
-        total_inserted += inserted
+    # e.g. "治療 mental disorder 的藥物作用於哪些基因？" → 取 disease
+    entities = list(dict.fromkeys(
+        q["question"].replace("治療", "").replace("的藥物作用於哪些基因？", "").strip() for q in queries
+    ))
+    print(f"🔍 一次抽取 {len(entities)} 個 entity 的 multi-hop 子圖")
+    records = extract_multi_hop(entities, conn)
+    for entity, count in Counter(r["entity"] for r in records).items():
+        print(f"   {entity} → {count} 條路徑")
 
-    # === 存 JSON 備份 ===
+    # === 存 JSON 備份（邊插入邊寫出，不在記憶體中保留全部 rows）===
     output_path = "data/collection_multi_hop.json"
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_json_rows, f, ensure_ascii=False, indent=2)
+        total_inserted = insert_embeddings(records, model, collection, f)
     print(f"💾 已輸出 JSON 備份到 {output_path}")
 
+    conn.close()
     print(f"🎯 總共寫入 {total_inserted} 筆到 {collection_name}")
+    get_embedding_cache(EMBED_MODEL).report()
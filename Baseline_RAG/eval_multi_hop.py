@@ -1,7 +1,12 @@
 import json
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from sklearn.metrics import precision_score, recall_score, f1_score
 from sentence_transformers import SentenceTransformer
 from pymilvus import connections, Collection
+from backend.search_registry import get_search_param
+from backend.side_table import resolve_fields
 
 # === 連線 Milvus ===
 def load_collection(name="collection_multi_hop"):
@@ -14,13 +19,13 @@ def retrieve_genes(collection, query_text, model, top_k=50):
     results = collection.search(
         data=[query_emb],
         anns_field="embedding",
-        param={"metric_type": "COSINE", "params": {"nprobe": 10}},
+        param=get_search_param(collection),
         limit=top_k,
-        output_fields=["target_gene"]
+        output_fields=[]
     )
-    # 取出基因名稱
-    hits = results[0]
-    return [hit.entity.get("target_gene") for hit in hits]
+    # 只取回 primary key，基因名稱由本地 side table 解析
+    ids = [hit.id for hit in results[0]]
+    return [row["target_gene"] for row in resolve_fields(collection, ids, ["target_gene"]) if row is not None]
 
 # === 計算 Precision / Recall / F1 ===
 def compute_metrics(preds, golds):
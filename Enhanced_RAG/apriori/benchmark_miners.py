@@ -0,0 +1,119 @@
+# Enhanced_RAG/apriori/benchmark_miners.py
+# 比較 mlxtend（TransactionEncoder + apriori + association_rules）與 eclat_miner 的耗時、峰值記憶體與規則是否一致
+#   python Enhanced_RAG/apriori/benchmark_miners.py
+#   python Enhanced_RAG/apriori/benchmark_miners.py --triples data/neo4j_triples.json --relation disease_protein
+#   python Enhanced_RAG/apriori/benchmark_miners.py --synthetic-items 5000 --synthetic-transactions 20000
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from apriori.eclat_miner import mine_rules
+
+REPORT_PATH = "results/miner_benchmark.json"
+ENTITY_ATTR_PATH = "data/entity_attributes.csv"
+
+
+def mlxtend_rules(transactions=None, onehot=None, min_support=0.01, min_confidence=0.8, max_len=None):
+    from mlxtend.preprocessing import TransactionEncoder
+    from mlxtend.frequent_patterns import apriori, association_rules
+    if onehot is None:
+        encoder = TransactionEncoder()
+        onehot = pd.DataFrame(encoder.fit(transactions).transform(transactions), columns=encoder.columns_)
+    frequent = apriori(onehot.astype(bool), min_support=min_support, use_colnames=True, max_len=max_len)
+    if frequent.empty:
+        return pd.DataFrame(columns=["antecedents", "consequents", "support", "confidence"])
+    return association_rules(frequent, metric="confidence", min_threshold=min_confidence)
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def rule_keys(rules):
+    return {(frozenset(a), frozenset(c), round(float(conf), 6))
+            for a, c, conf in zip(rules["antecedents"], rules["consequents"], rules["confidence"])}
+
+
+def run_workload(name, kwargs, min_support, min_confidence, max_len, single, with_mlxtend):
+    print(f"\n📊 {name}")
+    limits = {"max_antecedent_len": 1, "max_consequent_len": 1} if single else {}
+    eclat, eclat_seconds, eclat_peak = measure(lambda: mine_rules(
+        min_support=min_support, min_confidence=min_confidence, max_len=max_len, **limits, **kwargs))
+    print(f"   eclat  : {len(eclat)} 條規則，{eclat_seconds:.3f} 秒，峰值 {eclat_peak / 1e6:.1f} MB")
+    result = {"workload": name, "eclat": {"rules": len(eclat), "seconds": eclat_seconds, "peak_bytes": eclat_peak}}
+
+    if with_mlxtend:
+        reference, seconds, peak = measure(lambda: mlxtend_rules(
+            min_support=min_support, min_confidence=min_confidence, max_len=max_len, **kwargs))
+        if single:
+            reference = reference[(reference["antecedents"].apply(len) == 1) & (reference["consequents"].apply(len) == 1)]
+        same = rule_keys(reference) == rule_keys(eclat)
+        print(f"   mlxtend: {len(reference)} 條規則，{seconds:.3f} 秒，峰值 {peak / 1e6:.1f} MB")
+        print(f"   規則一致：{'✅' if same else '❌'}，加速 {seconds / max(eclat_seconds, 1e-9):.1f}x")
+        result["mlxtend"] = {"rules": len(reference), "seconds": seconds, "peak_bytes": peak}
+        result["same_rules"] = same
+    return result
+
+
+def synthetic_transactions(n_items, n_transactions, avg_len, seed=42):
+    """長尾分佈的稀疏 transaction（模擬數千個基因當 item）"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_items + 1)
+    weights /= weights.sum()
+    lengths = np.maximum(rng.poisson(avg_len, size=n_transactions), 1)
+    return [[f"GENE{i}" for i in set(rng.choice(n_items, size=k, p=weights).tolist())] for k in lengths]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="mlxtend Apriori vs Eclat bitset miner")
+    parser.add_argument("--triples", default="data/neo4j_triples.json")
+    parser.add_argument("--relation", default="disease_protein")
+    parser.add_argument("--keyword", default=None)
+    parser.add_argument("--synthetic-items", type=int, default=2000)
+    parser.add_argument("--synthetic-transactions", type=int, default=5000)
+    parser.add_argument("--synthetic-length", type=int, default=8)
+    parser.add_argument("--min-support", type=float, default=0.01)
+    parser.add_argument("--min-conf", type=float, default=0.8)
+    parser.add_argument("--max-len", type=int, default=None)
+    parser.add_argument("--no-mlxtend", action="store_true", help="只量測 eclat（mlxtend 記憶體不足時）")
+    args = parser.parse_args()
+    with_mlxtend = not args.no_mlxtend
+
+    report = []
+    if os.path.exists(ENTITY_ATTR_PATH):
+        onehot = pd.read_csv(ENTITY_ATTR_PATH).drop(columns=["entity_id"]).astype(bool)
+        report.append(run_workload("entity_attributes（單一 → 單一）", {"onehot": onehot},
+                                   args.min_support, args.min_conf, 2, True, with_mlxtend))
+
+    if os.path.exists(args.triples):
+        from apriori.triple_store import load_triple_store
+        from apriori.rule_generator import build_transactions
+        store = load_triple_store(args.triples)
+        src, tgt = store.triples(args.relation, args.keyword)
+        if len(src):
+            report.append(run_workload(f"triples {args.relation} keyword={args.keyword}",
+                                       {"transactions": build_transactions(store, src, tgt)},
+                                       args.min_support, args.min_conf, args.max_len, False, with_mlxtend))
+
+    transactions = synthetic_transactions(args.synthetic_items, args.synthetic_transactions, args.synthetic_length)
+    report.append(run_workload(f"synthetic {args.synthetic_items} items × {args.synthetic_transactions} transactions",
+                               {"transactions": transactions}, args.min_support, args.min_conf, args.max_len,
+                               False, with_mlxtend))
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 報告已存檔：{REPORT_PATH}")
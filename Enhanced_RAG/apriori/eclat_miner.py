@@ -0,0 +1,102 @@
+# Enhanced_RAG/apriori/eclat_miner.py
+# 垂直 bitset（Eclat）頻繁項目集與關聯規則挖掘，取代 mlxtend 的 dense one-hot Apriori
+# 每個 item 只存一個 Python int 當作 transaction bitset（第 i 個 bit = 第 i 筆 transaction 含此 item），
+# 交集為整數 AND、support 為 popcount，不需建立 (transaction 數 × item 數) 的 one-hot 矩陣
+# 輸出與 mlxtend association_rules 相同的 antecedents / consequents（frozenset）/ support / confidence 欄位
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+# Python 3.10+ 有 int.bit_count
+popcount = int.bit_count if hasattr(int, "bit_count") else (lambda x: bin(x).count("1"))
+
+RULE_COLUMNS = ["antecedents", "consequents", "support", "confidence"]
+
+
+def bitsets_from_transactions(transactions):
+    """[[item, ...], ...] → ({item: bitset}, transaction 數)"""
+    positions = {}
+    for tid, transaction in enumerate(transactions):
+        for item in set(transaction):
+            positions.setdefault(item, []).append(tid)
+    n = len(transactions)
+    bitsets = {}
+    for item, tids in positions.items():
+        bits = np.zeros(n, dtype=bool)
+        bits[tids] = True
+        bitsets[item] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+    return bitsets, n
+
+
+def bitsets_from_onehot(df):
+    """0/1 或 bool 的 DataFrame（列 = transaction、欄 = item）→ ({item: bitset}, transaction 數)"""
+    values = df.to_numpy(dtype=bool)
+    packed = np.packbits(values, axis=0, bitorder="little")
+    bitsets = {column: int.from_bytes(packed[:, j].tobytes(), "little") for j, column in enumerate(df.columns)}
+    return bitsets, len(df)
+
+
+def _eclat(prefix, candidates, min_count, max_len, supports):
+    """candidates: [(item, bitset, count)]，依序往後擴充，避免重複產生同一個項目集"""
+    for i, (item, bits, count) in enumerate(candidates):
+        itemset = prefix + (item,)
+        supports[frozenset(itemset)] = count
+        if max_len and len(itemset) >= max_len:
+            continue
+        extensions = []
+        for other, other_bits, _ in candidates[i + 1:]:
+            joined = bits & other_bits
+            joined_count = popcount(joined)
+            if joined_count >= min_count:
+                extensions.append((other, joined, joined_count))
+        if extensions:
+            _eclat(itemset, extensions, min_count, max_len, supports)
+
+
+def frequent_itemsets(bitsets, n, min_support, max_len=None):
+    """回傳 {frozenset(itemset): 出現次數}"""
+    min_count = min_support * n
+    candidates = [(item, bits, popcount(bits)) for item, bits in bitsets.items()]
+    # support 由小到大擴充，越早被剪枝的分支越小
+    candidates = sorted((c for c in candidates if c[2] >= min_count), key=lambda c: c[2])
+    supports = {}
+    _eclat((), candidates, min_count, max_len, supports)
+    return supports
+
+
+def rules_from_itemsets(supports, n, min_confidence, max_antecedent_len=None, max_consequent_len=None):
+    """由頻繁項目集產生 A → B 規則（confidence = support(A ∪ B) / support(A)）"""
+    rows = []
+    for itemset, count in supports.items():
+        size = len(itemset)
+        if size < 2:
+            continue
+        max_consequent = min(size - 1, max_consequent_len or size - 1)
+        for consequent_size in range(1, max_consequent + 1):
+            if max_antecedent_len and size - consequent_size > max_antecedent_len:
+                continue
+            for consequent in combinations(sorted(itemset, key=str), consequent_size):
+                consequent = frozenset(consequent)
+                antecedent = itemset - consequent
+                confidence = count / supports[antecedent]
+                if confidence >= min_confidence:
+                    rows.append((antecedent, consequent, count / n, confidence))
+    return pd.DataFrame(rows, columns=RULE_COLUMNS)
+
+
+def mine_rules(transactions=None, onehot=None, min_support=0.01, min_confidence=0.8, max_len=None,
+               max_antecedent_len=None, max_consequent_len=None):
+    """
+    一次完成 Eclat 頻繁項目集 + 關聯規則
+    - transactions: [[item, ...], ...]；或 onehot: 0/1 DataFrame（二擇一）
+    - max_len: 項目集最大長度；只需要 A → B 時設 2 可大幅減少計算
+    - max_antecedent_len / max_consequent_len: 限制規則左右兩側的項目數（例如單一 consequent）
+    """
+    if onehot is not None:
+        bitsets, n = bitsets_from_onehot(onehot)
+    else:
+        bitsets, n = bitsets_from_transactions(transactions)
+    if n == 0:
+        return pd.DataFrame(columns=RULE_COLUMNS)
+    supports = frequent_itemsets(bitsets, n, min_support, max_len=max_len)
+    return rules_from_itemsets(supports, n, min_confidence, max_antecedent_len, max_consequent_len)
@@ -0,0 +1,135 @@
+# Enhanced_RAG/apriori/forward_chaining.py
+# 以編譯後的規則庫（rule_index.py）做 forward chaining：由觀察到的項目推出整條規則鏈
+# （例如 Abdominal pain → Nausea → Vomiting），而不只是一步的「If A occurs, B is likely」
+# - 每條規則的 antecedent 預先存成 uint64 bitset（rules × words），每一輪以 AND 一次判斷所有可觸發的規則
+# - 推論 confidence = 規則 confidence × antecedent 中最弱項目的 confidence（np.minimum.reduceat）
+# - 同一項目保留最高 confidence 的推論；沒有項目再被更新或達到 max_depth 時停止
+# 引擎建好後只讀不寫，多個查詢（多執行緒）可共用同一個實例
+import threading
+import numpy as np
+from apriori.rule_index import load_rule_index
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def pack_bits(mask):
+    """bool (..., n) → uint64 (..., ceil(n / 64))，bit i 對應項目 i"""
+    packed = np.packbits(mask, axis=-1, bitorder="little")
+    pad = (-packed.shape[-1]) % 8
+    if pad:
+        packed = np.concatenate([packed, np.zeros(packed.shape[:-1] + (pad,), dtype=np.uint8)], axis=-1)
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+class ForwardChainer:
+    def __init__(self, index, min_rule_conf=0.0):
+        self.index = index
+        rules = np.flatnonzero((index.confidence >= min_rule_conf) & (index.ant_sizes > 0))
+        self.rules = rules
+        self.num_items = len(index.items)
+
+        # 只保留可用的規則，重新整理成連續的 ragged 陣列
+        ant_sizes = index.ant_sizes[rules]
+        self.ant_starts = np.concatenate([[0], np.cumsum(ant_sizes)[:-1]]).astype(np.int64)
+        self.ant_items = np.concatenate([index.antecedent(r) for r in rules.tolist()]) if len(rules) else np.zeros(0, np.int32)
+        con_sizes = np.diff(index.con_offsets)[rules]
+        self.con_items = np.concatenate([index.consequent(r) for r in rules.tolist()]) if len(rules) else np.zeros(0, np.int32)
+        self.con_rules = np.repeat(np.arange(len(rules)), con_sizes)
+        self.confidence = index.confidence[rules].astype(np.float64)
+
+        masks = np.zeros((len(rules), self.num_items), dtype=bool)
+        masks[np.repeat(np.arange(len(rules)), ant_sizes), self.ant_items] = True
+        self.masks = pack_bits(masks)
+
+    def closure_ids(self, item_ids, max_depth=3, min_conf=0.5):
+        """
+        回傳 (confidence, depth, via)，皆為長度 = 項目數的陣列
+        - confidence: 觀察項目為 1.0，推得項目為最佳推論鏈的 confidence，未推得為 0
+        - depth: 觀察項目為 0，推得項目為推論鏈長度，未推得為 -1
+        - via: 推得該項目的規則 id（rule_index 的規則編號），其餘為 -1
+        """
+        conf = np.zeros(self.num_items, dtype=np.float64)
+        depth = np.full(self.num_items, -1, dtype=np.int32)
+        via = np.full(self.num_items, -1, dtype=np.int64)
+        item_ids = np.asarray(list(item_ids), dtype=np.int64)
+        conf[item_ids] = 1.0
+        depth[item_ids] = 0
+        if not len(self.rules):
+            return conf, depth, via
+
+        for step in range(1, max_depth + 1):
+            known = pack_bits(conf > 0)
+            fireable = np.flatnonzero(np.all((self.masks & known) == self.masks, axis=1))
+            if not len(fireable):
+                break
+            # 每條規則 antecedent 中最弱的項目決定能傳遞多少 confidence
+            weakest = np.minimum.reduceat(conf[self.ant_items], self.ant_starts)
+            derived = self.confidence * weakest
+
+            fired = np.zeros(len(self.rules), dtype=bool)
+            fired[fireable] = True
+            pick = fired[self.con_rules] & (derived[self.con_rules] >= min_conf)
+            targets, sources = self.con_items[pick], self.con_rules[pick]
+            values = derived[sources]
+
+            # 同一項目取最高 confidence 的規則
+            order = np.lexsort((-values, targets))
+            targets, sources, values = targets[order], sources[order], values[order]
+            first = np.ones(len(targets), dtype=bool)
+            first[1:] = targets[1:] != targets[:-1]
+            targets, sources, values = targets[first], sources[first], values[first]
+
+            better = values > conf[targets] + 1e-12
+            if not better.any():
+                break
+            targets, sources = targets[better], sources[better]
+            conf[targets] = values[better]
+            depth[targets] = step
+            via[targets] = self.rules[sources]
+        return conf, depth, via
+
+    def chain(self, item, depth, via):
+        """沿著 via 往回找出推論鏈：每一步取推得該規則的 antecedent 中最深的項目"""
+        path = [item]
+        while via[item] >= 0:
+            antecedent = self.index.antecedent(int(via[item]))
+            item = int(max(antecedent.tolist(), key=lambda i: depth[i]))
+            path.append(item)
+        return [self.index.items[i] for i in reversed(path)]
+
+    def closure(self, entities, max_depth=3, min_conf=0.5, top_k=None):
+        """
+        實體名稱 → 推得的項目 [{item, confidence, depth, chain}]（不含觀察項目）
+        依 confidence 由高到低、depth 由淺到深排序
+        """
+        item_ids = [i for i in (self.index.item_id(e) for e in entities if e) if i is not None]
+        if not item_ids:
+            return []
+        conf, depth, via = self.closure_ids(item_ids, max_depth=max_depth, min_conf=min_conf)
+        derived = np.flatnonzero(depth > 0)
+        derived = derived[np.lexsort((depth[derived], -conf[derived]))]
+        if top_k:
+            derived = derived[:top_k]
+        return [{
+            "item": self.index.items[int(i)],
+            "confidence": float(conf[i]),
+            "depth": int(depth[i]),
+            "chain": self.chain(int(i), depth, via),
+        } for i in derived]
+
+
+def format_inference(inference):
+    return f"{' → '.join(inference['chain'])} (conf={inference['confidence']:.2f}, depth={inference['depth']})"
+
+
+def load_forward_chainer(rule_path, min_rule_conf=0.0):
+    """每個規則庫版本只建一次引擎；規則 CSV 更新後跟著 load_rule_index 重建"""
+    index = load_rule_index(rule_path)
+    key = (id(index), min_rule_conf)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None or engine.index is not index:
+            engine = ForwardChainer(index, min_rule_conf=min_rule_conf)
+            _engines[key] = engine
+        return engine
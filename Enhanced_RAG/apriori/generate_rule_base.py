@@ -1,50 +1,150 @@
-# rule_generator.py
-import pandas as pd
+# Enhanced_RAG/apriori/generate_rule_base.py
+# 離線規則庫建置：多種關係 ×（選用）關鍵字分片，以 process pool 平行挖掘後合併成一個有版本的規則庫
+# - 三元組先轉成 triple_store 的精簡格式，worker 以 memmap 唯讀開啟（同一份 page cache，不必各自 json.load）
+# - 輸出 data/rule_bases/<版本>/：
+#     rules.csv      relation / keyword / antecedents / consequents / support / confidence（rule_index 可直接編譯）
+#     shards.json    每個分片的三元組數、transaction 數、item 數、規則數與耗時
+#     manifest.json  參數、三元組檔指紋與總計
+#   並更新 data/rule_bases/LATEST；加上 --publish 時另外覆寫 data/apriori_rule_base.csv
+#
+#   python Enhanced_RAG/apriori/generate_rule_base.py --relations disease_protein bioprocess_protein pathway_protein
+#   python Enhanced_RAG/apriori/generate_rule_base.py --relations disease_protein --keywords-file data/diseases.txt --workers 8
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import argparse
 import json
-from collections import defaultdict
-from mlxtend.preprocessing import TransactionEncoder
-from mlxtend.frequent_patterns import apriori, association_rules
-
-def mine_rules_from_json(triple_path, relation_filter, entity_keyword=None, 
-                         min_support=0.01, min_conf=0.8, output_path=None):
-    """根據指定的關係與關鍵詞動態生成規則庫"""
-    with open(triple_path, "r", encoding="utf-8") as f:
-        triples = json.load(f)
-
-    # 篩選目標關係
-    subset = [t for t in triples if t["relation_type"] == relation_filter]
-    
-    # 若指定關鍵詞（例如疾病名稱），可進一步篩選
-    if entity_keyword:
-        subset = [t for t in subset if entity_keyword.lower() in t["target_name"].lower() 
-                  or entity_keyword.lower() in t["source_name"].lower()]
-    if not subset:
-        print("⚠️ 沒有找到符合條件的三元組")
-        return pd.DataFrame()
-
-    # 建立 transaction
-    relation_dict = defaultdict(list)
-    for item in subset:
-        src = item["source_name"].strip()
-        tgt = item["target_name"].strip()
-        relation_dict[tgt].append(src)
-    
-    transactions = list(relation_dict.values())
-    if len(transactions) < 5:
-        print("⚠️ 資料太少，略過 Apriori")
-        return pd.DataFrame()
-
-    # 套用 Apriori
-    encoder = TransactionEncoder()
-    df_hot = pd.DataFrame(encoder.fit(transactions).transform(transactions), columns=encoder.columns_)
-    frequent_itemsets = apriori(df_hot, min_support=min_support, use_colnames=True)
-    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_conf)
-
-    rule_base = rules[["antecedents", "consequents", "support", "confidence"]]
-    rule_base["antecedents"] = rule_base["antecedents"].apply(list)
-    rule_base["consequents"] = rule_base["consequents"].apply(list)
-
-    if output_path:
-        rule_base.to_csv(output_path, index=False)
-        print(f"💾 動態規則已輸出至 {output_path}")
-    return rule_base
+import time
+import shutil
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from apriori.triple_store import load_triple_store
+from apriori.rule_generator import build_transactions
+from apriori.eclat_miner import mine_rules
+from apriori.rule_cache import triple_fingerprint
+
+TRIPLE_PATH = "data/neo4j_triples.json"
+OUTPUT_DIR = "data/rule_bases"
+PUBLISH_PATH = "data/apriori_rule_base.csv"
+# 只列 prepare_text_embeddings.extract_nodes 會寫入三元組檔的關係（protein_protein 不在擷取範圍內）
+DEFAULT_RELATIONS = ["disease_protein", "bioprocess_protein", "pathway_protein"]
+MIN_TRANSACTIONS = 5
+
+_store = None
+
+
+def init_worker(triple_path):
+    """每個 worker 開啟一次三元組索引（memmap，唯讀共用）"""
+    global _store
+    _store = load_triple_store(triple_path)
+
+
+def mine_shard(relation, keyword, min_support, min_conf, max_len):
+    t0 = time.perf_counter()
+    src, tgt = _store.triples(relation, keyword)
+    stats = {"relation": relation, "keyword": keyword, "triples": int(len(src)),
+             "transactions": 0, "items": 0, "rules": 0}
+    rows = []
+    if len(src):
+        transactions = build_transactions(_store, src, tgt)
+        stats["transactions"] = len(transactions)
+        stats["items"] = len({item for t in transactions for item in t})
+        if len(transactions) >= MIN_TRANSACTIONS:
+            rules = mine_rules(transactions, min_support=min_support, min_confidence=min_conf, max_len=max_len)
+            rows = [(relation, keyword or "", sorted(a), sorted(c), s, conf)
+                    for a, c, s, conf in rules.itertuples(index=False)]
+            stats["rules"] = len(rows)
+        else:
+            stats["skipped"] = "too_few_transactions"
+    stats["seconds"] = round(time.perf_counter() - t0, 4)
+    return rows, stats
+
+
+def build_rule_base(triple_path, relations, keywords, min_support, min_conf, max_len, workers, output_dir):
+    # 主 process 先建立 / 檢查三元組索引，避免 worker 同時重建
+    store = load_triple_store(triple_path)
+    missing = [r for r in relations if r not in store.relations]
+    if missing:
+        print(f"⚠️ 三元組中沒有這些關係，略過：{', '.join(missing)}")
+    relations = [r for r in relations if r in store.relations]
+    shards = [(relation, keyword) for relation in relations for keyword in (keywords or [None])]
+    print(f"🚀 {len(relations)} 種關係 × {len(keywords) if keywords else 1} 個分片 = {len(shards)} 個任務，{workers} 個 worker")
+
+    t0 = time.perf_counter()
+    all_rows, all_stats = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(triple_path,)) as pool:
+        futures = [pool.submit(mine_shard, relation, keyword, min_support, min_conf, max_len)
+                   for relation, keyword in shards]
+        for done, future in enumerate(as_completed(futures), 1):
+            rows, stats = future.result()
+            all_rows.extend(rows)
+            all_stats.append(stats)
+            print(f"   [{done}/{len(shards)}] {stats['relation']} keyword={stats['keyword']}: "
+                  f"{stats['transactions']} transactions → {stats['rules']} 條規則（{stats['seconds']:.2f} 秒）")
+    elapsed = time.perf_counter() - t0
+
+    rule_base = pd.DataFrame(all_rows, columns=["relation", "keyword", "antecedents", "consequents", "support", "confidence"])
+    rule_base = rule_base.sort_values(["relation", "keyword", "confidence"], ascending=[True, True, False], kind="stable")
+    all_stats.sort(key=lambda s: (s["relation"], s["keyword"] or ""))
+
+    version = datetime.now().strftime("rule_base_%Y%m%d_%H%M%S")
+    version_dir = os.path.join(output_dir, version)
+    tmp_dir = version_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    rule_base.to_csv(os.path.join(tmp_dir, "rules.csv"), index=False)
+    with open(os.path.join(tmp_dir, "shards.json"), "w", encoding="utf-8") as f:
+        json.dump(all_stats, f, ensure_ascii=False, indent=2)
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "triple_path": triple_path,
+        "triple_fingerprint": triple_fingerprint(triple_path),
+        "relations": relations,
+        "keywords": keywords or [],
+        "min_support": min_support,
+        "min_conf": min_conf,
+        "max_len": max_len,
+        "workers": workers,
+        "num_shards": len(shards),
+        "num_rules": len(rule_base),
+        "seconds": round(elapsed, 3),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_dir, version_dir)
+    with open(os.path.join(output_dir, "LATEST"), "w", encoding="utf-8") as f:
+        f.write(version)
+
+    print(f"💾 規則庫 {version}：{len(rule_base)} 條規則，{elapsed:.1f} 秒 → {version_dir}")
+    return version_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="平行建置 Apriori 規則庫")
+    parser.add_argument("--triples", default=TRIPLE_PATH)
+    parser.add_argument("--relations", nargs="+", default=DEFAULT_RELATIONS)
+    parser.add_argument("--keywords", nargs="*", default=None, help="關鍵字分片（例如疾病名稱）；不指定則每種關係挖掘一次")
+    parser.add_argument("--keywords-file", default=None, help="每行一個關鍵字")
+    parser.add_argument("--min-support", type=float, default=0.01)
+    parser.add_argument("--min-conf", type=float, default=0.8)
+    parser.add_argument("--max-len", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--publish", action="store_true", help=f"同時覆寫 {PUBLISH_PATH}（enhanced_apriori_rag_api 使用）")
+    args = parser.parse_args()
+
+    keywords = list(args.keywords or [])
+    if args.keywords_file:
+        with open(args.keywords_file, "r", encoding="utf-8") as f:
+            keywords += [line.strip() for line in f if line.strip()]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    version_dir = build_rule_base(args.triples, args.relations, keywords, args.min_support, args.min_conf,
+                                  args.max_len, args.workers, args.output_dir)
+    if args.publish:
+        shutil.copyfile(os.path.join(version_dir, "rules.csv"), PUBLISH_PATH)
+        print(f"📢 已發佈至 {PUBLISH_PATH}")
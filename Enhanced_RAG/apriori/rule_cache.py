@@ -0,0 +1,96 @@
+# Enhanced_RAG/apriori/rule_cache.py
+# 動態挖掘規則的快取：結果只取決於 (relation, keyword, min_support, min_conf, 三元組檔版本)
+# - 記憶體 LRU（每個 process）+ 磁碟 data/rule_cache/<三元組檔路徑雜湊>/<三元組指紋>/<key>.json（跨 process / 重啟共用）
+# - 三元組檔的大小或修改時間改變 → 指紋改變，同一個檔案舊版本的快取資料夾在下次寫入時清除（不影響其他三元組檔）
+# - 每個 key 各寫一個檔（暫存檔 + os.replace），平行執行不會互相覆寫
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+from apriori.rule_generator import mine_rules_from_json
+
+CACHE_DIR = "data/rule_cache"
+LRU_SIZE = 256
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def triple_fingerprint(triple_path):
+    stat = os.stat(triple_path)
+    token = f"{os.path.abspath(triple_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:16]
+
+
+def source_dir(triple_path):
+    """同一個三元組檔（依絕對路徑）的所有版本放在同一個資料夾下"""
+    token = os.path.abspath(triple_path)
+    return os.path.join(CACHE_DIR, hashlib.sha1(token.encode("utf-8")).hexdigest()[:16])
+
+
+def cache_key(relation, keyword, min_support, min_conf):
+    token = json.dumps([relation, (keyword or "").strip().lower(), float(min_support), float(min_conf)])
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()
+
+
+def _read_disk(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f)["rules"], columns=["antecedents", "consequents", "support", "confidence"])
+
+
+def _write_disk(path, rules, params):
+    version_dir = os.path.dirname(path)
+    if not os.path.isdir(version_dir):
+        # 三元組檔已更新：只清掉同一個檔案其他版本的快取
+        parent = os.path.dirname(version_dir)
+        if os.path.isdir(parent):
+            for name in os.listdir(parent):
+                if name != os.path.basename(version_dir):
+                    shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+        os.makedirs(version_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "rules": rules.to_dict(orient="records")}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def cached_mine_rules(triple_path, relation_filter, entity_keyword=None, min_support=0.01, min_conf=0.8):
+    """
+    與 mine_rules_from_json 相同的輸出；命中快取時完全略過挖掘
+    回傳 (rule_base, 來源)，來源為 "memory" / "disk" / "mined"
+    """
+    fingerprint = triple_fingerprint(triple_path)
+    key = cache_key(relation_filter, entity_keyword, min_support, min_conf)
+    with _lock:
+        rules = _memory.get((fingerprint, key))
+        if rules is not None:
+            _memory.move_to_end((fingerprint, key))
+            return rules, "memory"
+
+    path = os.path.join(source_dir(triple_path), fingerprint, f"{key}.json")
+    rules = _read_disk(path)
+    source = "disk"
+    if rules is None:
+        rules = mine_rules_from_json(triple_path, relation_filter, entity_keyword,
+                                     min_support=min_support, min_conf=min_conf)
+        if rules.empty:
+            rules = pd.DataFrame(columns=["antecedents", "consequents", "support", "confidence"])
+        params = {"relation": relation_filter, "keyword": entity_keyword,
+                  "min_support": min_support, "min_conf": min_conf}
+        _write_disk(path, rules, params)
+        source = "mined"
+
+    with _lock:
+        _memory[(fingerprint, key)] = rules
+        _memory.move_to_end((fingerprint, key))
+        while len(_memory) > LRU_SIZE:
+            _memory.popitem(last=False)
+    return rules, source
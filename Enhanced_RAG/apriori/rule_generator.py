@@ -1,46 +1,34 @@
 # Enhanced_RAG/apriori/rule_generator.py
 import pandas as pd
-import json
-from collections import defaultdict
-from mlxtend.preprocessing import TransactionEncoder
-from mlxtend.frequent_patterns import apriori, association_rules
+import numpy as np
+from apriori.eclat_miner import mine_rules
+from apriori.triple_store import load_triple_store
+
+def build_transactions(store, src, tgt):
+    """同一個 target 的所有 source 組成一筆 transaction"""
+    order = np.argsort(tgt, kind="stable")
+    boundaries = np.flatnonzero(np.diff(tgt[order])) + 1
+    return [store.names_of(group) for group in np.split(src[order], boundaries)]
 
 def mine_rules_from_json(triple_path, relation_filter, entity_keyword=None, 
                          min_support=0.01, min_conf=0.8, output_path=None):
-    """根據指定關係與關鍵詞動態生成規則庫"""
-    with open(triple_path, "r", encoding="utf-8") as f:
-        triples = json.load(f)
+    """根據指定關係與關鍵詞動態生成規則庫（三元組索引每個 process 只載入一次）"""
+    store = load_triple_store(triple_path)
 
-    # 篩選關係類型
-    subset = [t for t in triples if t["relation_type"] == relation_filter]
-    
-    # 若指定實體關鍵字
-    if entity_keyword:
-        subset = [t for t in subset if entity_keyword.lower() in t["target_name"].lower() 
-                  or entity_keyword.lower() in t["source_name"].lower()]
-    if not subset:
+    # 篩選關係類型；若指定實體關鍵字，以名稱 trigram 索引找出碰到該實體的三元組
+    src, tgt = store.triples(relation_filter, entity_keyword)
+    if not len(src):
         print("⚠️ 沒有找到符合條件的三元組")
         return pd.DataFrame()
 
     # 建立 transaction
-    relation_dict = defaultdict(list)
-    for item in subset:
-        src = item["source_name"].strip()
-        tgt = item["target_name"].strip()
-        relation_dict[tgt].append(src)
-    
-    transactions = list(relation_dict.values())
+    transactions = build_transactions(store, src, tgt)
     if len(transactions) < 5:
         print("⚠️ 資料太少，略過 Apriori")
         return pd.DataFrame()
 
-    # Apriori
-    encoder = TransactionEncoder()
-    df_hot = pd.DataFrame(encoder.fit(transactions).transform(transactions), columns=encoder.columns_)
-    frequent_itemsets = apriori(df_hot, min_support=min_support, use_colnames=True)
-    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_conf)
-
-    rule_base = rules[["antecedents", "consequents", "support", "confidence"]]
+    # Eclat（transaction bitset 交集，不建立 one-hot 矩陣）
+    rule_base = mine_rules(transactions, min_support=min_support, min_confidence=min_conf)
     rule_base["antecedents"] = rule_base["antecedents"].apply(list)
     rule_base["consequents"] = rule_base["consequents"].apply(list)
 
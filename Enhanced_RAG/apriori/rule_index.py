@@ -0,0 +1,176 @@
+# Enhanced_RAG/apriori/rule_index.py
+# 預先挖掘規則庫（apriori_rule_base.csv）的編譯索引：CSV 只解析一次，查詢時以 posting 直接取出相關規則
+# 第一次使用時轉成精簡格式（<rule_base>.index/，來源 CSV 更新後自動重建）：
+#   items.blob / items.offsets.npy            項目名稱（interned，id = 列號）
+#   ant_offsets.npy / ant_items.npy           第 r 條規則的 antecedent = ant_items[ant_offsets[r]:ant_offsets[r + 1]]
+#   con_offsets.npy / con_items.npy           consequent，格式同上
+#   support.npy / confidence.npy              float32
+#   posting_offsets.npy / posting_rules.npy   項目 id → antecedent 含此項目的規則（依 confidence 由高到低）
+#   meta.json                                 {"source_size", "source_mtime_ns", "num_rules", "num_items"}
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import ast
+import csv
+import json
+import shutil
+import threading
+import numpy as np
+from backend.columnar import write_string_column, StringColumn
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def index_path(rule_path):
+    return os.path.splitext(rule_path)[0] + ".index"
+
+
+def parse_items(value):
+    """CSV 內的 "['A', 'B']" / "frozenset({'A'})" → ['A', 'B']"""
+    value = value.strip()
+    if value.startswith("frozenset(") and value.endswith(")"):
+        value = value[len("frozenset("):-1]
+    items = ast.literal_eval(value) if value else []
+    return [str(item).strip() for item in (items if isinstance(items, (list, tuple, set)) else [items])]
+
+
+def _ragged(lists):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(items) for items in lists])
+    flat = np.fromiter((i for items in lists for i in items), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, flat
+
+
+def build_rule_index(rule_path, out_dir=None):
+    out_dir = out_dir or index_path(rule_path)
+    item_ids = {}
+    antecedents, consequents, support, confidence = [], [], [], []
+    with open(rule_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            antecedents.append([item_ids.setdefault(item, len(item_ids)) for item in parse_items(row["antecedents"])])
+            consequents.append([item_ids.setdefault(item, len(item_ids)) for item in parse_items(row["consequents"])])
+            support.append(float(row["support"]))
+            confidence.append(float(row["confidence"]))
+    confidence = np.asarray(confidence, dtype=np.float32)
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write_string_column(os.path.join(tmp_dir, "items"), list(item_ids))
+    for name, lists in (("ant", antecedents), ("con", consequents)):
+        offsets, flat = _ragged(lists)
+        np.save(os.path.join(tmp_dir, f"{name}_offsets.npy"), offsets)
+        np.save(os.path.join(tmp_dir, f"{name}_items.npy"), flat)
+    np.save(os.path.join(tmp_dir, "support.npy"), np.asarray(support, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "confidence.npy"), confidence)
+
+    # antecedent 倒排：先依 confidence 排序規則，同一項目的 posting 自然由高到低
+    postings = [[] for _ in range(len(item_ids))]
+    for rule in np.argsort(-confidence, kind="stable").tolist():
+        for item in antecedents[rule]:
+            postings[item].append(rule)
+    offsets, flat = _ragged(postings)
+    np.save(os.path.join(tmp_dir, "posting_offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "posting_rules.npy"), flat)
+
+    stat = os.stat(rule_path)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns,
+                   "num_rules": len(confidence), "num_items": len(item_ids)}, f, ensure_ascii=False)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    print(f"💾 已編譯規則索引：{out_dir}（{len(confidence)} 條規則，{len(item_ids)} 個項目）")
+    return out_dir
+
+
+class RuleIndex:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.items = StringColumn(os.path.join(path, "items"))
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"))
+        self.ant_offsets, self.ant_items = load("ant_offsets"), load("ant_items")
+        self.con_offsets, self.con_items = load("con_offsets"), load("con_items")
+        self.support, self.confidence = load("support"), load("confidence")
+        self.posting_offsets, self.posting_rules = load("posting_offsets"), load("posting_rules")
+        self.ant_sizes = np.diff(self.ant_offsets)
+        # 名稱不分大小寫對照
+        self.item_ids = {self.items[i].lower(): i for i in range(len(self.items))}
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def item_id(self, name):
+        return self.item_ids.get(name.strip().lower())
+
+    def antecedent(self, rule):
+        return self.ant_items[self.ant_offsets[rule]:self.ant_offsets[rule + 1]]
+
+    def consequent(self, rule):
+        return self.con_items[self.con_offsets[rule]:self.con_offsets[rule + 1]]
+
+    def rule(self, rule):
+        return {
+            "antecedents": [self.items[int(i)] for i in self.antecedent(rule)],
+            "consequents": [self.items[int(i)] for i in self.consequent(rule)],
+            "support": float(self.support[rule]),
+            "confidence": float(self.confidence[rule]),
+        }
+
+    def rule_ids_for(self, item_ids, min_conf=0.0, complete=False):
+        """
+        antecedent 含 item_ids 中任一項目的規則 id（confidence 由高到低）
+        - complete: 只保留 antecedent 完全包含於 item_ids 的規則（可直接觸發的規則）
+        """
+        item_ids = np.unique(np.asarray(list(item_ids), dtype=np.int32))
+        if not len(item_ids):
+            return np.zeros(0, dtype=np.int32)
+        chunks = [self.posting_rules[self.posting_offsets[i]:self.posting_offsets[i + 1]] for i in item_ids.tolist()]
+        rules, hits = np.unique(np.concatenate(chunks), return_counts=True)
+        keep = self.confidence[rules] >= min_conf
+        if complete:
+            # 每個命中項目在 posting 中只出現一次，命中次數 = antecedent 長度即為完全包含
+            keep &= hits == self.ant_sizes[rules]
+        rules = rules[keep]
+        return rules[np.lexsort((-self.support[rules], -self.confidence[rules]))]
+
+    def rules_for(self, entities, min_conf=0.0, top_k=10, complete=False):
+        """實體名稱（不分大小寫，精確比對）→ 相關規則 [{antecedents, consequents, support, confidence}]"""
+        item_ids = [i for i in (self.item_id(e) for e in entities if e) if i is not None]
+        rules = self.rule_ids_for(item_ids, min_conf=min_conf, complete=complete)
+        if top_k:
+            rules = rules[:top_k]
+        return [self.rule(int(r)) for r in rules]
+
+
+def format_rule(rule):
+    return (f"If {', '.join(rule['antecedents'])} occurs, {', '.join(rule['consequents'])} is likely "
+            f"(conf={rule['confidence']:.2f})")
+
+
+def source_changed(rule_path, meta):
+    stat = os.stat(rule_path)
+    return meta["source_size"] != stat.st_size or meta["source_mtime_ns"] != stat.st_mtime_ns
+
+
+def load_rule_index(rule_path):
+    """每個 process 只載入一次；索引不存在或來源 CSV 已更新時自動重新編譯"""
+    key = os.path.abspath(rule_path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and not source_changed(rule_path, index.meta):
+            return index
+        path = index_path(rule_path)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                stale = source_changed(rule_path, json.load(f))
+        else:
+            stale = True
+        if stale:
+            build_rule_index(rule_path, path)
+        _indexes[key] = RuleIndex(path)
+        return _indexes[key]
@@ -0,0 +1,196 @@
+# Enhanced_RAG/apriori/triple_store.py
+# 查詢時規則挖掘用的三元組索引：每個 process 只載入一次，取代每題 json.load 整份 neo4j_triples.json
+# 第一次使用時由 JSON 轉成精簡格式（<triples>.store/，來源檔更新後自動重建）：
+#   names.blob / names.offsets.npy   實體名稱（interned，id = 列號）
+#   rel_<i>_src.npy / rel_<i>_tgt.npy 每種關係的 (source id, target id)，int32
+#   rel_<i>_by_src.npy / _by_tgt.npy 依 source / target id 排序的三元組列號（找「碰到某些實體的三元組」）
+#   grams.npy / gram_offsets.npy / gram_postings.npy  小寫名稱的字元 trigram → 實體 id 倒排索引
+#   meta.json                         {"relations", "source_size", "source_mtime_ns", "num_entities"}
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import json
+import shutil
+import threading
+import numpy as np
+from collections import defaultdict
+from backend.columnar import write_string_column, StringColumn
+
+GRAM = 3
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def store_path(triple_path):
+    return os.path.splitext(triple_path)[0] + ".store"
+
+
+def gram_codes(text):
+    """字元 trigram → int64（每個字元 21 bits，跨 process 穩定）"""
+    codes = set()
+    for i in range(len(text) - GRAM + 1):
+        a, b, c = (ord(ch) for ch in text[i:i + GRAM])
+        codes.add((a << 42) | (b << 21) | c)
+    return codes
+
+
+def build_triple_store(triple_path, out_dir=None):
+    out_dir = out_dir or store_path(triple_path)
+    with open(triple_path, "r", encoding="utf-8") as f:
+        triples = json.load(f)
+
+    entity_ids = {}
+    relations = {}
+    for t in triples:
+        src = entity_ids.setdefault(t["source_name"].strip(), len(entity_ids))
+        tgt = entity_ids.setdefault(t["target_name"].strip(), len(entity_ids))
+        relations.setdefault(t["relation_type"], ([], []))
+        relations[t["relation_type"]][0].append(src)
+        relations[t["relation_type"]][1].append(tgt)
+    names = list(entity_ids)
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write_string_column(os.path.join(tmp_dir, "names"), names)
+
+    relation_names = sorted(relations)
+    for i, relation in enumerate(relation_names):
+        src = np.asarray(relations[relation][0], dtype=np.int32)
+        tgt = np.asarray(relations[relation][1], dtype=np.int32)
+        np.save(os.path.join(tmp_dir, f"rel_{i}_src.npy"), src)
+        np.save(os.path.join(tmp_dir, f"rel_{i}_tgt.npy"), tgt)
+        np.save(os.path.join(tmp_dir, f"rel_{i}_by_src.npy"), np.argsort(src, kind="stable").astype(np.int32))
+        np.save(os.path.join(tmp_dir, f"rel_{i}_by_tgt.npy"), np.argsort(tgt, kind="stable").astype(np.int32))
+
+    postings = defaultdict(list)
+    for entity_id, name in enumerate(names):
+        for code in gram_codes(name.lower()):
+            postings[code].append(entity_id)
+    grams = np.array(sorted(postings), dtype=np.int64)
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[g]) for g in grams.tolist()])
+    flat = np.fromiter((e for g in grams.tolist() for e in postings[g]), dtype=np.int32, count=int(offsets[-1]))
+    np.save(os.path.join(tmp_dir, "grams.npy"), grams)
+    np.save(os.path.join(tmp_dir, "gram_offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "gram_postings.npy"), flat)
+
+    stat = os.stat(triple_path)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"relations": relation_names, "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns,
+                   "num_entities": len(names), "num_triples": len(triples)}, f, ensure_ascii=False)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    print(f"💾 已建立三元組索引：{out_dir}（{len(triples)} 筆三元組，{len(names)} 個實體，{len(relation_names)} 種關係）")
+    return out_dir
+
+
+class TripleStore:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.names = StringColumn(os.path.join(path, "names"))
+        self.relations = {relation: i for i, relation in enumerate(self.meta["relations"])}
+        self.grams = np.load(os.path.join(path, "grams.npy"), mmap_mode="r")
+        self.gram_offsets = np.load(os.path.join(path, "gram_offsets.npy"), mmap_mode="r")
+        self.gram_postings = np.load(os.path.join(path, "gram_postings.npy"), mmap_mode="r")
+        self._arrays = {}
+        self._name_ids = None
+
+    def _relation_array(self, relation, kind):
+        key = (relation, kind)
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.path, f"rel_{self.relations[relation]}_{kind}.npy"),
+                                        mmap_mode="r")
+        return self._arrays[key]
+
+    def name(self, entity_id):
+        return self.names[int(entity_id)]
+
+    def names_of(self, entity_ids):
+        return [self.names[int(i)] for i in entity_ids]
+
+    def entity_id(self, name):
+        """精確名稱 → id（第一次呼叫時建立對照表）"""
+        if self._name_ids is None:
+            self._name_ids = {self.names[i]: i for i in range(len(self.names))}
+        return self._name_ids.get(name.strip())
+
+    def entities_matching(self, keyword):
+        """名稱包含 keyword（不分大小寫）的實體 id：trigram posting 交集後再驗證子字串"""
+        keyword = keyword.strip().lower()
+        codes = gram_codes(keyword)
+        if not codes:  # 少於 3 個字元，只能逐一比對
+            return np.array([i for i in range(len(self.names)) if keyword in self.names[i].lower()], dtype=np.int32)
+
+        lists = []
+        for code in codes:
+            pos = int(np.searchsorted(self.grams, code))
+            if pos == len(self.grams) or self.grams[pos] != code:
+                return np.zeros(0, dtype=np.int32)
+            lists.append(self.gram_postings[self.gram_offsets[pos]:self.gram_offsets[pos + 1]])
+        lists.sort(key=len)
+        candidates = np.asarray(lists[0])
+        for posting in lists[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                break
+        return np.array([i for i in candidates.tolist() if keyword in self.names[i].lower()], dtype=np.int32)
+
+    def _rows_touching(self, relation, kind, entity_ids):
+        """relation 中 source（kind="src"）或 target（kind="tgt"）屬於 entity_ids（已排序）的三元組列號"""
+        key = (relation, f"sorted_{kind}")
+        if key not in self._arrays:
+            self._arrays[key] = np.asarray(self._relation_array(relation, kind))[np.asarray(self._relation_array(relation, f"by_{kind}"))]
+        sorted_ids = self._arrays[key]
+        order = self._relation_array(relation, f"by_{kind}")
+        starts = np.searchsorted(sorted_ids, entity_ids, side="left")
+        ends = np.searchsorted(sorted_ids, entity_ids, side="right")
+        chunks = [np.asarray(order[s:e]) for s, e in zip(starts.tolist(), ends.tolist()) if e > s]
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+
+    def triples(self, relation, keyword=None):
+        """
+        回傳關係 relation 的 (source ids, target ids)
+        - keyword: 只保留 source 或 target 名稱包含 keyword 的三元組（不分大小寫）
+        """
+        if relation not in self.relations:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        src = self._relation_array(relation, "src")
+        tgt = self._relation_array(relation, "tgt")
+        if not keyword:
+            return np.asarray(src), np.asarray(tgt)
+
+        entity_ids = np.sort(self.entities_matching(keyword))
+        rows = np.union1d(self._rows_touching(relation, "src", entity_ids),
+                          self._rows_touching(relation, "tgt", entity_ids)).astype(np.int64)
+        return np.asarray(src[rows]), np.asarray(tgt[rows])
+
+
+def source_changed(triple_path, meta):
+    stat = os.stat(triple_path)
+    return meta["source_size"] != stat.st_size or meta["source_mtime_ns"] != stat.st_mtime_ns
+
+
+def load_triple_store(triple_path):
+    """每個 process 只載入一次；精簡格式不存在或來源 JSON 已更新時自動重建"""
+    key = os.path.abspath(triple_path)
+    with _lock:
+        store = _stores.get(key)
+        if store is not None and not source_changed(triple_path, store.meta):
+            return store
+        path = store_path(triple_path)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                stale = source_changed(triple_path, json.load(f))
+        else:
+            stale = True
+        if stale:
+            build_triple_store(triple_path, path)
+        _stores[key] = TripleStore(path)
+        return _stores[key]
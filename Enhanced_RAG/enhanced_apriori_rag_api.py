@@ -2,7 +2,6 @@ import json
 import requests
 import os, sys , re
 import csv
-import pandas as pd
 from collections import defaultdict
 from sentence_transformers import SentenceTransformer
 from pymilvus import connections, Collection
@@ -11,8 +10,11 @@ from pymilvus import connections, Collection
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from backend.neo4j_connect import Neo4jConnection
+from backend.text_retrieval import search_question, format_hit
 from pag_generator import generate_pag,generate_pag_drug,generate_pag_with_genes
-from apriori.rule_generator import mine_rules_from_json
+from apriori.rule_cache import cached_mine_rules
+from apriori.rule_index import load_rule_index, format_rule
+from apriori.forward_chaining import load_forward_chainer, format_inference
 # ========== 參數設定 ==========
 MILVUS_COLLECTION = "collection_text"
 QUERY_FILE = "data/primekg_queries_multihop.jsonl"
@@ -23,16 +25,6 @@ RESULT_DIR = "results"
 RESULT_JSON = os.path.join(RESULT_DIR, "enhanced_apriori_graph_result.json")
 RESULT_CSV  = os.path.join(RESULT_DIR, "enhanced_apriori_graph_result.csv")
 
-# ========== 載入 Apriori 規則庫 ==========
-RULE_BASE_PATH = "data/apriori_rule_base.csv"
-if os.path.exists(RULE_BASE_PATH):
-    rule_base = pd.read_csv(RULE_BASE_PATH)
-    print(f"✅ 已載入 {len(rule_base)} 條 Apriori 規則")
-else:
-    rule_base = pd.DataFrame()
-    print("⚠️ 尚未建立 Apriori 規則庫 (data/apriori_rule_base.csv)")
-
-
 # ========== 初始化 ==========
 print("🔧 連線到 Milvus ...")
 connections.connect(alias="default", host="127.0.0.1", port="19530")
@@ -57,31 +49,27 @@ collection.load()
 print(f"✅ Collection {MILVUS_COLLECTION} 已載入")
 
 
-# ========== 載入 Apriori 規則庫 ==========
+# ========== 載入 Apriori 規則庫（編譯索引，CSV 只在更新後重新解析） ==========
 RULE_BASE_PATH = "data/apriori_rule_base.csv"
 if os.path.exists(RULE_BASE_PATH):
-    rule_base = pd.read_csv(RULE_BASE_PATH)
-    print(f"✅ 已載入 {len(rule_base)} 條 Apriori 規則")
+    rule_index = load_rule_index(RULE_BASE_PATH)
+    chainer = load_forward_chainer(RULE_BASE_PATH)
+    print(f"✅ 已載入 {len(rule_index)} 條 Apriori 規則")
 else:
-    rule_base = pd.DataFrame()
+    rule_index = chainer = None
     print("⚠️ 尚未建立 Apriori 規則庫 (data/apriori_rule_base.csv)")
 
 
 # ========== 工具函式 ==========
 
-def search_milvus(query_text, top_k=5):
-    """將 query 向量化，在 Milvus 檢索相似片段"""
+def search_milvus_hits(query_text, top_k=5):
+    """將 query 向量化，在 Milvus 檢索相似三元組（依意圖路由 partition，問題指名實體時只在該實體的三元組內檢索）"""
     q_emb = embedder.encode(query_text).tolist()
-    search_res = collection.search(
-        data=[q_emb],
-        anns_field="embedding",
-        param={"metric_type": "IP", "nprobe": 10}, 
-        limit=top_k,
-        output_fields=["source_name", "relation_type", "target_name"]
-    )
-    hits = [f"{hit.entity.get('source_name')} {hit.entity.get('relation_type')} {hit.entity.get('target_name')}"
-            for hit in search_res[0]]
-    return hits
+    return search_question(collection, query_text, q_emb, top_k=top_k)
+
+def search_milvus(query_text, top_k=5):
+    # 把原本三個分開的欄位 → 合併成一段文字，提供給 LLM 當 context。
+    return [format_hit(hit) for hit in search_milvus_hits(query_text, top_k=top_k)]
 
 def build_drug_gene_context(milvus_hits, conn: Neo4jConnection, limit=5):
     """Neo4j 擴展：疾病 → 藥物 → 基因"""
@@ -139,22 +127,37 @@ def generate_dynamic_rules(query_text):
         return []
 
     print(f"🔍 動態挖掘規則: relation={relation}, keyword={entity_keyword}")
-    rules = mine_rules_from_json(
+    # 相同 (relation, keyword, 門檻, 三元組檔版本) 只挖掘一次，之後由記憶體 / 磁碟快取取得
+    rules, source = cached_mine_rules(
         triple_path="data/neo4j_triples.json",
         relation_filter=relation,
         entity_keyword=entity_keyword,
         min_support=0.005,
         min_conf=0.7,
-        output_path="data/temp_rule_base.csv"
     )
+    print(f"   規則來源: {source}")
 
     if rules.empty:
         return []
     
-    context = [
-        f"If {', '.join(r['antecedents'])} occurs, {', '.join(r['consequents'])} is likely (conf={r['confidence']:.2f})"
-        for _, r in rules.iterrows()
-    ]
+    context = [format_rule(r) for _, r in rules.iterrows()]
+    return context
+
+def build_rule_context(query_text, milvus_hits, min_conf=0.8, chain_min_conf=0.6, top_k=10, max_depth=3):
+    """
+    從預先挖掘的規則庫取出 antecedent 含問題實體或檢索到的實體的規則，
+    並以 forward chaining 推出多步的規則鏈（例如 A → B → C）
+    - min_conf: 單步規則的信心門檻
+    - chain_min_conf: 規則鏈每一步的信心門檻（多步推論較寬鬆，否則很少能串出兩步以上）
+    """
+    if rule_index is None:
+        return []
+    entities = {extract_entity_from_query(query_text)}
+    for hit in milvus_hits:
+        entities.update((hit["source_name"], hit["target_name"]))
+    context = [format_rule(rule) for rule in rule_index.rules_for(entities, min_conf=min_conf, top_k=top_k)]
+    inferences = chainer.closure(entities, max_depth=max_depth, min_conf=chain_min_conf, top_k=top_k)
+    context += [format_inference(inference) for inference in inferences if inference["depth"] > 1]
     return context
 
 def ask_llm(query_text, context, model=LLM_MODEL):
@@ -208,7 +211,8 @@ if __name__ == "__main__":
         print(f"\n🔍 問題: {question}")
 
         # Step 1: Milvus 檢索
-        milvus_context = search_milvus(question, top_k=5)
+        milvus_hits = search_milvus_hits(question, top_k=5)
+        milvus_context = [format_hit(hit) for hit in milvus_hits]
         print(f"  檢索到 {len(milvus_context)} 個片段")
 
         # Step 2: Neo4j 擴展
@@ -238,9 +242,11 @@ if __name__ == "__main__":
         # Step 3.5: Apriori-based reasoning
         apriori_context = generate_dynamic_rules(question)
         print(f"  🔧 動態 Apriori 規則挖掘結果: {len(apriori_context)} 條")
+        rule_context = build_rule_context(question, milvus_hits)
+        print(f"  📚 規則庫命中: {len(rule_context)} 條")
 
         # Step 4: 合併 context
-        full_context = milvus_context + graph_context + pag_context + apriori_context
+        full_context = milvus_context + graph_context + pag_context + apriori_context + rule_context
 
         # Step 5: LLM 回答
         answer = ask_llm(question, full_context)
@@ -10,6 +10,7 @@ from pymilvus import connections, Collection
 # === 匯入 Neo4j 連線 & PAG 生成器 ===
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from backend.neo4j_connect import Neo4jConnection
+from backend.text_retrieval import search_question, format_hit
 from pag_generator import generate_pag,generate_pag_drug,generate_pag_with_genes
 # ========== 參數設定 ==========
 MILVUS_COLLECTION = "collection_text"
@@ -47,18 +48,11 @@ print(f"✅ Collection {MILVUS_COLLECTION} 已載入")
 # ========== 工具函式 ==========
 
 def search_milvus(query_text, top_k=5):
-    """將 query 向量化，在 Milvus 檢索相似片段"""
+    """將 query 向量化，在 Milvus 檢索相似片段（依意圖路由 partition，問題指名實體時只在該實體的三元組內檢索）"""
     q_emb = embedder.encode(query_text).tolist()
-    search_res = collection.search(
-        data=[q_emb],
-        anns_field="embedding",
-        param={"metric_type": "IP", "nprobe": 10}, 
-        limit=top_k,
-        output_fields=["source_name", "relation_type", "target_name"]
-    )
-    hits = [f"{hit.entity.get('source_name')} {hit.entity.get('relation_type')} {hit.entity.get('target_name')}"
-            for hit in search_res[0]]
-    return hits
+    hits = search_question(collection, query_text, q_emb, top_k=top_k)
+    # 把原本三個分開的欄位 → 合併成一段文字，提供給 LLM 當 context。
+    return [format_hit(hit) for hit in hits]
 
 def build_drug_gene_context(milvus_hits, conn: Neo4jConnection, limit=5):
     """Neo4j 擴展：疾病 → 藥物 → 基因"""
@@ -0,0 +1,125 @@
+# 編譯後的屬性關聯圖（PAG）：取代 GML / pickle / JSON 三種格式各自重新解析
+# data/attribute_graph.npz 一次包含：
+#   nodes        屬性名稱（依規則中第一次出現的順序，與 NetworkX 加邊順序相同）
+#   adjacency    bool (n × n)，A → B 的邊
+#   confidence   float32 (n × n)，邊的信心度（無邊為 0）
+#   closure      bool (n × n)，遞移閉包：closure[i, j] = j 是 i 的後代（與 nx.descendants 相同，不含自己）
+#   roots        root 屬性的列號（依出度由高到低）
+#   clusters     bool (root 數 × n)，每個 root 的 cluster（root 本身 + 其後代）
+# 純 numpy，載入只需讀一個 npz
+import os
+import threading
+import numpy as np
+
+GRAPH_PATH = "data/attribute_graph.npz"
+TOP_K_ROOTS = 3
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def transitive_closure(adjacency):
+    """反覆平方直到不再變化（log n 輪布林矩陣乘法）；對角線只有在環上才為 True，輸出時去掉以對齊 nx.descendants"""
+    reach = np.asarray(adjacency, dtype=bool)
+    while True:
+        step = reach | ((reach.astype(np.uint16) @ reach.astype(np.uint16)) > 0)
+        if (step == reach).all():
+            break
+        reach = step
+    reach = reach.copy()
+    np.fill_diagonal(reach, False)
+    return reach
+
+
+def select_roots(adjacency, k=TOP_K_ROOTS):
+    """依出度排序，出度高者影響力強（同出度維持節點順序，與 cluster_by_root_attribute 原本的排序相同）"""
+    out_degrees = np.asarray(adjacency, dtype=bool).sum(axis=1)
+    return np.argsort(-out_degrees, kind="stable")[:k]
+
+
+def cluster_matrix(closure, roots):
+    clusters = np.asarray(closure, dtype=bool)[roots].copy()
+    clusters[np.arange(len(roots)), roots] = True
+    return clusters
+
+
+def compile_attribute_graph(antecedents, consequents, confidences, path=GRAPH_PATH, k=TOP_K_ROOTS):
+    """由 A → B 規則（三個等長序列）編譯出屬性圖並寫入 npz"""
+    index = {}
+    for a, b in zip(antecedents, consequents):
+        index.setdefault(a, len(index))
+        index.setdefault(b, len(index))
+    n = len(index)
+    adjacency = np.zeros((n, n), dtype=bool)
+    confidence = np.zeros((n, n), dtype=np.float32)
+    for a, b, c in zip(antecedents, consequents, confidences):
+        adjacency[index[a], index[b]] = True
+        confidence[index[a], index[b]] = c
+
+    closure = transitive_closure(adjacency)
+    roots = select_roots(adjacency, k)
+    np.savez_compressed(
+        path,
+        nodes=np.array(list(index), dtype=str),
+        adjacency=adjacency,
+        confidence=confidence,
+        closure=closure,
+        roots=roots.astype(np.int32),
+        clusters=cluster_matrix(closure, roots),
+    )
+    print(f"💾 已編譯屬性關聯圖：{path}（{n} 個屬性，{int(adjacency.sum())} 條邊，root：{[list(index)[r] for r in roots]}）")
+    return path
+
+
+class AttributeGraph:
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.nodes = [str(n) for n in data["nodes"]]
+            self.adjacency = data["adjacency"]
+            self.confidence = data["confidence"]
+            self.closure = data["closure"]
+            self.roots = data["roots"]
+            self.cluster_masks = data["clusters"]
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+    def __contains__(self, attr):
+        return attr in self.index
+
+    def edges(self):
+        """[(source, target, confidence)]"""
+        return [(self.nodes[i], self.nodes[j], float(self.confidence[i, j]))
+                for i, j in zip(*np.nonzero(self.adjacency))]
+
+    def successors(self, attr):
+        return [self.nodes[j] for j in np.flatnonzero(self.adjacency[self.index[attr]])] if attr in self else []
+
+    def descendants(self, attr):
+        return {self.nodes[j] for j in np.flatnonzero(self.closure[self.index[attr]])} if attr in self else set()
+
+    def clusters(self, roots=None):
+        """{root: [cluster 成員]}；roots 未指定時使用編譯時選出的 root"""
+        if roots is None:
+            roots, masks = self.roots, self.cluster_masks
+        else:
+            roots = np.array([self.index[r] for r in roots], dtype=np.int64)
+            masks = cluster_matrix(self.closure, roots)
+        return {self.nodes[r]: [self.nodes[j] for j in np.flatnonzero(mask)] for r, mask in zip(roots, masks)}
+
+    def reindex(self, matrix, attrs):
+        """把 (節點 × 節點) 矩陣換成 attrs 的順序；不在圖上的屬性整列 / 整欄為 False"""
+        pos = np.array([self.index.get(a, -1) for a in attrs], dtype=np.int64)
+        ok = pos >= 0
+        out = np.zeros((len(attrs), len(attrs)), dtype=matrix.dtype)
+        out[np.ix_(ok, ok)] = matrix[np.ix_(pos[ok], pos[ok])]
+        return out
+
+
+def load_attribute_graph(path=GRAPH_PATH):
+    """每個 process 快取一份，檔案重新編譯後自動重新載入"""
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _graphs.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, AttributeGraph(path))
+            _graphs[path] = cached
+        return cached[1]
@@ -0,0 +1,151 @@
+# 實體-屬性矩陣的精簡二進位格式：取代 3.7 MB 的 0/1 文字 CSV（entity_attributes.csv / entity_attributes_inferred.csv）
+# 檔案與 CSV 同名、不同副檔名（以 data/entity_attributes 為例）：
+#   entity_attributes.masks.npy                   uint16，每個實體一個 bitmask，bit j = schema 的第 j 個屬性
+#   entity_attributes.names.blob / .offsets.npy   實體名稱（interned，列號 = masks 的列號）
+#   entity_attributes.sorted.npy                  依名稱排序的列號（二分搜尋查實體，不必建 dict）
+#   entity_attributes.schema.json                 {"columns", "num_entities", "source_size", "source_mtime_ns"}
+# 全部以 memmap 開啟，啟動與單一實體查詢都是常數時間等級
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from backend.columnar import write_string_column, StringColumn
+
+MAX_ATTRIBUTES = 16
+
+_matrices = {}
+_lock = threading.Lock()
+
+
+def matrix_prefix(csv_path):
+    return os.path.splitext(csv_path)[0]
+
+
+def pack_masks(X):
+    """(實體數 × 屬性數) 0/1 矩陣 → uint16 bitmask"""
+    X = np.asarray(X, dtype=bool)
+    if X.shape[1] > MAX_ATTRIBUTES:
+        raise ValueError(f"屬性數 {X.shape[1]} 超過 uint16 bitmask 上限 {MAX_ATTRIBUTES}")
+    weights = (1 << np.arange(X.shape[1])).astype(np.uint16)
+    return (X.astype(np.uint16) * weights).sum(axis=1, dtype=np.uint16)
+
+
+def unpack_masks(masks, num_columns):
+    """uint16 bitmask → (實體數 × 屬性數) bool 矩陣"""
+    bits = np.arange(num_columns, dtype=np.uint16)
+    return ((np.asarray(masks)[:, None] >> bits) & 1).astype(bool)
+
+
+def write_attribute_matrix(prefix, entity_ids, columns, X, source_path=None):
+    entity_ids = [str(e) for e in entity_ids]
+    np.save(prefix + ".masks.npy", pack_masks(X))
+    write_string_column(prefix + ".names", entity_ids)
+    np.save(prefix + ".sorted.npy", np.array(sorted(range(len(entity_ids)), key=entity_ids.__getitem__), dtype=np.int32))
+    schema = {"columns": list(columns), "num_entities": len(entity_ids)}
+    if source_path and os.path.exists(source_path):
+        stat = os.stat(source_path)
+        schema.update(source_size=stat.st_size, source_mtime_ns=stat.st_mtime_ns)
+    # schema 最後寫入，作為完成標記
+    with open(prefix + ".schema.json", "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False, indent=2)
+    print(f"💾 已寫出實體屬性矩陣：{prefix}.masks.npy（{len(entity_ids)} 個實體，{len(columns)} 個屬性）")
+
+
+def write_from_dataframe(df, csv_path):
+    """df：index 為 entity_id、欄位為 0/1 屬性；寫在 csv_path 旁邊"""
+    write_attribute_matrix(matrix_prefix(csv_path), df.index, df.columns, df.to_numpy(), source_path=csv_path)
+
+
+class AttributeMatrix:
+    def __init__(self, prefix):
+        with open(prefix + ".schema.json", "r", encoding="utf-8") as f:
+            self.schema = json.load(f)
+        self.columns = self.schema["columns"]
+        self.column_index = {c: j for j, c in enumerate(self.columns)}
+        self.masks = np.load(prefix + ".masks.npy", mmap_mode="r")
+        self.names = StringColumn(prefix + ".names")
+        self.sorted_rows = np.load(prefix + ".sorted.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.masks)
+
+    def row(self, entity):
+        """實體名稱 → 列號（二分搜尋），不存在時回傳 None"""
+        lo, hi = 0, len(self.sorted_rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.names[int(self.sorted_rows[mid])] < entity:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.sorted_rows) and self.names[int(self.sorted_rows[lo])] == entity:
+            return int(self.sorted_rows[lo])
+        return None
+
+    def rows(self, entities):
+        """回傳 (列號陣列, 找得到的實體)"""
+        found = [(r, e) for e, r in ((e, self.row(e)) for e in entities) if r is not None]
+        return np.array([r for r, _ in found], dtype=np.int64), [e for _, e in found]
+
+    def __contains__(self, entity):
+        return self.row(entity) is not None
+
+    def __getitem__(self, entity):
+        row = self.row(entity)
+        if row is None:
+            raise KeyError(entity)
+        return self.attributes_of_mask(int(self.masks[row]))
+
+    def get(self, entity, default=None):
+        return self[entity] if entity in self else default
+
+    def attributes_of_mask(self, mask):
+        return [c for j, c in enumerate(self.columns) if mask >> j & 1]
+
+    def has(self, entity, attribute):
+        row = self.row(entity)
+        return row is not None and bool(int(self.masks[row]) >> self.column_index[attribute] & 1)
+
+    def entity_ids(self):
+        return [self.names[i] for i in range(len(self))]
+
+    def dense(self):
+        return unpack_masks(self.masks, len(self.columns))
+
+    def to_dataframe(self):
+        df = pd.DataFrame(self.dense().astype(int), columns=self.columns, index=self.entity_ids())
+        df.index.name = "entity_id"
+        return df
+
+
+def _is_stale(prefix, csv_path):
+    schema_path = prefix + ".schema.json"
+    if not os.path.exists(schema_path):
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    stat = os.stat(csv_path)
+    return schema.get("source_size") != stat.st_size or schema.get("source_mtime_ns") != stat.st_mtime_ns
+
+
+def load_attribute_matrix(csv_path):
+    """
+    讀取 csv_path 對應的二進位矩陣（每個 process 快取一份）
+    二進位檔不存在或比 CSV 舊時，由 CSV 轉換一次
+    """
+    prefix = matrix_prefix(csv_path)
+    with _lock:
+        if _is_stale(prefix, csv_path):
+            if not os.path.exists(csv_path):
+                raise FileNotFoundError(f"找不到 {csv_path} 或 {prefix}.schema.json")
+            df = pd.read_csv(csv_path, dtype={"entity_id": str}, keep_default_na=False).set_index("entity_id")
+            write_from_dataframe(df, csv_path)
+        mtime = os.path.getmtime(prefix + ".schema.json")
+        cached = _matrices.get(prefix)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, AttributeMatrix(prefix))
+            _matrices[prefix] = cached
+        return cached[1]
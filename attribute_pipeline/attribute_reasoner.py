@@ -1,15 +1,72 @@
 # 從已知的屬性集合中，透過屬性關聯圖（PAG）進行推論，補足可能遺漏的屬性
 import pandas as pd
+import numpy as np
 import networkx as nx
+import argparse
 import json
 import os
+import time
+from attribute_pipeline.attribute_matrix import load_attribute_matrix, write_attribute_matrix, matrix_prefix
+from attribute_pipeline.attribute_graph import load_attribute_graph, GRAPH_PATH
 
 # 檔案路徑
 ATTR_GRAPH_PATH = "data/attribute_graph.gml"
+COMPILED_GRAPH_PATH = GRAPH_PATH
 ENTITY_ATTR_PATH = "data/entity_attributes.csv"
 CLUSTER_PATH = "data/attribute_clusters.json"
 OUTPUT_PATH = "data/entity_attributes_inferred.csv"
 
+def cluster_mask(clusters, attrs):
+    """K[i, j] = attrs[i] 與 attrs[j] 屬於同一個 cluster（推論只在 cluster 內進行）"""
+    index = {attr: i for i, attr in enumerate(attrs)}
+    K = np.zeros((len(attrs), len(attrs)), dtype=bool)
+    for cluster in clusters.values():
+        members = [index[attr] for attr in cluster if attr in index]
+        K[np.ix_(members, members)] = True
+    return K
+
+
+def infer_matrix(X, R, K):
+    """
+    X: (entity 數 × 屬性數) 的 0/1 矩陣
+    一次矩陣乘法取代逐 entity、逐屬性的圖走訪：推論結果 = X OR (X · (R AND K) > 0)
+    """
+    X = np.asarray(X, dtype=bool)
+    reach = (R & K).astype(np.uint8)
+    return X | ((X.astype(np.uint8) @ reach) > 0)
+
+
+def load_clusters(graph, cluster_path=CLUSTER_PATH):
+    """Step 4 的 cluster 檔優先（可能以不同的 TOP_K_ROOTS 產生），沒有時用編譯時的 root cluster"""
+    if os.path.exists(cluster_path):
+        with open(cluster_path, "r") as f:
+            return json.load(f)
+    return graph.clusters()
+
+
+def infer_attributes_vectorized():
+    # 編譯後的屬性圖已含遞移閉包，不必再走訪圖
+    graph = load_attribute_graph(COMPILED_GRAPH_PATH)
+    matrix = load_attribute_matrix(ENTITY_ATTR_PATH)
+    clusters = load_clusters(graph, CLUSTER_PATH)
+
+    t0 = time.perf_counter()
+    attrs = matrix.columns
+    X = matrix.dense()
+    R = graph.reindex(graph.closure, attrs)
+    K = cluster_mask(clusters, attrs)
+    inferred = infer_matrix(X, R, K)
+    print(f"向量化推論完成：{len(X)} 個實體，{time.perf_counter() - t0:.3f} 秒，"
+          f"新增 {int(inferred.sum() - X.sum())} 個屬性")
+
+    entity_ids = matrix.entity_ids()
+    inferred_df = pd.DataFrame(inferred.astype(int), columns=attrs)
+    inferred_df.insert(0, "entity_id", entity_ids)
+    inferred_df.to_csv(OUTPUT_PATH, index=False)
+    print(f"推論後屬性表已儲存至：{OUTPUT_PATH}")
+    write_attribute_matrix(matrix_prefix(OUTPUT_PATH), entity_ids, attrs, inferred, source_path=OUTPUT_PATH)
+
+
 def infer_attributes():
     # 讀取屬性圖（PAG）
     G = nx.read_gml(ATTR_GRAPH_PATH)
@@ -46,7 +103,14 @@ def infer_attributes():
     print(f"推論後屬性表已儲存至：{OUTPUT_PATH}")
 
 # ✅ 即時推論：根據單一實體的 known_attrs + 屬性關聯圖推斷
+# attribute_graph 可為 {attr: [後繼屬性]}，或 convert_attribute_graph.py 輸出的邊清單 [{"source", "target"}]
+# 批次、含遞移閉包的線上推論請用 attribute_pipeline.reasoner_service
 def infer_attributes_from_context(known_attrs, attribute_graph):
+    if isinstance(attribute_graph, list):
+        adjacency = {}
+        for edge in attribute_graph:
+            adjacency.setdefault(edge["source"], []).append(edge["target"])
+        attribute_graph = adjacency
     inferred = set()
     for attr in known_attrs:
         if attr in attribute_graph:
@@ -55,4 +119,12 @@ def infer_attributes_from_context(known_attrs, attribute_graph):
 
 
 if __name__ == "__main__":
-    infer_attributes()
+    parser = argparse.ArgumentParser(description="屬性推論（Attribute Reasoning）")
+    parser.add_argument("--mode", choices=["vectorized", "loop"], default="vectorized",
+                        help="vectorized：可達矩陣 + 矩陣乘法；loop：原本逐 entity 走訪圖的實作")
+    args = parser.parse_args()
+
+    if args.mode == "vectorized":
+        infer_attributes_vectorized()
+    else:
+        infer_attributes()
@@ -1,15 +1,17 @@
-# 將屬性邏輯建成 NetworkX 有向圖（PAG）
+# 將屬性邏輯建成有向圖（PAG）
+# 主要輸出為編譯後的 data/attribute_graph.npz（鄰接、信心度、遞移閉包、root cluster），
+# 另外寫出 GML 給 Gephi 等可視化工具；加上 --plot 才會畫圖
 import pandas as pd
 import networkx as nx
-import matplotlib.pyplot as plt
+import argparse
 import os
-import pickle  
+from attribute_pipeline.attribute_graph import compile_attribute_graph, GRAPH_PATH
 
 INPUT_PATH = "data/attr_implications.csv"
 OUTPUT_GRAPH_GML = "data/attribute_graph.gml"     # 給 Gephi 或可視化工具用
-OUTPUT_GRAPH_PKL = "data/attribute_graph.pkl"     # 給 Python 模組載入用
+OUTPUT_GRAPH_NPZ = GRAPH_PATH                     # 給 Python 模組載入用
 
-def build_attribute_graph():
+def build_attribute_graph(plot=False):
     # 檢查檔案是否存在
     if not os.path.exists(INPUT_PATH):
         print(f"❌ 找不到輸入檔案：{INPUT_PATH}")
@@ -18,30 +20,24 @@ def build_attribute_graph():
     # 讀取 A → B 關聯規則
     df = pd.read_csv(INPUT_PATH)
 
-    # 建立 NetworkX 有向圖
-    G = nx.DiGraph()
-
-    # 加入節點與邊（含信心度）
-    for _, row in df.iterrows():
-        antecedent = row["antecedent"]
-        consequent = row["consequent"]
-        confidence = row["confidence"]
+    # 編譯成 npz（鄰接、信心度、遞移閉包與 root cluster）
+    compile_attribute_graph(df["antecedent"], df["consequent"], df["confidence"], path=OUTPUT_GRAPH_NPZ)
 
+    # 建立 NetworkX 有向圖（加入節點與邊，含信心度）
+    G = nx.DiGraph()
+    for antecedent, consequent, confidence in zip(df["antecedent"], df["consequent"], df["confidence"]):
         G.add_edge(antecedent, consequent, weight=confidence)
 
     # 儲存為 GML 格式（可視覺化用）
     nx.write_gml(G, OUTPUT_GRAPH_GML)
     print(f"屬性關聯圖（GML）已儲存至：{OUTPUT_GRAPH_GML}")
 
-    # 儲存為 Pickle 格式（Python 模組用）
-    with open(OUTPUT_GRAPH_PKL, "wb") as f:
-        pickle.dump(G, f)
-    print(f"屬性關聯圖（Pickle）已儲存至：{OUTPUT_GRAPH_PKL}")
-
     # 顯示圖（可選）
-    draw_graph(G)
+    if plot:
+        draw_graph(G)
 
 def draw_graph(G):
+    import matplotlib.pyplot as plt
     pos = nx.spring_layout(G, seed=42)
     plt.figure(figsize=(10, 8))
     nx.draw(
@@ -64,4 +60,7 @@ def draw_graph(G):
     plt.show()
 
 if __name__ == "__main__":
-    build_attribute_graph()
+    parser = argparse.ArgumentParser(description="建構屬性關聯圖（PAG）")
+    parser.add_argument("--plot", action="store_true", help="以 matplotlib 顯示圖（會阻塞直到關閉視窗）")
+    args = parser.parse_args()
+    build_attribute_graph(plot=args.plot)
@@ -1,7 +1,9 @@
 #評估在 Step 5 中進行的屬性推論結果是否準確，與原始 Ground Truth（即 entity_attributes.csv）進行比較
 import pandas as pd
+import numpy as np
 from sklearn.metrics import precision_score, recall_score, f1_score
 import os
+from attribute_pipeline.attribute_matrix import load_attribute_matrix
 
 # 設定輸入檔案位置
 GROUND_TRUTH_PATH = "data/entity_attributes.csv"
@@ -14,12 +16,21 @@ def evaluate_inference():
         print("找不到輸入檔案，請確認是否已完成前置步驟。")
         return
 
-    # 讀取資料
-    df_true = pd.read_csv(GROUND_TRUTH_PATH, index_col="entity_id")
-    df_pred = pd.read_csv(INFERRED_PATH, index_col="entity_id")
-
-    # 對齊兩者欄位與順序
-    df_true = df_true[df_pred.columns]
+    # 讀取資料（uint16 bitmask，以 memmap 載入）
+    truth = load_attribute_matrix(GROUND_TRUTH_PATH)
+    pred = load_attribute_matrix(INFERRED_PATH)
+
+    # 對齊兩者欄位與順序（推論表通常與原始表同順序，不同時依名稱對齊）
+    columns = pred.columns
+    true_cols = [truth.column_index[c] for c in columns]
+    true_rows = pred_rows = np.arange(len(truth))
+    if len(truth) != len(pred) or truth.entity_ids() != pred.entity_ids():
+        # 只比較兩邊都有的實體，兩邊都以同一份實體清單取列，避免缺漏時變成依位置錯位比較
+        true_rows, shared = truth.rows(pred.entity_ids())
+        pred_rows, _ = pred.rows(shared)
+        print(f"僅比較兩邊共有的 {len(shared)} 個實體（推論 {len(pred)}，原始 {len(truth)}）")
+    df_true = pd.DataFrame(truth.dense()[np.ix_(true_rows, true_cols)].astype(int), columns=columns)
+    df_pred = pd.DataFrame(pred.dense()[pred_rows].astype(int), columns=columns)
 
     # 結果報表
     print("\n推論評估報告 (全體平均):")
@@ -1,6 +1,7 @@
 import pandas as pd
 from collections import defaultdict
 from backend.neo4j_connect import Neo4jConnection
+from attribute_pipeline.attribute_matrix import write_from_dataframe
 
 OUTPUT_PATH = "data/entity_attributes.csv"
 
@@ -36,6 +37,8 @@ def fetch_entity_attributes():
     df.set_index("entity_id", inplace=True)
     df.to_csv(OUTPUT_PATH)
     print(f"Entity-Attribute 表格已儲存至：{OUTPUT_PATH}")
+    # 同時寫出 uint16 bitmask 格式，供推論 / 評估 / query_main 以 memmap 讀取
+    write_from_dataframe(df, OUTPUT_PATH)
 
 if __name__ == "__main__":
     fetch_entity_attributes()
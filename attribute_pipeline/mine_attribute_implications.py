@@ -1,7 +1,7 @@
 # 使用 Apriori/Association Rule 找出 A → B 關聯
 
 import pandas as pd
-from mlxtend.frequent_patterns import apriori, association_rules
+from Enhanced_RAG.apriori.eclat_miner import mine_rules
 
 INPUT_PATH = "data/entity_attributes.csv"
 OUTPUT_PATH = "data/attr_implications.csv"
@@ -12,19 +12,12 @@ def mine_implications():
     
     # 移除 entity_id 欄位，只保留 0/1 欄位做分析
     df_attrs = df.drop(columns=["entity_id"])
-    df_attrs = df_attrs.astype(bool)  # 必須轉成 bool，apriori 才能處理
+    df_attrs = df_attrs.astype(bool)
 
-    # 套用 Apriori 算法找頻繁屬性組合
-    frequent_itemsets = apriori(df_attrs, min_support=0.01, use_colnames=True)
-
-    # 從頻繁項組導出 association rules（邏輯推論）
-    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=0.8)
-
-    # 過濾掉非單一對單一（只保留 A → B，不要 A,B → C 這種）
-    rules = rules[
-        (rules["antecedents"].apply(lambda x: len(x) == 1)) &
-        (rules["consequents"].apply(lambda x: len(x) == 1))
-    ]
+    # 以 Eclat（屬性 bitset 交集）找頻繁屬性組合並導出 association rules（邏輯推論）
+    # 只保留單一對單一（A → B，不要 A,B → C 這種），因此項目集長度上限為 2
+    rules = mine_rules(onehot=df_attrs, min_support=0.01, min_confidence=0.8,
+                       max_len=2, max_antecedent_len=1, max_consequent_len=1)
 
     # 轉成 dataframe 格式
     results = pd.DataFrame({
@@ -0,0 +1,82 @@
+# 線上屬性推論：載入一次編譯後的屬性閉包（attribute_graph.npz）與實體 bitmask（entity_attributes.masks.npy），
+# 對一批相關實體一次回答「已知屬性 + 推論屬性」，供 query_main.py 與 rag_api.py 的 /rag context 使用
+# 屬性數 m ≤ 16，預先算好 2^m 個 bitmask 的推論結果（查表），每批查詢只剩名稱查找與一次陣列索引
+# 推論規則與批次版 attribute_reasoner.infer_attributes_vectorized 相同：只在 root cluster 內沿遞移閉包推論
+import os
+import threading
+import numpy as np
+from attribute_pipeline.attribute_matrix import load_attribute_matrix, pack_masks, unpack_masks
+from attribute_pipeline.attribute_graph import load_attribute_graph, GRAPH_PATH
+from attribute_pipeline.attribute_reasoner import cluster_mask, infer_matrix, load_clusters, CLUSTER_PATH
+
+ENTITY_ATTR_PATH = "data/entity_attributes.csv"
+
+_reasoner = None
+_lock = threading.Lock()
+
+
+class AttributeReasoner:
+    def __init__(self, entity_attr_path=ENTITY_ATTR_PATH, graph_path=GRAPH_PATH, cluster_path=CLUSTER_PATH):
+        self.matrix = load_attribute_matrix(entity_attr_path)
+        self.graph = load_attribute_graph(graph_path)
+        self.columns = self.matrix.columns
+
+        # 所有可能的已知屬性組合 → 推論出的新屬性（不含已知），與批次推論共用 infer_matrix
+        R = self.graph.reindex(self.graph.closure, self.columns)
+        K = cluster_mask(load_clusters(self.graph, cluster_path), self.columns)
+        all_masks = np.arange(1 << len(self.columns), dtype=np.uint32).astype(np.uint16)
+        known = unpack_masks(all_masks, len(self.columns))
+        self.inferred_table = pack_masks(infer_matrix(known, R, K) & ~known)
+
+    def reason(self, entities):
+        """
+        一次處理一批實體，回傳 [{entity, known, inferred}]（只包含屬性表中找得到的實體，順序與輸入相同）
+        """
+        entities = list(dict.fromkeys(e for e in entities if e))
+        rows, found = self.matrix.rows(entities)
+        if not found:
+            return []
+        masks = np.asarray(self.matrix.masks[rows])
+        inferred = self.inferred_table[masks]
+        return [{
+            "entity": entity,
+            "known": self.matrix.attributes_of_mask(int(k)),
+            "inferred": self.matrix.attributes_of_mask(int(i)),
+        } for entity, k, i in zip(found, masks.tolist(), inferred.tolist())]
+
+
+def format_reasoning(results):
+    return "".join(
+        f"Entity: {r['entity']} | Known: {', '.join(r['known']) or '-'} | Inferred: {', '.join(r['inferred']) or '-'}\n"
+        for r in results
+    )
+
+
+def _artifact_stamp():
+    """屬性圖與實體屬性表的 (路徑, mtime)；檔案不存在時 mtime 為 None"""
+    return tuple((path, os.path.getmtime(path) if os.path.exists(path) else None)
+                 for path in (GRAPH_PATH, ENTITY_ATTR_PATH))
+
+
+def get_attribute_reasoner():
+    """
+    每個 process 共用一個；屬性圖或實體屬性表尚未產生時回傳 None
+    結果（包含找不到檔案的 None）依檔案路徑與 mtime 快取，檔案產生或更新後才重新檢查 / 載入
+    """
+    global _reasoner
+    stamp = _artifact_stamp()
+    cached = _reasoner
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        if _reasoner is None or _reasoner[0] != stamp:
+            reasoner = None
+            if not os.path.exists(GRAPH_PATH):
+                print(f"⚠️ 找不到 {GRAPH_PATH}，略過屬性推論（請先執行 attribute_pipeline.build_attribute_graph）")
+            else:
+                try:
+                    reasoner = AttributeReasoner()
+                except FileNotFoundError as e:
+                    print(f"⚠️ 略過屬性推論：{e}")
+            _reasoner = (stamp, reasoner)
+        return _reasoner[1]
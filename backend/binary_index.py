@@ -0,0 +1,153 @@
+# 本地二階段檢索：1-bit 符號量化碼做 Hamming 粗篩 → memmap float 向量精確重排
+# 768 維向量的碼只有 96 bytes（float32 為 3 KB），碼常駐記憶體，float 向量只讀取候選列
+# 檔案放在 data/collections/<name>/binary_index/：
+#   codes.npy      uint8 (n, dim / 8)，(vector - mean) > 0 的 packbits
+#   vectors.npy    float32 (n, dim)，重排用，以 memmap 讀取
+#   ids.npy        int64 (n,)，對應的 Milvus primary key
+#   relations.npy  uint8 (n,)，relation_type 在 meta.json "relations" 的索引，用於 partition 等價的過濾
+#   mean.npy       float32 (dim,)，量化前先減去平均向量（樣板化句子的向量高度集中，不置中時大多數位元相同）
+#   meta.json      {"dim", "metric_type", "relations", "rows", "source_version"}
+#                  source_version 為建置時 primary key 集合的版本；與目前 side table 不同代表 collection 已同步過，索引停用
+import os
+import json
+import shutil
+import threading
+import numpy as np
+from backend.milvus_connection import collection_artifact_dir
+from backend.side_table import load_side_table, ids_version
+
+BINARY_INDEX_DIR = "binary_index"
+DEFAULT_CANDIDATES = 200   # Hamming 粗篩保留的候選數，之後以 float 向量重排
+SCAN_CHUNK = 1 << 18       # 每次計算 Hamming 距離的列數，限制暫存記憶體
+
+# 0..255 每個 byte 的 1 位元數（numpy<2 沒有 bitwise_count）
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def binary_index_path(collection_name):
+    return os.path.join(collection_artifact_dir(collection_name), BINARY_INDEX_DIR)
+
+
+def quantize(vectors, mean):
+    """float 向量 → packbits 符號碼"""
+    return np.packbits(np.asarray(vectors, dtype=np.float32) - mean > 0, axis=-1)
+
+
+def build_binary_index(collection_name, ids, vectors, relation_types, metric_type="IP"):
+    """
+    寫出二階段檢索索引（先寫到暫存資料夾再整個替換）
+    - ids / vectors / relation_types: 三者逐列對齊
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    relations = sorted(set(relation_types))
+    relation_index = {r: i for i, r in enumerate(relations)}
+    mean = vectors.mean(axis=0).astype(np.float32)
+
+    path = binary_index_path(collection_name)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "codes.npy"), quantize(vectors, mean))
+    np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+    np.save(os.path.join(tmp_path, "ids.npy"), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "relations.npy"),
+            np.fromiter((relation_index[r] for r in relation_types), dtype=np.uint8, count=len(relation_types)))
+    np.save(os.path.join(tmp_path, "mean.npy"), mean)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"dim": int(vectors.shape[1]), "metric_type": metric_type,
+                   "relations": relations, "rows": int(len(vectors)),
+                   "source_version": ids_version(ids)}, f, ensure_ascii=False)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"💾 已寫出 binary index：{path}（{len(vectors)} 筆，每筆 {vectors.shape[1] // 8} bytes）")
+
+
+class BinaryIndex:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.codes = np.load(os.path.join(path, "codes.npy"))  # 常駐記憶體
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.relations = np.load(os.path.join(path, "relations.npy"))
+        self.mean = np.load(os.path.join(path, "mean.npy"))
+        self.metric_type = self.meta["metric_type"]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def relation_mask(self, relations):
+        """None 代表不過濾；指定的 relation 都不在索引內時回傳全 False（與 Milvus 的 relation_type in [...] 一樣查無結果）"""
+        if not relations:
+            return None
+        wanted = [i for i, r in enumerate(self.meta["relations"]) if r in relations]
+        return np.isin(self.relations, wanted)
+
+    def hamming_candidates(self, query_vector, candidates, mask=None):
+        """回傳 Hamming 距離最小的 candidates 個列號"""
+        q = quantize(query_vector, self.mean)
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_dist = np.zeros(0, dtype=np.int32)
+        for start in range(0, len(self.codes), SCAN_CHUNK):
+            dist = POPCOUNT[np.bitwise_xor(self.codes[start:start + SCAN_CHUNK], q)].sum(axis=1, dtype=np.int32)
+            rows = np.arange(start, start + len(dist), dtype=np.int64)
+            if mask is not None:
+                keep = mask[start:start + len(dist)]
+                dist, rows = dist[keep], rows[keep]
+            dist = np.concatenate([best_dist, dist])
+            rows = np.concatenate([best_rows, rows])
+            if len(dist) > candidates:
+                top = np.argpartition(dist, candidates)[:candidates]
+                dist, rows = dist[top], rows[top]
+            best_dist, best_rows = dist, rows
+        return np.sort(best_rows)
+
+    def rerank(self, query_vector, rows, top_k):
+        """以 float 向量精確計分，回傳 (primary keys, scores)；IP 越大越好，L2 越小越好"""
+        if not len(rows):
+            return [], []
+        candidates = np.asarray(self.vectors[rows], dtype=np.float32)
+        q = np.asarray(query_vector, dtype=np.float32)
+        if self.metric_type == "L2":
+            scores = ((candidates - q) ** 2).sum(axis=1)
+            order = np.argsort(scores)[:top_k]
+        else:
+            scores = candidates @ q
+            order = np.argsort(-scores)[:top_k]
+        return self.ids[rows[order]].tolist(), scores[order].tolist()
+
+    def search(self, query_vector, top_k=5, candidates=DEFAULT_CANDIDATES, relations=None):
+        rows = self.hamming_candidates(query_vector, max(candidates, top_k), self.relation_mask(relations))
+        return self.rerank(query_vector, rows, top_k)
+
+    def exact_search(self, query_vector, top_k=5):
+        """全表精確搜尋（recall 評估用的 ground truth）"""
+        return self.rerank(query_vector, np.arange(len(self), dtype=np.int64), top_k)
+
+
+def load_binary_index(collection_name):
+    """
+    取得 binary index（檔案重寫後自動重新載入）；不存在或已過期時回傳 None，檢索端改走 Milvus
+    過期：建置後 collection 又經過 sync（side table 的 primary key 版本與索引不同），請重新執行 build_binary_index
+    """
+    path = binary_index_path(collection_name)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    table = load_side_table(collection_name)
+    stamp = (os.path.getmtime(meta_path), table.version if table is not None else None)
+    with _lock:
+        cached = _indexes.get(collection_name)
+        if cached is None or cached[0] != stamp:
+            index = BinaryIndex(path)
+            if table is not None and index.meta.get("source_version") != table.version:
+                print(f"⚠️ {collection_name} 的 binary index 已過期（collection 在建置後又同步過），"
+                      f"改用 Milvus 檢索；請重新執行 scripts/build_binary_index.py")
+                index = None
+            cached = (stamp, index)
+            _indexes[collection_name] = cached
+        return cached[1]
@@ -0,0 +1,139 @@
+# Blue/green 版本化 collection：新版本建在 <alias>_v{n}，驗證完成後以 Milvus alias 原子切換
+# 讀取端一律使用 alias 名稱（例如 collection_text），不會看到未載入或寫到一半的 collection
+# 版本紀錄存於 data/collections/<alias>/versions.json：{"current", "versions": [{"name", "created_at", "retired_at"}]}
+import os
+import re
+import json
+import time
+import shutil
+from pymilvus import utility
+from backend.milvus_connection import collection_artifact_dir
+from backend.search_registry import load_registry, save_registry_entry, VERSIONS_FILE
+
+DEFAULT_GRACE_HOURS = 24  # 舊版本切換後保留的時間，期間可直接切回
+
+
+def versions_path(alias):
+    return os.path.join(collection_artifact_dir(alias), VERSIONS_FILE)
+
+
+def load_versions(alias):
+    path = versions_path(alias)
+    if not os.path.exists(path):
+        return {"current": None, "versions": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_versions(alias, state):
+    path = versions_path(alias)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def version_collections(alias):
+    """Milvus 內所有 <alias>_v{n}，依版本號排序"""
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    found = []
+    for name in utility.list_collections():
+        match = pattern.match(name)
+        if match:
+            found.append((int(match.group(1)), name))
+    return [name for _, name in sorted(found)]
+
+
+def next_version_name(alias):
+    existing = version_collections(alias) + [v["name"] for v in load_versions(alias)["versions"]]
+    numbers = [int(name.rsplit("_v", 1)[1]) for name in existing]
+    return f"{alias}_v{max(numbers, default=0) + 1}"
+
+
+def alias_target(alias):
+    """alias 目前指向的 collection；alias 不存在時回傳 None"""
+    for name in version_collections(alias):
+        if alias in utility.list_aliases(name):
+            return name
+    return None
+
+
+def copy_artifacts(src_name, alias):
+    """
+    將新版本的本地附屬檔案（fingerprint、side table、binary index…）複製到 alias 資料夾
+    檢索端以 collection.name（即 alias）尋找附屬檔案；versions.json 保留不覆蓋
+    """
+    src = collection_artifact_dir(src_name)
+    dest = collection_artifact_dir(alias)
+    for entry in os.listdir(src):
+        if entry == VERSIONS_FILE or entry.endswith(".tmp"):
+            continue
+        src_path, dest_path = os.path.join(src, entry), os.path.join(dest, entry)
+        tmp_path = dest_path + ".tmp"
+        if os.path.isdir(src_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            shutil.copytree(src_path, tmp_path)
+            shutil.rmtree(dest_path, ignore_errors=True)
+        else:
+            shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+
+
+def switch_alias(alias, name, drop_physical=False):
+    """
+    把 alias 指向 name（已驗證、已載入的新版本）
+    - 第一次遷移時同名的實體 collection 仍存在，alias 不能與之同名；需 drop_physical=True 先刪除（短暫不可用）
+    """
+    previous = alias_target(alias)
+    if previous is None and alias in utility.list_collections():
+        if not drop_physical:
+            raise RuntimeError(f"{alias} 目前是實體 collection，第一次切換到 alias 需加上 --migrate（會先刪除舊 collection）")
+        utility.drop_collection(alias)
+        print(f"🗑️ 已刪除實體 collection {alias}，改由 alias 提供服務")
+
+    copy_artifacts(name, alias)
+    registry = load_registry()
+    if name in registry:
+        save_registry_entry(alias, {k: v for k, v in registry[name].items() if k != "updated_at"})
+
+    if previous is None:
+        utility.create_alias(collection_name=name, alias=alias)
+    else:
+        utility.alter_alias(collection_name=name, alias=alias)
+    print(f"🔀 alias {alias}：{previous or '(無)'} → {name}")
+
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    state = load_versions(alias)
+    known = {v["name"] for v in state["versions"]}
+    if name not in known:
+        state["versions"].append({"name": name, "created_at": now, "retired_at": None})
+    for v in state["versions"]:
+        if v["name"] == name:
+            v["retired_at"] = None
+        elif v["name"] == previous:
+            v["retired_at"] = now
+    state["current"] = name
+    save_versions(alias, state)
+    return previous
+
+
+def garbage_collect(alias, grace_hours=DEFAULT_GRACE_HOURS, dry_run=False):
+    """刪除退役超過 grace_hours 的舊版本（目前版本永遠保留），回傳刪除的名稱"""
+    state = load_versions(alias)
+    cutoff = time.time() - grace_hours * 3600
+    dropped = []
+    for v in state["versions"]:
+        if v["name"] == state["current"] or not v["retired_at"]:
+            continue
+        if time.mktime(time.strptime(v["retired_at"], "%Y-%m-%d %H:%M:%S")) > cutoff:
+            continue
+        print(f"🧹 {'(dry run) ' if dry_run else ''}刪除舊版本 {v['name']}（退役於 {v['retired_at']}）")
+        if not dry_run:
+            if utility.has_collection(v["name"]):
+                utility.drop_collection(v["name"])
+            shutil.rmtree(collection_artifact_dir(v["name"]), ignore_errors=True)
+        dropped.append(v["name"])
+    if not dry_run and dropped:
+        state["versions"] = [v for v in state["versions"] if v["name"] not in dropped]
+        save_versions(alias, state)
+    return dropped
@@ -0,0 +1,32 @@
+# 欄位式字串儲存：所有字串 UTF-8 串接成一個 blob，另存 offsets，讀取時以 memmap 只解碼用到的字串
+#   <prefix>.blob          UTF-8 串接
+#   <prefix>.offsets.npy   int64，長度 n + 1，第 i 筆字串為 blob[offsets[i]:offsets[i + 1]]
+# 純 numpy 實作，side table（backend/side_table.py）與 Apriori 三元組索引共用
+import numpy as np
+
+
+def write_string_column(prefix, values):
+    """將字串清單寫成 <prefix>.blob + <prefix>.offsets.npy"""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(prefix + ".blob", "wb") as f:
+        for i, value in enumerate(values):
+            data = (value or "").encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    np.save(prefix + ".offsets.npy", offsets)
+
+
+class StringColumn:
+    """以 memmap 讀取 write_string_column 寫出的欄位，只解碼實際用到的字串"""
+
+    def __init__(self, prefix):
+        self.offsets = np.load(prefix + ".offsets.npy", mmap_mode="r")
+        size = int(self.offsets[-1])
+        self.blob = np.memmap(prefix + ".blob", dtype=np.uint8, mode="r") if size else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
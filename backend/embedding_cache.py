@@ -0,0 +1,206 @@
+# 以內容定址（model, revision, text hash）的本地向量快取，所有建索引腳本共用
+# 目錄結構：data/embedding_cache/<model>@<revision>/
+#   - meta.json   : {"model", "revision", "dim", "dtype"}
+#   - vectors.bin : append-only 的 float32 / float16 向量（可 memory-map）
+#   - index.tsv   : 每行「text hash \t 列號」，與 vectors.bin 同步 append
+#   - .lock       : append 時的跨 process 檔案鎖
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，退回單一 process 使用
+    fcntl = None
+
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "embedding_cache")
+DEFAULT_REVISION = "main"  # 模型升級時請更換 revision，舊向量就不會被誤用
+
+
+class EmbeddingCache:
+    def __init__(self, model_name, model_revision=DEFAULT_REVISION, cache_root=CACHE_ROOT, dtype="float32"):
+        self.model_name = model_name
+        self.model_revision = model_revision
+        self.dir = os.path.join(cache_root, f"{model_name.replace('/', '__')}@{model_revision}")
+        os.makedirs(self.dir, exist_ok=True)
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.vectors_path = os.path.join(self.dir, "vectors.bin")
+        self.index_path = os.path.join(self.dir, "index.tsv")
+
+        self.dim = None
+        self.dtype = np.dtype(dtype)
+        self._load_meta()
+
+        self.index = {}
+        self._index_pos = 0  # index.tsv 已讀到的位置，append 前補讀其他 process 新增的列
+        self._mmap = None
+        self.hits = 0
+        self.misses = 0
+        self.lock_path = os.path.join(self.dir, ".lock")
+        with self._locked():
+            self._recover()
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim = meta["dim"]
+            self.dtype = np.dtype(meta["dtype"])
+
+    @contextmanager
+    def _locked(self):
+        """跨 process 的寫入鎖：prepare_text_embeddings 與 rebuild_collection_text 可能同時寫同一份快取"""
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _row_bytes(self):
+        return self.dim * self.dtype.itemsize
+
+    def _stored_rows(self):
+        """vectors.bin 內完整寫入的列數"""
+        return os.path.getsize(self.vectors_path) // self._row_bytes() if os.path.exists(self.vectors_path) else 0
+
+    # === 讀取 ===
+    def _read_index(self, stored_rows):
+        """從上次讀到的位置往下讀 index.tsv，回傳指向不存在列的筆數"""
+        if not os.path.exists(self.index_path):
+            return 0
+        invalid = 0
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 寫到一半的最後一行，下次再讀
+                self._index_pos += len(line)
+                parts = line.decode("utf-8").rstrip("\n").split("\t")
+                if len(parts) != 2:
+                    continue
+                row = int(parts[1])
+                if row < stored_rows:
+                    self.index[parts[0]] = row
+                else:
+                    invalid += 1
+        return invalid
+
+    def _recover(self):
+        """
+        開啟時修復中斷的 append（需持有寫入鎖）：
+        - index.tsv 指向不存在的列 → 重寫 index，避免之後 append 的向量被舊 key 誤認
+        - vectors.bin 尾端沒有 index 對應的孤兒列或半列 → 截斷，新資料的列號才會與 index 對齊
+        """
+        if self.dim is None:
+            return
+        stored_rows = self._stored_rows()
+        invalid = self._read_index(stored_rows)
+        keep_rows = max(self.index.values()) + 1 if self.index else 0
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > keep_rows * self._row_bytes():
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(keep_rows * self._row_bytes())
+            print(f"🧹 Embedding cache：截斷 {stored_rows - keep_rows} 筆中斷寫入留下的向量")
+        partial_tail = os.path.exists(self.index_path) and self._index_pos != os.path.getsize(self.index_path)
+        if invalid or partial_tail:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for k, row in self.index.items():
+                    f.write(f"{k}\t{row}\n")
+            os.replace(tmp_path, self.index_path)
+            self._index_pos = os.path.getsize(self.index_path)
+
+    def _vectors(self, max_row=-1):
+        """memory-map 向量檔；需要的列超出目前映射範圍（append 後）才依檔案大小重新映射"""
+        if self._mmap is None or self._mmap.shape[0] <= max_row:
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode="r",
+                                   shape=(self._stored_rows(), self.dim))
+        return self._mmap
+
+    def key(self, text):
+        payload = "\x1f".join([self.model_name, self.model_revision, text])
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    # === 寫入（append-only） ===
+    def _append(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        with self._locked():
+            if self.dim is None:
+                self._load_meta()  # 其他 process 可能已先建立快取
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "revision": self.model_revision,
+                               "dim": self.dim, "dtype": self.dtype.name}, f)
+            # 其他 process 可能已寫入相同的 key，補讀後只 append 仍缺少的部分
+            self._read_index(self._stored_rows())
+            todo = [i for i, k in enumerate(keys) if k not in self.index]
+            if not todo:
+                return
+            start = self._stored_rows()
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors[todo].tobytes())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{keys[i]}\t{start + offset}\n" for offset, i in enumerate(todo)))
+            for offset, i in enumerate(todo):
+                self.index[keys[i]] = start + offset
+            self._index_pos = os.path.getsize(self.index_path)
+
+    # === 批次查詢 / 計算 ===
+    def get_or_compute(self, texts, encode_fn, batch_size=64, show_progress_bar=False):
+        """
+        回傳 (len(texts), dim) 的 float32 向量；未命中的文字去重後才交給 encode_fn 計算並寫回快取
+        - encode_fn: 例如 SentenceTransformer.encode
+        """
+        keys = [self.key(t) for t in texts]
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in self.index and k not in missing:
+                missing[k] = t
+        miss_count = sum(1 for k in keys if k in missing)
+        self.misses += miss_count
+        self.hits += len(keys) - miss_count
+
+        if missing:
+            new_vectors = np.asarray(encode_fn(list(missing.values()), batch_size=batch_size,
+                                               show_progress_bar=show_progress_bar), dtype=np.float32)
+            self._append(list(missing.keys()), new_vectors)
+
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        rows = np.fromiter((self.index[k] for k in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self._vectors(int(rows.max()))[rows], dtype=np.float32)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "stored": len(self.index)
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"📦 Embedding cache {self.model_name}@{self.model_revision}: "
+              f"命中 {s['hits']} / 未命中 {s['misses']}（hit rate {s['hit_rate']:.1%}），共儲存 {s['stored']} 筆")
+
+
+_caches = {}
+
+def get_embedding_cache(model_name, model_revision=DEFAULT_REVISION):
+    """同一個 process 共用同一份快取實例"""
+    key = (model_name, model_revision)
+    if key not in _caches:
+        _caches[key] = EmbeddingCache(model_name, model_revision)
+    return _caches[key]
+
+
+def encode_with_cache(model, texts, model_name, model_revision=DEFAULT_REVISION, batch_size=64, show_progress_bar=False):
+    """SentenceTransformer.encode 的快取版本，回傳 float32 numpy 陣列"""
+    cache = get_embedding_cache(model_name, model_revision)
+    return cache.get_or_compute(texts, model.encode, batch_size=batch_size, show_progress_bar=show_progress_bar)
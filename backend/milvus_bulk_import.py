@@ -0,0 +1,124 @@
+# Milvus 檔案式 bulk import：把欄位寫成 NumPy 檔 → 上傳到 MinIO → 觸發 do_bulk_insert → 輪詢直到完成
+# NumPy 格式：每個 import task 一個資料夾，每個欄位一個 <field_name>.npy（auto_id 的主鍵不需提供）
+import os
+import time
+import shutil
+import numpy as np
+from pymilvus import utility, BulkInsertState
+
+# docker-compose.yml 內 MinIO 的設定，Milvus 預設使用 a-bucket
+MINIO_ENDPOINT = "localhost:9000"
+MINIO_ACCESS_KEY = "minioadmin"
+MINIO_SECRET_KEY = "minioadmin"
+MINIO_BUCKET = "a-bucket"
+
+STAGING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bulk_staging")
+ROWS_PER_FILE = 100000  # 每個 import task 的筆數
+
+
+def write_numpy_files(out_dir, columns):
+    """
+    將 {欄位名稱: 資料} 寫成 Milvus 可讀取的 .npy 檔，回傳檔案路徑清單
+    - VARCHAR 欄位：list[str] → numpy unicode 陣列
+    - FLOAT_VECTOR 欄位：2-D float32 陣列
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for field, values in columns.items():
+        if isinstance(values, np.ndarray) and values.ndim == 2:
+            array = np.ascontiguousarray(values, dtype=np.float32)
+        else:
+            array = np.array(list(values), dtype=str)
+        path = os.path.join(out_dir, f"{field}.npy")
+        np.save(path, array)
+        paths.append(path)
+    return paths
+
+
+def write_import_chunks(name, columns, rows_per_file=ROWS_PER_FILE, staging_dir=STAGING_DIR):
+    """依 rows_per_file 切成多個 task 資料夾，回傳 [[file, ...], ...]"""
+    total = len(next(iter(columns.values())))
+    chunks = []
+    for i, start in enumerate(range(0, total, rows_per_file)):
+        out_dir = os.path.join(staging_dir, name, f"part_{i:05d}")
+        chunk = {field: values[start:start + rows_per_file] for field, values in columns.items()}
+        chunks.append(write_numpy_files(out_dir, chunk))
+    print(f"📝 {name}: 已寫出 {total} 筆 / {len(chunks)} 個 import 檔案組")
+    return chunks
+
+
+class MinioStager:
+    """上傳到 docker-compose 內的 MinIO（Milvus 的 object storage）"""
+
+    def __init__(self, endpoint=MINIO_ENDPOINT, access_key=MINIO_ACCESS_KEY,
+                 secret_key=MINIO_SECRET_KEY, bucket=MINIO_BUCKET):
+        try:
+            from minio import Minio
+        except ImportError:
+            raise ImportError("bulk import 需要 minio 套件：pip install minio")
+        self.client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=False)
+        self.bucket = bucket
+        if not self.client.bucket_exists(bucket):
+            self.client.make_bucket(bucket)
+
+    def stage(self, files, prefix):
+        keys = []
+        for path in files:
+            key = f"bulk_import/{prefix}/{os.path.basename(path)}"
+            self.client.fput_object(self.bucket, key, path)
+            keys.append(key)
+        return keys
+
+
+class LocalStager:
+    """本地替代：複製到指定資料夾（Milvus 使用 local storage 或離線檢查檔案時使用）"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def stage(self, files, prefix):
+        keys = []
+        for path in files:
+            key = f"bulk_import/{prefix}/{os.path.basename(path)}"
+            dest = os.path.join(self.root, key)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(path, dest)
+            keys.append(key)
+        return keys
+
+
+def wait_for_import(task_id, poll_interval=2.0, timeout=3600):
+    """輪詢 bulk insert 狀態，完成回傳匯入筆數，失敗或逾時則拋出例外"""
+    start = time.time()
+    while True:
+        state = utility.get_bulk_insert_state(task_id=task_id)
+        if state.state == BulkInsertState.ImportCompleted:
+            return state.row_count
+        if state.state in (BulkInsertState.ImportFailed, BulkInsertState.ImportFailedAndCleaned):
+            raise RuntimeError(f"bulk import task {task_id} 失敗：{state.failed_reason}")
+        if time.time() - start > timeout:
+            raise TimeoutError(f"bulk import task {task_id} 超過 {timeout} 秒仍未完成")
+        print(f"   ⏳ task {task_id}: {state.state_name} {state.progress}%")
+        time.sleep(poll_interval)
+
+
+def bulk_import_columns(collection_name, columns, stager=None, partition_name=None, rows_per_file=ROWS_PER_FILE):
+    """
+    一次完成：寫 NumPy 檔 → stage → do_bulk_insert → 等待完成
+    - columns: {欄位名稱: 資料}，需涵蓋 schema 內除 auto_id 主鍵以外的所有欄位
+    """
+    stager = stager or MinioStager()
+    staging_name = collection_name if partition_name is None else f"{collection_name}/{partition_name}"
+    chunks = write_import_chunks(staging_name, columns, rows_per_file=rows_per_file)
+
+    task_ids = []
+    for i, files in enumerate(chunks):
+        keys = stager.stage(files, f"{staging_name}/part_{i:05d}")
+        task_id = utility.do_bulk_insert(collection_name=collection_name, files=keys,
+                                         partition_name=partition_name)
+        task_ids.append(task_id)
+        print(f"🚚 已送出 bulk import task {task_id}（{len(keys)} 個檔案）")
+
+    imported = sum(wait_for_import(task_id) for task_id in task_ids)
+    print(f"✅ {staging_name}: bulk import 完成，共 {imported} 筆")
+    return imported
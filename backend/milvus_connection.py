@@ -1,4 +1,6 @@
-from pymilvus import Collection, FieldSchema, CollectionSchema, DataType, connections
+import os
+import json
+from pymilvus import Collection, FieldSchema, CollectionSchema, DataType, connections, utility
 
 # Milvus 伺服器連線資訊
 #MILVUS_HOST = "172.23.165.70"  # 本機 WSL IP
@@ -7,6 +9,55 @@ MILVUS_HOST = "localhost"
 MILVUS_PORT = "19530"
 COLLECTION_NAME = "primekg_rag_paths"
 
+# 每個 collection 的本地附屬檔案（fingerprint、side table 等）統一放在 data/collections/<name>/
+ARTIFACT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "collections")
+
+# === 索引設定檔（index profile） ===
+# create_collection / create_kge_collection 以名稱選用；search_params 為該索引建議的預設搜尋參數
+INDEX_PROFILES = {
+    "flat": {"index_type": "FLAT", "params": {}, "search_params": {}},
+    "ivf_flat": {"index_type": "IVF_FLAT", "params": {"nlist": 1024}, "search_params": {"nprobe": 16}},
+    "ivf_sq8": {"index_type": "IVF_SQ8", "params": {"nlist": 1024}, "search_params": {"nprobe": 16}},
+    "ivf_pq": {"index_type": "IVF_PQ", "params": {"nlist": 1024, "nbits": 8}, "search_params": {"nprobe": 16}},
+    "hnsw": {"index_type": "HNSW", "params": {"M": 16, "efConstruction": 200}, "search_params": {"ef": 64}},
+}
+DEFAULT_INDEX_PROFILE = "ivf_flat"
+# collection_text 的純量倒排索引：讓 source_name / target_name / relation_type 的過濾條件不需掃描全表
+TEXT_SCALAR_INDEX_FIELDS = ["source_name", "target_name", "relation_type"]
+# scripts/benchmark_milvus_index.py 量測後寫入的建議設定：{collection 名稱: profile 名稱}
+RECOMMENDED_PROFILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "milvus_index_profiles.json")
+
+def resolve_index_profile(name, index_profile=None):
+    """ 取得 profile 名稱；"recommended" 會讀取 benchmark 的建議結果，找不到則用預設 """
+    if index_profile in (None, "recommended"):
+        recommended = None
+        if index_profile == "recommended" and os.path.exists(RECOMMENDED_PROFILE_PATH):
+            with open(RECOMMENDED_PROFILE_PATH, "r", encoding="utf-8") as f:
+                recommended = json.load(f).get(name)
+        return recommended or DEFAULT_INDEX_PROFILE
+    if index_profile not in INDEX_PROFILES:
+        raise ValueError(f"未知的 index profile：{index_profile}（可用：{', '.join(INDEX_PROFILES)}）")
+    return index_profile
+
+def build_index_params(index_profile, metric_type, dim):
+    """ 將 profile 轉成 create_index 使用的 index_params """
+    profile = INDEX_PROFILES[index_profile]
+    params = dict(profile["params"])
+    if profile["index_type"] == "IVF_PQ":
+        # m 必須整除向量維度，取不超過 dim / 8 的最大因數
+        params["m"] = max(m for m in range(1, max(dim // 8, 1) + 1) if dim % m == 0)
+    return {"metric_type": metric_type, "index_type": profile["index_type"], "params": params}
+
+def ensure_scalar_indexes(collection, fields=TEXT_SCALAR_INDEX_FIELDS):
+    """ 為 VARCHAR 欄位建立 INVERTED 索引（已存在則略過），既有 collection 也可直接呼叫補建 """
+    existing = {index.field_name for index in collection.indexes}
+    for field in fields:
+        if field in existing:
+            continue
+        collection.create_index(field_name=field, index_name=f"{field}_inverted",
+                                index_params={"index_type": "INVERTED"})
+        print(f"Milvus Collection '{collection.name}' 已建立 {field} 倒排索引")
+
 def connect_milvus():
     """ 連線 Milvus 伺服器 """
     connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT)
@@ -18,13 +69,14 @@ def check_connection():
     print("Milvus 連接狀態:", status)
     return status
 
-def create_collection(name=COLLECTION_NAME, dim=768):
+def create_collection(name=COLLECTION_NAME, dim=768, index_profile=None, metric_type="IP"):
     """
     自製化建立 Milvus Collection
     - name: Collection 名稱
     - dim: 向量縮小維度 (e.g., 768 for NLP, 50 for KGE)
+    - index_profile: INDEX_PROFILES 的名稱，或 "recommended"（使用 benchmark 建議），預設 ivf_flat
     """
-    if name == "collection_text":
+    if name.startswith("collection_text"):  # 含 collection_text_pca128 等降維 / 版本化 sibling
         fields = [
             FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
             FieldSchema(name="source_name", dtype=DataType.VARCHAR, max_length=255),
@@ -57,14 +109,14 @@ def create_collection(name=COLLECTION_NAME, dim=768):
     collection = Collection(name=name, schema=schema)
     print(f"Milvus Collection '{name}' 已建立")
 
+    index_profile = resolve_index_profile(name, index_profile)
     collection.create_index(
         field_name="embedding",
-        index_params={
-            "metric_type": "IP",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 1024}
-        }
+        index_params=build_index_params(index_profile, metric_type, dim)
     )
+    print(f"Milvus Collection '{name}' 使用 index profile：{index_profile}")
+    if name.startswith("collection_text"):
+        ensure_scalar_indexes(collection)
     return collection
 
 def get_collection():
@@ -78,13 +130,31 @@ def get_collection():
         collection = Collection(name=COLLECTION_NAME)
     return collection
 
+def collection_artifact_dir(name):
+    """ 取得 collection 對應的本地附屬檔案資料夾（不存在則建立） """
+    path = os.path.join(ARTIFACT_ROOT, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def wait_until_loaded(collection):
+    """建索引 → load → 確認所有 segment 都已載入（bulk import 之後 query 之前需要）"""
+    utility.wait_for_index_building_complete(collection.name)
+    collection.load()
+    utility.wait_for_loading_complete(collection.name)
+    progress = utility.loading_progress(collection.name)
+    print(f"⏳ {collection.name} 載入進度：{progress.get('loading_progress')}")
+
+def count_rows(collection):
+    """以 count(*) 取得實際筆數（num_entities 在 compaction 前仍會計入已刪除的資料）；collection 需已載入"""
+    return collection.query(expr="", output_fields=["count(*)"])[0]["count(*)"]
+
 def close_milvus():
     """ 關閉 Milvus 連線 """
     connections.disconnect("default")
     print("🔌 Milvus 連線已關閉")
 
 
-def create_kge_collection(name="collection_kge", dim=50):
+def create_kge_collection(name="collection_kge", dim=50, index_profile=None, metric_type="L2"):
     fields = [
         FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
         FieldSchema(name="entity_name", dtype=DataType.VARCHAR, max_length=255),
@@ -94,7 +164,7 @@ def create_kge_collection(name="collection_kge", dim=50):
     collection = Collection(name=name, schema=schema)
     collection.create_index(
         field_name="embedding",
-        index_params={"metric_type": "L2", "index_type": "IVF_FLAT", "params": {"nlist": 1024}}
+        index_params=build_index_params(resolve_index_profile(name, index_profile), metric_type, dim)
     )
     return collection
 
@@ -0,0 +1,159 @@
+# Milvus collection 健康 / 資源檢查：索引、metric、segment、載入狀態、記憶體估計與設定不一致
+# 供 scripts/milvus_health.py（命令列）與 rag_api.py 的 /milvus/health 共用
+import os
+import json
+from pymilvus import Collection, utility
+from backend.milvus_connection import RECOMMENDED_PROFILE_PATH, INDEX_PROFILES, count_rows
+from backend.search_registry import load_registry, get_search_param
+from backend.side_table import load_side_table
+from backend.projection import load_projection
+
+# common.proto 的 SegmentState
+SEGMENT_STATES = {0: "None", 1: "NotExist", 2: "Growing", 3: "Sealed", 4: "Flushed", 5: "Flushing", 6: "Dropped", 7: "Importing"}
+SEALED_STATES = {"Sealed", "Flushed", "Flushing"}
+
+GROWING_RATIO_WARN = 0.1      # growing segment 的資料比例超過此值 → 建議 flush（growing 只能暴力搜尋）
+SMALL_SEGMENT_ROWS = 10000    # sealed segment 低於此筆數視為小 segment
+SMALL_SEGMENT_COUNT_WARN = 8  # 小 segment 過多 → 建議 compaction
+
+
+def vector_field(collection):
+    return next(f for f in collection.schema.fields if f.dtype.name.endswith("VECTOR"))
+
+
+def index_summary(collection):
+    indexes = []
+    for index in collection.indexes:
+        params = dict(index.params)
+        entry = {
+            "field": index.field_name,
+            "index_name": index.index_name,
+            "index_type": params.get("index_type"),
+            "metric_type": params.get("metric_type"),
+            "params": params.get("params", {}),
+        }
+        try:
+            progress = utility.index_building_progress(collection.name, index_name=index.index_name)
+            entry["indexed_rows"] = progress.get("indexed_rows")
+            entry["total_rows"] = progress.get("total_rows")
+            entry["pending_rows"] = progress.get("pending_index_rows", progress["total_rows"] - progress["indexed_rows"])
+        except Exception as e:
+            entry["progress_error"] = str(e)
+        indexes.append(entry)
+    return indexes
+
+
+def segment_summary(collection, loaded):
+    persistent = utility.get_persistent_segment_infos(collection.name)
+    states = {}
+    for s in persistent:
+        state = SEGMENT_STATES.get(int(s.state), str(s.state))
+        states.setdefault(state, {"count": 0, "rows": 0})
+        states[state]["count"] += 1
+        states[state]["rows"] += int(s.num_rows)
+
+    summary = {"persistent": states, "query": None}
+    if loaded:
+        query = utility.get_query_segment_info(collection.name)
+        growing = [s for s in query if SEGMENT_STATES.get(int(s.state)) == "Growing"]
+        sealed = [s for s in query if SEGMENT_STATES.get(int(s.state)) in SEALED_STATES]
+        summary["query"] = {
+            "segments": len(query),
+            "growing": len(growing),
+            "growing_rows": sum(int(s.num_rows) for s in growing),
+            "sealed": len(sealed),
+            "sealed_rows": sum(int(s.num_rows) for s in sealed),
+            "small_sealed": sum(1 for s in sealed if int(s.num_rows) < SMALL_SEGMENT_ROWS),
+            "mem_size_bytes": sum(int(getattr(s, "mem_size", 0)) for s in query),
+            "sizes": sorted((int(s.num_rows) for s in query), reverse=True),
+        }
+    return summary
+
+
+def estimate_memory(collection, num_rows):
+    """未載入時以 schema 粗估：向量 dim * 4 bytes，VARCHAR 以 max_length 的一半估計"""
+    total = 0
+    for f in collection.schema.fields:
+        if f.dtype.name == "FLOAT_VECTOR":
+            total += f.params["dim"] * 4
+        elif f.dtype.name == "VARCHAR":
+            total += f.params.get("max_length", 0) // 2
+        else:
+            total += 8
+    return total * num_rows
+
+
+def find_issues(collection, report):
+    issues = []
+    vec = vector_field(collection)
+    vec_index = next((i for i in report["indexes"] if i["field"] == vec.name), None)
+    if vec_index is None:
+        issues.append(f"{vec.name} 沒有向量索引，搜尋為暴力掃描")
+    else:
+        search_metric = get_search_param(collection)["metric_type"]
+        if vec_index["metric_type"] and search_metric != vec_index["metric_type"]:
+            issues.append(f"索引 metric 為 {vec_index['metric_type']}，但搜尋參數使用 {search_metric}")
+        entry = load_registry().get(collection.name)
+        if entry and entry.get("index_type") and entry["index_type"] != vec_index["index_type"]:
+            issues.append(f"registry 的調校結果針對 {entry['index_type']}，目前索引為 {vec_index['index_type']}，請重新執行 tune_search_params")
+        if os.path.exists(RECOMMENDED_PROFILE_PATH):
+            with open(RECOMMENDED_PROFILE_PATH, "r", encoding="utf-8") as f:
+                recommended = json.load(f).get(collection.name)
+            if recommended and INDEX_PROFILES[recommended]["index_type"] != vec_index["index_type"]:
+                issues.append(f"benchmark 建議 {recommended}，目前索引為 {vec_index['index_type']}")
+        if vec_index.get("pending_rows"):
+            issues.append(f"尚有 {vec_index['pending_rows']} 筆未建索引（索引建置中）")
+
+    if report["load_state"] != "Loaded":
+        issues.append(f"collection 未載入（{report['load_state']}），搜尋會失敗")
+
+    # num_entities 在 compaction 前仍計入已刪除的資料，比例與筆數比對改用 count(*) 的實際筆數（需已載入）
+    live_rows = report["live_rows"]
+    query = report["segments"]["query"]
+    if query and live_rows:
+        if query["growing_rows"] / live_rows > GROWING_RATIO_WARN:
+            issues.append(f"growing segment 有 {query['growing_rows']} 筆（只能暴力搜尋），建議 flush")
+        if query["small_sealed"] >= SMALL_SEGMENT_COUNT_WARN:
+            issues.append(f"{query['small_sealed']} 個小於 {SMALL_SEGMENT_ROWS} 筆的 sealed segment，建議 compaction")
+
+    projection = load_projection(collection.name)
+    if projection is not None and projection.dim != vec.params["dim"]:
+        issues.append(f"投影輸出 {projection.dim} 維，與 collection 的 {vec.params['dim']} 維不符")
+    table = load_side_table(collection.name)
+    if table is not None and live_rows is not None and len(table) != live_rows:
+        issues.append(f"side table 有 {len(table)} 筆，collection 有 {live_rows} 筆，請重新同步")
+    return issues
+
+
+def collection_health(name):
+    collection = Collection(name)
+    load_state = utility.load_state(name)
+    load_state = getattr(load_state, "name", str(load_state))
+    loaded = load_state == "Loaded"
+    vec = vector_field(collection)
+
+    report = {
+        "collection": name,
+        "aliases": utility.list_aliases(name),
+        "num_entities": collection.num_entities,
+        "partitions": [p.name for p in collection.partitions],
+        "vector_field": vec.name,
+        "dim": vec.params["dim"],
+        "load_state": load_state,
+        "indexes": index_summary(collection),
+        "search_param": get_search_param(collection),
+    }
+    if load_state == "Loading":
+        report["loading_progress"] = utility.loading_progress(name).get("loading_progress")
+    report["live_rows"] = count_rows(collection) if loaded else None
+    report["segments"] = segment_summary(collection, loaded)
+    report["memory_bytes"] = (report["segments"]["query"]["mem_size_bytes"] if loaded
+                              else estimate_memory(collection, report["num_entities"]))
+    report["memory_source"] = "query_node" if loaded else "estimate"
+    report["issues"] = find_issues(collection, report)
+    return report
+
+
+def health_report(names=None):
+    names = names or utility.list_collections()
+    return [collection_health(name) for name in names]
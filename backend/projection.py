@@ -0,0 +1,98 @@
+# 降維投影（PCA / 隨機投影）：建置時對三元組向量 fit，查詢時對問題向量套用同一個投影
+# 投影存於降維 collection 的 data/collections/<name>/projection.npz，search_text 偵測到就自動套用
+import os
+import threading
+import numpy as np
+from backend.milvus_connection import collection_artifact_dir, ARTIFACT_ROOT
+
+PROJECTION_FILE = "projection.npz"
+REDUCERS = ["pca", "random"]
+
+_projections = {}
+_lock = threading.Lock()
+
+
+class Projection:
+    def __init__(self, mean, components, method, source=""):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)  # (out_dim, in_dim)
+        self.method = method
+        self.source = source
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    def apply(self, vectors):
+        """(n, in_dim) 或 (in_dim,) → 投影後再 L2 正規化（IP 檢索等同 cosine）"""
+        reduced = (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+
+def fit_pca(vectors, dim, sample=200000, seed=42):
+    """以抽樣向量做 PCA，回傳 (Projection, 保留的變異比例)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) > sample:
+        vectors = vectors[np.sort(np.random.default_rng(seed).choice(len(vectors), size=sample, replace=False))]
+    mean = vectors.mean(axis=0)
+    _, s, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+    variance = s ** 2
+    return Projection(mean, vt[:dim], "pca"), float(variance[:dim].sum() / variance.sum())
+
+
+def fit_random_projection(vectors, dim, seed=42):
+    """正交化的高斯隨機投影，不需看資料分佈（只用來置中）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    q, _ = np.linalg.qr(np.random.default_rng(seed).normal(size=(vectors.shape[1], dim)))
+    return Projection(vectors.mean(axis=0), q.T, "random"), None
+
+
+def fit_reducer(vectors, dim, method="pca"):
+    if method == "pca":
+        return fit_pca(vectors, dim)
+    if method == "random":
+        return fit_random_projection(vectors, dim)
+    raise ValueError(f"未知的降維方式：{method}（可用：{', '.join(REDUCERS)}）")
+
+
+def reduced_collection_name(source_name, dim, method="pca"):
+    return f"{source_name}_{'pca' if method == 'pca' else 'rp'}{dim}"
+
+
+def save_projection(collection_name, projection):
+    path = os.path.join(collection_artifact_dir(collection_name), PROJECTION_FILE)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, mean=projection.mean, components=projection.components,
+             method=projection.method, source=projection.source)
+    os.replace(tmp_path, path)
+    print(f"💾 已儲存投影矩陣：{path}（{projection.components.shape[1]} → {projection.dim} 維，{projection.method}）")
+
+
+def load_projection(collection_name):
+    """取得 collection 的投影（檔案更新後自動重新載入）；一般 collection 沒有投影，回傳 None"""
+    path = os.path.join(collection_artifact_dir(collection_name), PROJECTION_FILE)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _projections.get(collection_name)
+        if cached is None or cached[0] != mtime:
+            with np.load(path) as data:
+                projection = Projection(data["mean"], data["components"], str(data["method"]), str(data["source"]))
+            cached = (mtime, projection)
+            _projections[collection_name] = cached
+        return cached[1]
+
+
+def reduced_collections(source_name):
+    """列出由 source_name 降維建立的 collection（依各 collection 資料夾內 projection.npz 記錄的來源）"""
+    if not os.path.isdir(ARTIFACT_ROOT):
+        return []
+    names = []
+    for name in sorted(os.listdir(ARTIFACT_ROOT)):
+        if not os.path.exists(os.path.join(ARTIFACT_ROOT, name, PROJECTION_FILE)):
+            continue
+        if load_projection(name).source == source_name:
+            names.append(name)
+    return names
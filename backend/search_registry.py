@@ -0,0 +1,109 @@
+# Milvus 搜尋參數 registry：每個 collection 的 metric_type 與 nprobe / ef 統一記在 data/milvus_search_registry.json
+# 由 scripts/tune_search_params.py 依 recall 目標自動調整；所有 search 呼叫都透過 get_search_param() 取得參數
+import os
+import json
+import time
+import threading
+from backend.milvus_connection import ARTIFACT_ROOT
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "milvus_search_registry.json")
+# blue/green 版本紀錄（backend/collection_versions.py 寫入）：data/collections/<alias>/versions.json
+VERSIONS_FILE = "versions.json"
+
+# 尚未調校過的 collection：依索引類型給預設值
+DEFAULT_SEARCH_PARAMS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nprobe": 10},
+    "IVF_SQ8": {"nprobe": 10},
+    "IVF_PQ": {"nprobe": 10},
+    "HNSW": {"ef": 64},
+}
+
+_registry = None
+_registry_mtime = None
+_index_info = {}
+_alias_targets = {}
+_lock = threading.Lock()
+
+
+def load_registry():
+    """讀取 registry（檔案有更新才重新載入）"""
+    global _registry, _registry_mtime
+    mtime = os.path.getmtime(REGISTRY_PATH) if os.path.exists(REGISTRY_PATH) else None
+    with _lock:
+        if _registry is None or mtime != _registry_mtime:
+            if mtime is None:
+                _registry = {}
+            else:
+                with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+                    _registry = json.load(f)
+            _registry_mtime = mtime
+        return _registry
+
+
+def save_registry_entry(collection_name, entry):
+    registry = dict(load_registry())
+    registry[collection_name] = dict(entry, updated_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
+    tmp_path = REGISTRY_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, REGISTRY_PATH)
+    print(f"💾 已更新搜尋參數 registry：{collection_name} → {registry[collection_name]['params']}")
+
+
+def resolve_collection(name):
+    """
+    alias 目前指向的實體 collection（依 versions.json，檔案有更新才重新讀取）；不是 alias 時回傳 name 本身
+    rebuild_collection_text 切換 alias 後，長駐的檢索 process 由此得知已換版本
+    """
+    path = os.path.join(ARTIFACT_ROOT, name, VERSIONS_FILE)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if mtime is None:
+        return name
+    with _lock:
+        cached = _alias_targets.get(name)
+        if cached is None or cached[0] != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = (mtime, json.load(f).get("current") or name)
+            _alias_targets[name] = cached
+        return cached[1]
+
+
+def collection_cache_key(collection):
+    """per-process 快取（索引資訊、partition 清單）的 key：(名稱, 實體 collection)，alias 切換後自動失效"""
+    return collection.name, resolve_collection(collection.name)
+
+
+def collection_index_info(collection, field_name="embedding"):
+    """讀取 collection 向量索引的 (index_type, metric_type, params)；每個 process、每個 collection 版本只查一次"""
+    key = collection_cache_key(collection) + (field_name,)
+    if key not in _index_info:
+        info = {"index_type": "FLAT", "metric_type": None, "params": {}}
+        for index in collection.indexes:
+            if index.field_name == field_name:
+                params = dict(index.params)
+                info = {
+                    "index_type": params.get("index_type", "FLAT"),
+                    "metric_type": params.get("metric_type"),
+                    "params": params.get("params", {}),
+                }
+                break
+        _index_info[key] = info
+    return _index_info[key]
+
+
+def get_search_param(collection, field_name="embedding"):
+    """
+    回傳 collection.search(param=...) 使用的參數，metric_type 一律與索引一致
+    - registry 有調校結果時使用調校值，否則依索引類型使用預設 nprobe / ef
+    - 調校後索引類型已改變（例如換了 index profile 重建）時，調校值不再適用，改回預設值
+    """
+    entry = load_registry().get(collection.name)
+    info = collection_index_info(collection, field_name)
+    if entry and entry.get("index_type", info["index_type"]) == info["index_type"]:
+        return {"metric_type": entry["metric_type"], "params": dict(entry["params"])}
+    return {
+        "metric_type": info["metric_type"] or "L2",
+        "params": dict(DEFAULT_SEARCH_PARAMS.get(info["index_type"], {}))
+    }
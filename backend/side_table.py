@@ -0,0 +1,121 @@
+# 本地 metadata side table：檢索時 Milvus 只回傳 primary key 與距離，欄位內容改由本地 memmap 檔解析
+# 減少 query node 讀取 VARCHAR 欄位與 gRPC 回傳的資料量（top_k 越大越明顯）
+# 檔案放在 data/collections/<name>/side_table/：
+#   ids.npy                 int64，已排序的 primary key
+#   <field>.offsets.npy     int64，長度 n + 1，第 i 筆字串為 blob[offsets[i]:offsets[i + 1]]
+#   <field>.blob            所有字串的 UTF-8 串接
+#   meta.json               {"rows", "version"}；version 由 primary key 集合計算，binary index 以此判斷是否過期
+import os
+import json
+import hashlib
+import shutil
+import threading
+import numpy as np
+from backend.milvus_connection import collection_artifact_dir
+from backend.columnar import write_string_column, StringColumn
+
+SIDE_TABLE_DIR = "side_table"
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def side_table_path(collection_name):
+    return os.path.join(collection_artifact_dir(collection_name), SIDE_TABLE_DIR)
+
+
+def ids_version(ids):
+    """primary key 集合的版本號：sync 新增 / 刪除任何一筆（變動的三元組會換新 id）都會改變"""
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    return hashlib.sha1(ids.tobytes()).hexdigest()[:16]
+
+
+def write_side_table(collection_name, ids, columns):
+    """
+    建置時寫出 side table（先寫到暫存資料夾再整個替換）
+    - ids: 每筆資料的 Milvus primary key
+    - columns: {欄位名稱: 與 ids 對齊的字串清單}
+    """
+    path = side_table_path(collection_name)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    np.save(os.path.join(tmp_path, "ids.npy"), ids[order])
+    for field, values in columns.items():
+        write_string_column(os.path.join(tmp_path, field), [values[i] for i in order])
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"rows": int(len(ids)), "version": ids_version(ids)}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"💾 已寫出 side table：{path}（{len(ids)} 筆，欄位 {', '.join(columns)}）")
+
+
+class SideTable:
+    def __init__(self, path):
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.columns = {
+            name[:-len(".offsets.npy")]: StringColumn(os.path.join(path, name[:-len(".offsets.npy")]))
+            for name in os.listdir(path) if name.endswith(".offsets.npy")
+        }
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.version = json.load(f)["version"]
+        else:  # 舊版 side table 沒有 meta.json
+            self.version = ids_version(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, ids, fields):
+        """回傳與 ids 對齊的 [{field: value}]；side table 沒有的 id 對應 None"""
+        if not len(self.ids):
+            return [None] * len(ids)
+        query = np.asarray(ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, query)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        found = self.ids[rows] == query
+        return [
+            {field: self.columns[field][int(row)] for field in fields} if ok else None
+            for row, ok in zip(rows, found)
+        ]
+
+
+def load_side_table(collection_name):
+    """取得 side table（檔案重寫後自動重新載入）；不存在時回傳 None"""
+    path = side_table_path(collection_name)
+    ids_path = os.path.join(path, "ids.npy")
+    if not os.path.exists(ids_path):
+        return None
+    mtime = os.path.getmtime(ids_path)
+    with _lock:
+        cached = _tables.get(collection_name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, SideTable(path))
+            _tables[collection_name] = cached
+        return cached[1]
+
+
+def resolve_fields(collection, ids, fields):
+    """
+    將 primary key 解析成欄位內容：優先查本地 side table
+    side table 尚未涵蓋的 id（例如 sync 後新寫入的資料）再向 Milvus 補查
+    回傳與 ids 對齊的清單；兩邊都找不到（已刪除）的 id 對應 None，呼叫端應略過
+    """
+    table = load_side_table(collection.name)
+    if table is not None and all(field in table.columns for field in fields):
+        rows = table.lookup(ids, fields)
+    else:
+        rows = [None] * len(ids)
+
+    missing = [pk for pk, row in zip(ids, rows) if row is None]
+    if missing:
+        fetched = {r["id"]: r for r in collection.query(expr=f"id in {list(missing)}", output_fields=list(fields))}
+        rows = [row if row is not None else
+                ({field: fetched[pk].get(field) for field in fields} if pk in fetched else None)
+                for pk, row in zip(ids, rows)]
+    return rows
@@ -0,0 +1,57 @@
+# 三元組 → 模板句子與內容 fingerprint（純 Python，不依賴 pymilvus / neo4j）
+# 全量重建、增量同步與 blue/green 重建共用同一套模板與差異計算
+import hashlib
+
+
+def triple_to_text(source_name, relation_type, target_name):
+    if relation_type == "drug_protein":
+        return f"The drug {source_name} targets the gene {target_name}."
+    elif relation_type == "indication":
+        return f"The drug {source_name} is used to treat the disease {target_name}."
+    elif relation_type == "disease_protein":
+        return f"The disease {source_name} is associated with the gene {target_name}."
+    elif relation_type == "disease_phenotype_positive":
+        return f"The disease {source_name} presents with the phenotype {target_name}."
+    elif relation_type == "disease_phenotype_negative":
+        return f"The disease {source_name} does not present with the phenotype {target_name}."
+    return f"{source_name} {relation_type} {target_name}."
+
+
+def triple_fingerprint(source_name, relation_type, target_name, text):
+    """以 (source, relation, target, 模板句子) 計算內容雜湊，模板改變也會視為變動"""
+    payload = "\x1f".join([source_name, relation_type, target_name, text])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def build_text_rows(data):
+    """去重並產生 {(s, r, t): row}，row 內含模板句子與 fingerprint"""
+    rows = {}
+    for item in data:
+        key = (item["source_name"], item["relation_type"], item["target_name"])
+        if key in rows:
+            continue
+        text = triple_to_text(*key)
+        rows[key] = {
+            "source_name": key[0],
+            "relation_type": key[1],
+            "target_name": key[2],
+            "triple_text": text,
+            "hash": triple_fingerprint(*key, text)
+        }
+    return rows
+
+
+def diff_fingerprints(current, state):
+    """
+    比對目前的三元組與已寫入的狀態，回傳 (changed, stale_ids, kept)
+    - changed  : 需要向量化並插入的 row（新增或內容變動）
+    - stale_ids: 需要從 collection 刪除的 primary key（已消失或內容變動）
+    - kept     : 未變動、可直接沿用的狀態 {(s, r, t): row}
+    """
+    changed = [row for key, row in current.items()
+               if key not in state or state[key]["hash"] != row["hash"]]
+    stale_ids = [old["id"] for key, old in state.items()
+                 if key not in current or current[key]["hash"] != old["hash"]]
+    kept = {key: old for key, old in state.items()
+            if key in current and current[key]["hash"] == old["hash"]}
+    return changed, stale_ids, kept
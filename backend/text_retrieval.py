@@ -0,0 +1,181 @@
+# collection_text 共用檢索函式：依問題意圖路由到 relation_type partition，只搜尋相關的三元組
+import os
+import re
+from backend.search_registry import get_search_param, collection_cache_key
+from backend.side_table import resolve_fields
+from backend.binary_index import load_binary_index
+from backend.projection import load_projection
+
+# milvus：Milvus ANN 檢索；binary：本地 1-bit 粗篩 + float 重排（需先執行 scripts/build_binary_index.py）
+TEXT_SEARCH_BACKEND = os.environ.get("TEXT_SEARCH_BACKEND", "milvus")
+
+# collection_text 內的關係類型（prepare_text_embeddings.py 每種關係寫入同名 partition）
+RELATION_TYPES = [
+    "drug_protein", "indication", "disease_protein", "bioprocess_protein",
+    "pathway_protein", "phenotype_protein", "drug_effect",
+    "disease_phenotype_positive", "disease_phenotype_negative",
+]
+
+# 問題意圖 → 需要的關係；由上而下比對，第一個命中的規則生效
+ROUTING_RULES = [
+    # multi-hop：「治療 X 的藥物作用於哪些基因？」
+    (("藥物作用於", "drugs treating", "drugs that treat"), ["indication", "drug_protein", "disease_protein"]),
+    (("治療", "藥物", "treat", "indication", "drug for"), ["indication", "drug_protein"]),
+    (("副作用", "side effect", "adverse"), ["drug_effect"]),
+    # 疾病 → 表現型：「X 與哪些表現型呈負相關？」須排在一般表現型規則之前
+    (("負相關", "negatively associated", "not associated"), ["disease_phenotype_negative"]),
+    (("表現型", "症狀", "phenotype", "symptom"), ["disease_phenotype_positive", "phenotype_protein"]),
+    (("通路", "pathway"), ["pathway_protein"]),
+    (("生物過程", "biological process", "bioprocess", "mechanism"), ["bioprocess_protein"]),
+    (("基因", "蛋白", "gene", "protein", "target"), ["drug_protein", "disease_protein", "bioprocess_protein",
+                                                     "pathway_protein", "phenotype_protein"]),
+]
+
+# 問題樣板中已指名的實體（data/primekg_queries*.jsonl）；命中時改在該實體的三元組內檢索
+ENTITY_PATTERNS = [
+    re.compile(r"治療\s*(.+?)\s*的藥物"),
+    re.compile(r"請列出\s*(.+?)\s*的常見"),
+    re.compile(r"^\s*(.+?)\s*(?:與哪些|會出現)"),
+]
+
+TRIPLE_FIELDS = ["source_name", "relation_type", "target_name"]
+
+_partitions = {}
+
+
+def partition_for_relation(relation_type):
+    """Milvus partition 名稱只允許英數與底線"""
+    return re.sub(r"\W", "_", relation_type)
+
+
+def ensure_partition(collection, relation_type):
+    name = partition_for_relation(relation_type)
+    if not collection.has_partition(name):
+        collection.create_partition(name)
+        _partitions.pop(collection_cache_key(collection), None)
+    return name
+
+
+def route_relations(question):
+    """依問題意圖回傳要搜尋的 relation_type 清單；無法判斷時回傳 None（搜尋全部）"""
+    text = question.lower()
+    for keywords, relations in ROUTING_RULES:
+        if any(k in text for k in keywords):
+            return relations
+    return None
+
+
+def extract_entities(question):
+    """從問題樣板擷取實體名稱，沒有命中任何樣板則回傳空清單"""
+    for pattern in ENTITY_PATTERNS:
+        match = pattern.search(question)
+        if match and match.group(1).strip():
+            return [match.group(1).strip()]
+    return []
+
+
+def quote(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def build_filter_expr(entities=None, relations=None, entity_fields=("source_name", "target_name")):
+    """
+    組合 Milvus 布林過濾條件（由 source_name / target_name / relation_type 的倒排索引加速）
+    - entities: 三元組任一端為這些實體
+    - relations: relation_type 限定為這些關係
+    """
+    clauses = []
+    if entities:
+        values = ", ".join(quote(e) for e in entities)
+        clauses.append("(" + " or ".join(f"{field} in [{values}]" for field in entity_fields) + ")")
+    if relations:
+        clauses.append(f"relation_type in [{', '.join(quote(r) for r in relations)}]")
+    return " and ".join(clauses) or None
+
+
+def existing_partitions(collection):
+    """每個 process、每個 collection 版本只列一次 partition（alias 切換後重新讀取）"""
+    key = collection_cache_key(collection)
+    if key not in _partitions:
+        _partitions[key] = {p.name for p in collection.partitions}
+    return _partitions[key]
+
+
+def search_binary(collection, query_vector, top_k=5, relations=None, output_fields=TRIPLE_FIELDS):
+    """本地二階段檢索，欄位由 side table 解析；回傳格式與 search_text 相同（已刪除、解析不到的 id 略過）"""
+    ids, scores = load_binary_index(collection.name).search(query_vector, top_k=top_k, relations=relations)
+    rows = resolve_fields(collection, ids, output_fields) if ids else []
+    return [dict(row, id=pk, score=score) for pk, score, row in zip(ids, scores, rows) if row is not None]
+
+
+def search_text(collection, query_vector, top_k=5, relations=None, entities=None, output_fields=TRIPLE_FIELDS,
+                id_only=False, backend=None):
+    """
+    在 collection_text 檢索，回傳 [{"id", "source_name", "relation_type", "target_name", "score"}]
+    - relations: 只搜尋這些 relation_type 的 partition；collection 沒有對應 partition 時改用 relation_type 過濾
+    - entities: 只在 source_name / target_name 為這些實體的三元組內做向量檢索
+    - id_only: Milvus 只回傳 primary key 與距離，欄位內容由本地 side table 解析（backend/side_table.py）
+    - backend: "milvus" 或 "binary"，預設取環境變數 TEXT_SEARCH_BACKEND；binary 不支援實體過濾，有 entities 時仍走 Milvus
+    - 降維 collection（collection_text_pca128 等）會自動把 768 維問題向量投影到同一空間
+    """
+    projection = load_projection(collection.name)
+    if projection is not None:
+        query_vector = projection.apply(query_vector).tolist()
+
+    if (backend or TEXT_SEARCH_BACKEND) == "binary" and not entities and load_binary_index(collection.name) is not None:
+        return search_binary(collection, query_vector, top_k=top_k, relations=relations, output_fields=output_fields)
+
+    partition_names = None
+    if relations:
+        available = existing_partitions(collection)
+        partition_names = [partition_for_relation(r) for r in relations if partition_for_relation(r) in available] or None
+    expr = build_filter_expr(entities, relations if relations and partition_names is None else None)
+
+    results = collection.search(
+        data=[query_vector],
+        anns_field="embedding",
+        param=get_search_param(collection),
+        limit=top_k,
+        expr=expr,
+        partition_names=partition_names,
+        output_fields=[] if id_only else output_fields
+    )
+    if id_only:
+        ids = [hit.id for hit in results[0]]
+        fields = resolve_fields(collection, ids, output_fields) if ids else []
+        return [dict(row, id=hit.id, score=hit.distance) for hit, row in zip(results[0], fields) if row is not None]
+
+    hits = []
+    for hit in results[0]:
+        row = {"id": hit.id, "score": hit.distance}
+        for field in output_fields:
+            row[field] = hit.entity.get(field)
+        hits.append(row)
+    return hits
+
+
+def search_question(collection, question, query_vector, top_k=5, id_only=True):
+    """
+    問題的標準檢索流程：依意圖路由 partition；問題已指名實體時先在該實體的三元組內檢索
+    過濾後沒有結果時逐步放寬：實體 + 關係 → 只限實體（路由判斷錯誤時仍留在該實體附近）→ 不過濾
+    """
+    relations = route_relations(question)
+    entities = extract_entities(question)
+    attempts = []
+    if entities and relations:
+        attempts.append((entities, relations))
+    if entities:
+        attempts.append((entities, None))
+    elif relations:
+        attempts.append((None, relations))
+    for attempt_entities, attempt_relations in attempts:
+        hits = search_text(collection, query_vector, top_k=top_k, relations=attempt_relations,
+                           entities=attempt_entities, id_only=id_only)
+        if hits:
+            return hits
+    return search_text(collection, query_vector, top_k=top_k, id_only=id_only)
+
+
+def format_hit(hit):
+    """與原本 search_milvus 相同的文字格式：「source relation target」"""
+    return f"{hit['source_name']} {hit['relation_type']} {hit['target_name']}"
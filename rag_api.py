@@ -10,6 +10,10 @@ from pymilvus import connections, Collection, utility
 from sentence_transformers import SentenceTransformer
 from langchain_ollama import OllamaLLM
 from backend.neo4j_connect import Neo4jConnection
+from backend.search_registry import get_search_param
+from backend.milvus_health import health_report
+from backend.text_retrieval import search_question, route_relations, extract_entities
+from attribute_pipeline.reasoner_service import get_attribute_reasoner, format_reasoning
 import os
 import numpy as np
 
@@ -27,6 +31,8 @@ COLLECTION_KGE = "collection_kge"
 EMBED_MODEL = "all-mpnet-base-v2"
 DEFAULT_LLM_MODEL = "deepseek-r1:1.5b"  
 DATA_DIR = "data"
+# /rag 是否在 context 附上屬性推論（request 可用 "attribute_reasoning": true/false 覆寫）
+ATTRIBUTE_REASONING = os.getenv("RAG_ATTRIBUTE_REASONING", "0") == "1"
 
 # ====== ✅ 全域變數：延遲載入 Embedding 與 LLM ======
 embedder = None
@@ -77,6 +83,15 @@ def startup_check():
 def index():
     return "✅ RAG API is running!"
 
+@app.route("/milvus/health", methods=["GET"])
+def milvus_health():
+    # ?collection=collection_text&collection=collection_kge；未指定時檢查 API 使用的 collection
+    names = request.args.getlist("collection") or [COLLECTION_NAME, COLLECTION_KGE]
+    try:
+        return jsonify(health_report(names))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/status", methods=["GET"])
 def status():
     return jsonify({
@@ -104,6 +119,7 @@ def rag():
         user_query = request.json.get("query")
         mode = request.json.get("mode", "同時顯示兩者")  # 預設為顯示兩者
         model_name = request.json.get("model", DEFAULT_LLM_MODEL)
+        use_reasoning = bool(request.json.get("attribute_reasoning", ATTRIBUTE_REASONING))
 
         print(f"[DEBUG] Query received: {user_query}")
         print(f"[DEBUG] Mode received: {mode}")
@@ -113,6 +129,8 @@ def rag():
             return jsonify({"error": "Query not provided"}), 400
 
         answer_rag = answer_no_rag = None
+        hits = []
+        reasoning = []
 
         # ====== 載入 LLM 模型 ======
         if model_name not in llm_cache:
@@ -143,24 +161,19 @@ def rag():
                 collection = Collection(COLLECTION_NAME)
                 collection.load()
                 print("[DEBUG] Milvus collection loaded")
-                results = collection.search(
-                    data=[query_vector],
-                    anns_field="embedding",
-                    param={"metric_type": "L2", "params": {"nprobe": 10}},
-                    limit=5,
-                    output_fields=["source_name", "relation_type", "target_name"]
-                )
-                print(f"[DEBUG] Milvus search returned {len(results[0]) if results else 0} results")
+                hits = search_question(collection, user_query, query_vector, top_k=5)
+                print(f"[DEBUG] Milvus search (partitions={route_relations(user_query) or 'all'}, "
+                      f"entities={extract_entities(user_query)}) returned {len(hits)} results")
 
                 # 建立 context
                 context = ""
                 related_entities = set()
 
-                if results and results[0]:
-                    for hit in results[0]:
-                        s = hit.entity.get("source_name")
-                        r = hit.entity.get("relation_type")
-                        t = hit.entity.get("target_name")
+                if hits:
+                    for hit in hits:
+                        s = hit["source_name"]
+                        r = hit["relation_type"]
+                        t = hit["target_name"]
                         context += f"{s} --[{r}]--> {t}\n"
                         related_entities.update([s, t])
                 else:
@@ -183,14 +196,23 @@ def rag():
                     kge_results = collection_kge.search(
                         data=matched_vecs,
                         anns_field="embedding",
-                        param={"metric_type": "L2", "params": {"nprobe": 10}},
+                        param=get_search_param(collection_kge),
                         limit=3,
                         output_fields=["entity_name"]
                     )
                     for group in kge_results:
                         for r in group:
                             context += f"KGE Suggestion Entity: {r.entity.get('entity_name')}\n"
-                            
+
+                # === Step 3: 屬性推論（選用，整批相關實體一次查表） ===
+                if use_reasoning and related_entities:
+                    reasoner = get_attribute_reasoner()
+                    if reasoner is not None:
+                        reasoning = reasoner.reason(related_entities)
+                        if reasoning:
+                            context += f"\n[Attribute reasoning]\n{format_reasoning(reasoning)}"
+                        print(f"[DEBUG] Attribute reasoning for {len(reasoning)} entities")
+
                 print(f"[DEBUG] Final context:\n{context if context else '[空白]'}")
 
                 # 建立 prompt + 回應
@@ -273,13 +295,14 @@ def rag():
             "prompt_rag": prompt_rag if "prompt_rag" in locals() else None,
             "milvus_hits": [
                 {
-                    "source": hit.entity.get("source_name"),
-                    "relation": hit.entity.get("relation_type"),
-                    "target": hit.entity.get("target_name"),
-                    "score": hit.distance
+                    "source": hit["source_name"],
+                    "relation": hit["relation_type"],
+                    "target": hit["target_name"],
+                    "score": hit["score"]
                 }
-                for hit in results[0]
-            ] if results and results[0] else [],
+                for hit in hits
+            ],
+            "attribute_reasoning": reasoning,
             "answer_rag": answer_rag,
             "answer_no_rag": answer_no_rag
         })
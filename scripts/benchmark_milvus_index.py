@@ -0,0 +1,208 @@
+# Milvus index profile benchmark：在 collection 的複本上比較不同索引的 recall / 延遲 / QPS / 記憶體
+#   python -m scripts.benchmark_milvus_index
+#   python -m scripts.benchmark_milvus_index --collections collection_text --profiles ivf_flat hnsw --k 10
+# 輸出：results/index_benchmark.json（完整報告）、data/milvus_index_profiles.json（建議 profile，供 create_collection 使用）
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pymilvus import Collection, CollectionSchema, FieldSchema, utility
+from backend.milvus_connection import (
+    connect_milvus, INDEX_PROFILES, RECOMMENDED_PROFILE_PATH, build_index_params
+)
+
+REPORT_PATH = "results/index_benchmark.json"
+BENCH_SUFFIX = "_bench_"
+
+
+# === Step 1: 讀出原 collection 全部資料 ===
+def read_collection(collection, batch_size=5000):
+    """回傳 (scalar 欄位 dict, 向量矩陣)；auto_id 主鍵不複製"""
+    schema_fields = [f for f in collection.schema.fields if not (f.is_primary and f.auto_id)]
+    vector_field = next(f.name for f in schema_fields if f.dtype.name.endswith("VECTOR"))
+    scalar_fields = [f.name for f in schema_fields if f.name != vector_field]
+
+    columns = {name: [] for name in scalar_fields}
+    vectors = []
+    iterator = collection.query_iterator(batch_size=batch_size, output_fields=scalar_fields + [vector_field])
+    while True:
+        batch = iterator.next()
+        if not batch:
+            break
+        for row in batch:
+            for name in scalar_fields:
+                columns[name].append(row[name])
+            vectors.append(row[vector_field])
+    iterator.close()
+    return columns, np.asarray(vectors, dtype=np.float32), vector_field
+
+
+def collection_metric(collection, default="IP"):
+    for index in collection.indexes:
+        if "metric_type" in index.params:
+            return index.params["metric_type"]
+    return default
+
+
+# === Step 2: 建立複本並套用 profile ===
+def build_copy(src, profile, columns, vectors, vector_field, metric_type, batch_size=5000):
+    name = f"{src.name}{BENCH_SUFFIX}{profile}"
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    fields = [FieldSchema(f.name, f.dtype, is_primary=f.is_primary, auto_id=f.auto_id, **f.params)
+              for f in src.schema.fields]
+    copy = Collection(name=name, schema=CollectionSchema(fields, description=f"benchmark copy of {src.name}"))
+
+    pks = []
+    for start in range(0, len(vectors), batch_size):
+        batch = [columns[f.name][start:start + batch_size] for f in fields
+                 if not (f.is_primary and f.auto_id) and f.name != vector_field]
+        batch.append(vectors[start:start + batch_size])
+        pks.extend(copy.insert(batch).primary_keys)
+    copy.flush()
+
+    t0 = time.perf_counter()
+    copy.create_index(field_name=vector_field, index_params=build_index_params(profile, metric_type, vectors.shape[1]))
+    utility.wait_for_index_building_complete(name)
+    build_seconds = time.perf_counter() - t0
+    copy.load()
+    return copy, np.asarray(pks), build_seconds
+
+
+# === Step 3: 以 numpy 精確搜尋當作 ground truth ===
+def exact_top_k(vectors, queries, k, metric_type, chunk=256):
+    results = []
+    for start in range(0, len(queries), chunk):
+        q = queries[start:start + chunk]
+        if metric_type == "L2":
+            scores = -((q ** 2).sum(1, keepdims=True) - 2 * q @ vectors.T + (vectors ** 2).sum(1))
+        else:  # IP / COSINE（COSINE 先正規化）
+            if metric_type == "COSINE":
+                q = q / np.linalg.norm(q, axis=1, keepdims=True)
+                scores = q @ (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).T
+            else:
+                scores = q @ vectors.T
+        top = np.argpartition(-scores, kth=min(k, scores.shape[1] - 1), axis=1)[:, :k]
+        results.extend(set(row.tolist()) for row in top)
+    return results
+
+
+def search_once(collection, vector_field, query, k, param):
+    return collection.search(data=[query.tolist()], anns_field=vector_field, param=param, limit=k)[0]
+
+
+# === Step 4: 量測 recall / latency / QPS / memory ===
+def measure_profile(copy, pks, vector_field, profile, metric_type, queries, truth, k, concurrency_levels):
+    param = {"metric_type": metric_type, "params": INDEX_PROFILES[profile]["search_params"]}
+    pk_to_row = {pk: i for i, pk in enumerate(pks.tolist())}
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = search_once(copy, vector_field, query, k, param)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found = {pk_to_row[h.id] for h in hits if h.id in pk_to_row}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+
+    qps = {}
+    for level in concurrency_levels:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(lambda q: search_once(copy, vector_field, q, k, param), queries))
+        qps[str(level)] = len(queries) / (time.perf_counter() - t0)
+
+    segments = utility.get_query_segment_info(copy.name)
+    memory_bytes = sum(getattr(s, "mem_size", 0) for s in segments)
+    return {
+        "profile": profile,
+        "index_params": build_index_params(profile, metric_type, queries.shape[1]),
+        "search_params": param,
+        f"recall@{k}": float(np.mean(recalls)),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p99": float(np.percentile(latencies, 99)),
+        "qps": qps,
+        "memory_bytes": int(memory_bytes),
+    }
+
+
+def recommend(results, k, recall_target):
+    """達到 recall 目標者中取 p99 最低（平手看記憶體）；都達不到則取 recall 最高者"""
+    key = f"recall@{k}"
+    ok = [r for r in results if r[key] >= recall_target]
+    if ok:
+        return min(ok, key=lambda r: (r["latency_ms_p99"], r["memory_bytes"]))["profile"]
+    return max(results, key=lambda r: r[key])["profile"]
+
+
+def benchmark_collection(name, profiles, k, num_queries, concurrency_levels, recall_target, keep=False):
+    src = Collection(name)
+    src.load()
+    metric_type = collection_metric(src, default="L2" if name == "collection_kge" else "IP")
+    print(f"\n📊 {name}: metric={metric_type}，讀取資料中...")
+    columns, vectors, vector_field = read_collection(src)
+    rng = np.random.default_rng(42)
+    queries = vectors[rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)]
+    truth = exact_top_k(vectors, queries, k, metric_type)
+
+    results = []
+    for profile in profiles:
+        print(f"   ▶ profile={profile} 建立複本與索引...")
+        copy, pks, build_seconds = build_copy(src, profile, columns, vectors, vector_field, metric_type)
+        result = measure_profile(copy, pks, vector_field, profile, metric_type, queries, truth, k, concurrency_levels)
+        result["build_seconds"] = build_seconds
+        results.append(result)
+        print(f"     recall@{k}={result[f'recall@{k}']:.3f}  p50={result['latency_ms_p50']:.2f}ms  "
+              f"p99={result['latency_ms_p99']:.2f}ms  qps={result['qps']}  mem={result['memory_bytes'] / 1e6:.1f}MB")
+        if not keep:
+            utility.drop_collection(copy.name)
+
+    return {
+        "collection": name,
+        "rows": len(vectors),
+        "dim": int(vectors.shape[1]),
+        "metric_type": metric_type,
+        "k": k,
+        "num_queries": len(queries),
+        "recall_target": recall_target,
+        "results": results,
+        "recommended_profile": recommend(results, k, recall_target),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較不同 Milvus index profile 的 recall / 延遲 / QPS / 記憶體")
+    parser.add_argument("--collections", nargs="+", default=["collection_text", "collection_kge"])
+    parser.add_argument("--profiles", nargs="+", default=["ivf_flat", "hnsw", "ivf_sq8", "ivf_pq"],
+                        choices=list(INDEX_PROFILES))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="從 collection 抽樣當作查詢的向量數")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    parser.add_argument("--keep", action="store_true", help="保留 benchmark 複本 collection")
+    args = parser.parse_args()
+
+    connect_milvus()
+    report = [benchmark_collection(name, args.profiles, args.k, args.queries, args.concurrency,
+                                   args.recall_target, keep=args.keep)
+              for name in args.collections]
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    recommended = {}
+    if os.path.exists(RECOMMENDED_PROFILE_PATH):
+        with open(RECOMMENDED_PROFILE_PATH, "r", encoding="utf-8") as f:
+            recommended = json.load(f)
+    recommended.update({r["collection"]: r["recommended_profile"] for r in report})
+    with open(RECOMMENDED_PROFILE_PATH, "w", encoding="utf-8") as f:
+        json.dump(recommended, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 報告已存檔：{REPORT_PATH}")
+    for r in report:
+        print(f"✅ {r['collection']} 建議 profile：{r['recommended_profile']}（create_collection(index_profile=\"recommended\")）")
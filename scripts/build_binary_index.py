@@ -0,0 +1,89 @@
+# 建立 collection_text 的本地二階段檢索索引（1-bit 粗篩 + float 重排），並回報相對精確搜尋的 recall
+#   python -m scripts.build_binary_index
+#   python -m scripts.build_binary_index --collection collection_text --k 10 --candidates 50 100 200 500
+# 向量來自 embedding 快取（prepare_text_embeddings.py 建置時已寫入），primary key 來自 fingerprint 狀態檔
+# 檢索端設定 TEXT_SEARCH_BACKEND=binary 後，Baseline / Graph / Enhanced RAG 的 search_milvus 即改用本地索引
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from backend.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.binary_index import build_binary_index, load_binary_index
+from scripts.prepare_text_embeddings import load_fingerprints, EMBED_MODEL
+
+QUERY_FILE = "data/primekg_queries_expanded.jsonl"
+REPORT_PATH = "results/binary_index_recall.json"
+
+
+def build_from_fingerprints(collection_name, model, metric_type="IP"):
+    state = load_fingerprints(collection_name)
+    if not state:
+        raise RuntimeError(f"找不到 {collection_name} 的 fingerprint 狀態檔，請先執行 prepare_text_embeddings.py")
+    rows = list(state.values())
+    vectors = encode_with_cache(model, [r["triple_text"] for r in rows], EMBED_MODEL,
+                                batch_size=64, show_progress_bar=True)
+    build_binary_index(collection_name, [r["id"] for r in rows], vectors,
+                       [r["relation_type"] for r in rows], metric_type=metric_type)
+
+
+def recall_report(collection_name, model, k, candidate_levels, sample, seed=42):
+    index = load_binary_index(collection_name)
+    with open(QUERY_FILE, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    rng = np.random.default_rng(seed)
+    questions = [questions[i] for i in rng.permutation(len(questions))[:sample]]
+    queries = encode_with_cache(model, questions, EMBED_MODEL)
+
+    t0 = time.perf_counter()
+    truth = [set(index.exact_search(q, top_k=k)[0]) for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    levels = []
+    for candidates in candidate_levels:
+        t0 = time.perf_counter()
+        found = [set(index.search(q, top_k=k, candidates=candidates)[0]) for q in queries]
+        elapsed_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        recall = float(np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)]))
+        levels.append({"candidates": candidates, f"recall@{k}": recall, "latency_ms": elapsed_ms})
+        print(f"   candidates={candidates:<5} recall@{k}={recall:.3f}  {elapsed_ms:.2f} ms/query")
+
+    return {
+        "collection": collection_name,
+        "rows": len(index),
+        "k": k,
+        "num_queries": len(queries),
+        "code_bytes": int(index.codes.nbytes),
+        "float_bytes": int(index.vectors.nbytes),
+        "exact_latency_ms": exact_ms,
+        "levels": levels,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建立 1-bit 量化 + float 重排的本地檢索索引")
+    parser.add_argument("--collection", default="collection_text")
+    parser.add_argument("--metric", default="IP", choices=["IP", "L2"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 100, 200, 500, 1000])
+    parser.add_argument("--sample", type=int, default=100, help="用來評估 recall 的查詢數")
+    parser.add_argument("--skip-build", action="store_true", help="只對既有索引評估 recall")
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBED_MODEL)
+    if not args.skip_build:
+        build_from_fingerprints(args.collection, model, metric_type=args.metric)
+
+    print(f"📊 {args.collection}: 相對精確搜尋的 recall@{args.k}")
+    report = recall_report(args.collection, model, args.k, args.candidates, args.sample)
+    print(f"   記憶體：量化碼 {report['code_bytes'] / 1e6:.1f} MB，float 向量 {report['float_bytes'] / 1e6:.1f} MB（memmap）")
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 報告已存檔：{REPORT_PATH}")
+    get_embedding_cache(EMBED_MODEL).report()
@@ -0,0 +1,90 @@
+# 比較降維 collection（collection_text_pca128 等）與原 768 維 collection 的檢索結果
+#   python -m scripts.compare_reduced_collections --reduced collection_text_pca128 collection_text_pca256
+# 以原 collection 的 top-k 三元組當作基準，計算降維版本的 recall@k、延遲與向量記憶體
+# 兩個 collection 的 primary key 不同，以 (source_name, relation_type, target_name) 比對
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import numpy as np
+from pymilvus import Collection
+from sentence_transformers import SentenceTransformer
+from backend.milvus_connection import connect_milvus
+from backend.embedding_cache import encode_with_cache
+from backend.text_retrieval import search_text
+
+QUERY_FILE = "data/primekg_queries_expanded.jsonl"
+EMBED_MODEL = "all-mpnet-base-v2"
+REPORT_PATH = "results/reduced_dim_recall.json"
+
+
+def triple_keys(collection, vectors, k):
+    keys, latencies = [], []
+    for vector in vectors:
+        t0 = time.perf_counter()
+        hits = search_text(collection, vector.tolist(), top_k=k, id_only=True)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        keys.append({(h["source_name"], h["relation_type"], h["target_name"]) for h in hits})
+    return keys, latencies
+
+
+def vector_dim(collection):
+    return next(f.params["dim"] for f in collection.schema.fields if f.name == "embedding")
+
+
+def compare(source_name, reduced_names, k, sample, seed=42):
+    with open(QUERY_FILE, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    rng = np.random.default_rng(seed)
+    questions = [questions[i] for i in rng.permutation(len(questions))[:sample]]
+    vectors = encode_with_cache(SentenceTransformer(EMBED_MODEL), questions, EMBED_MODEL)
+
+    source = Collection(source_name)
+    source.load()
+    truth, latencies = triple_keys(source, vectors, k)
+    rows = source.num_entities
+    results = [{
+        "collection": source_name,
+        "dim": vector_dim(source),
+        f"recall@{k}": 1.0,
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "vector_bytes": rows * vector_dim(source) * 4,
+    }]
+
+    for name in reduced_names:
+        collection = Collection(name)
+        collection.load()
+        found, latencies = triple_keys(collection, vectors, k)
+        recall = float(np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)]))
+        results.append({
+            "collection": name,
+            "dim": vector_dim(collection),
+            f"recall@{k}": recall,
+            "latency_ms_p50": float(np.percentile(latencies, 50)),
+            "vector_bytes": collection.num_entities * vector_dim(collection) * 4,
+        })
+
+    for r in results:
+        print(f"   {r['collection']:<28} dim={r['dim']:<4} recall@{k}={r[f'recall@{k}']:.3f}  "
+              f"p50={r['latency_ms_p50']:.2f}ms  向量 {r['vector_bytes'] / 1e6:.1f} MB")
+    return {"source": source_name, "k": k, "num_queries": len(questions), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較降維 collection 相對原 collection 的 recall / 延遲 / 記憶體")
+    parser.add_argument("--source", default="collection_text")
+    parser.add_argument("--reduced", nargs="+", default=["collection_text_pca128", "collection_text_pca256"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=100)
+    args = parser.parse_args()
+
+    connect_milvus()
+    report = compare(args.source, args.reduced, args.k, args.sample)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 報告已存檔：{REPORT_PATH}")
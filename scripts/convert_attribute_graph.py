@@ -1,33 +1,35 @@
 import os
-import pickle
+import sys
 import json
-import networkx as nx
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-def convert_graph_pkl_to_json():
+from attribute_pipeline.attribute_graph import load_attribute_graph
+
+def convert_graph_to_json():
+    """由編譯後的 attribute_graph.npz 匯出邊清單 JSON（給非 Python 的工具使用）"""
     data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-    pkl_path = os.path.join(data_dir, "attribute_graph.pkl")
+    npz_path = os.path.join(data_dir, "attribute_graph.npz")
     json_path = os.path.join(data_dir, "attribute_graph.json")
 
-    if not os.path.exists(pkl_path):
-        raise FileNotFoundError(f"找不到檔案：{pkl_path}")
+    if not os.path.exists(npz_path):
+        raise FileNotFoundError(f"找不到檔案：{npz_path}（請先執行 python -m attribute_pipeline.build_attribute_graph）")
 
-    with open(pkl_path, "rb") as f:
-        G = pickle.load(f)
+    graph = load_attribute_graph(npz_path)
 
     attr_graph = []
-    for source, target, data in G.edges(data=True):
-        relation = data.get("relation", "related_to")  # 如果有關係名稱就取，否則 fallback
+    for source, target, confidence in graph.edges():
         attr_graph.append({
             "source": source,
-            "relation": relation,
-            "target": target
+            "relation": "related_to",
+            "target": target,
+            "confidence": confidence
         })
 
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(attr_graph, f, indent=2, ensure_ascii=False)
 
-    print(f"已成功轉換：{pkl_path}")
+    print(f"已成功轉換：{npz_path}")
     print(f"輸出檔案：{json_path}")
 
 if __name__ == "__main__":
-    convert_graph_pkl_to_json()
+    convert_graph_to_json()
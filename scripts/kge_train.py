@@ -1,55 +1,118 @@
 import torch
 import numpy as np
 import hashlib
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pykeen.triples import TriplesFactory
 from pymilvus import Collection, utility
-from backend.milvus_connection import connect_milvus, create_kge_collection
+from backend.milvus_connection import connect_milvus, create_kge_collection, count_rows, wait_until_loaded
+from backend.milvus_bulk_import import bulk_import_columns, MinioStager, LocalStager
 import os
 KGE_COLLECTION = "collection_kge"
 
-# 在 colab 上執行後下載 
+# 在 colab 上執行後下載
 DATA_DIR = "data"
 EMBEDDING_FILE = os.path.join(DATA_DIR, "entity_embeddings.npy")
 ENTITY_NAME_FILE = os.path.join(DATA_DIR, "entity_names.txt")
 
+# 每批寫入的 entity 數，避免單一 gRPC 訊息超過 Milvus 上限（預設 64MB）
+INSERT_BATCH_SIZE = 5000
+
 
 # 將 entity 名稱轉為 safe 格式（避免特殊符號、過長）
 def safe_entity_id(entity_name):
     name = entity_name.replace(" ", "_").replace("(", "").replace(")", "").replace("/", "_")
     return name if len(name) <= 255 else hashlib.md5(name.encode("utf-8")).hexdigest()
 
-def load_kge_and_insert():
-    print("Loading embeddings from local files...")
+def insert_kge_batch(collection, names, vectors, upsert=False):
+    """以 column-based 格式寫入一批（names: list[str], vectors: numpy slice）"""
+    if upsert:
+        # auto_id collection 無法直接 upsert，改為先刪除同名 entity 再寫入
+        collection.delete(expr=f"entity_name in {json.dumps(names, ensure_ascii=False)}")
+    collection.insert([names, np.ascontiguousarray(vectors, dtype=np.float32)])
+    return len(names)
 
-    # 載入資料
-    embeddings = np.load(EMBEDDING_FILE)
+def load_entity_files():
+    """讀取 entity 向量（memory-map，不一次轉成 Python list）與名稱，並寫出 safe id 對照表"""
+    print("Loading embeddings from local files...")
+    embeddings = np.load(EMBEDDING_FILE, mmap_mode="r")
     with open(ENTITY_NAME_FILE, "r", encoding="utf-8") as f:
         entity_names = [line.strip() for line in f.readlines()]
     print("Embedding shape:", embeddings.shape)
     assert len(entity_names) == embeddings.shape[0], "❌ entity 數量與 embedding 不符"
 
+    safe_names = [str(safe_entity_id(name)) for name in entity_names]
 
     # 建立映射檔案（可追溯原始名稱）
     with open(os.path.join(DATA_DIR, "entity_name_map.tsv"), "w", encoding="utf-8") as f:
-        for name in entity_names:
-            f.write(f"{safe_entity_id(name)}\t{name}\n")
+        for safe_name, name in zip(safe_names, entity_names):
+            f.write(f"{safe_name}\t{name}\n")
+    return embeddings, entity_names, safe_names
+
+def load_kge_and_bulk_import(stager=None):
+    """初次建置用：直接把 entity_names / entity_embeddings 寫成 NumPy 檔交給 Milvus bulk import"""
+    embeddings, entity_names, safe_names = load_entity_files()
 
-    # 準備要插入 Milvus 的資料
-    data_to_insert = [
-        {"entity_name": str(safe_entity_id(name)), "embedding": embedding.tolist()}
-        for name, embedding in zip(entity_names, embeddings)
-    ]
-    
-    print("第一個 entity_name:", data_to_insert[0]["entity_name"])
-    print("型別:", type(data_to_insert[0]["entity_name"]))
-    
-    # 插入資料
     collection = Collection(name=KGE_COLLECTION)
     collection.load()
-    collection.insert(data_to_insert)
-    print(f"Inserted {len(data_to_insert)} entity embeddings into '{KGE_COLLECTION}'")
+    existing = count_rows(collection)
+    if existing > 0:
+        # bulk import 無法先刪除同名 entity，任何寫入前就中止，避免整批重複
+        raise RuntimeError(f"'{KGE_COLLECTION}' 已有 {existing} 筆資料，bulk import 只適合空 collection 的初次建置；"
+                           f"重新匯入請改用 --upsert（不加 --bulk）")
+    bulk_import_columns(KGE_COLLECTION, {"entity_name": safe_names, "embedding": embeddings}, stager=stager)
+
+    # 匯入的 segment 建好索引並載入後 count(*) 才會算到
+    wait_until_loaded(collection)
+    total = count_rows(collection)
+    assert total == len(entity_names), f"❌ Milvus 內有 {total} 筆，但 entity_names.txt 有 {len(entity_names)} 筆"
+    print(f"Imported {total} entity embeddings into '{KGE_COLLECTION}'")
+
+def load_kge_and_insert(batch_size=INSERT_BATCH_SIZE, workers=1, upsert=False):
+    embeddings, entity_names, safe_names = load_entity_files()
+
+    print("第一個 entity_name:", safe_names[0])
+    print("型別:", type(safe_names[0]))
+
+    collection = Collection(name=KGE_COLLECTION)
+    collection.load()
+    existing = count_rows(collection)
+    if not upsert and existing > 0:
+        raise RuntimeError(f"'{KGE_COLLECTION}' 已有 {existing} 筆資料，重新匯入請加上 --upsert 以免重複寫入")
+
+    # 分批寫入（只切 numpy slice，不建立每筆 dict）
+    batches = [
+        (safe_names[start:start + batch_size], embeddings[start:start + batch_size])
+        for start in range(0, len(safe_names), batch_size)
+    ]
+    inserted = 0
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(insert_kge_batch, collection, names, vecs, upsert) for names, vecs in batches]
+            for future in futures:
+                inserted += future.result()
+                print(f"   → 已寫入 {inserted} / {len(safe_names)}")
+    else:
+        for names, vecs in batches:
+            inserted += insert_kge_batch(collection, names, vecs, upsert)
+            print(f"   → 已寫入 {inserted} / {len(safe_names)}")
+    collection.flush()
+
+    # 驗證 Milvus 內的筆數與 entity_names.txt 一致
+    total = count_rows(collection)
+    assert total == len(entity_names), f"❌ Milvus 內有 {total} 筆，但 entity_names.txt 有 {len(entity_names)} 筆"
+    print(f"Inserted {inserted} entity embeddings into '{KGE_COLLECTION}'")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="將 KGE entity 向量分批寫入 Milvus")
+    parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="平行寫入的 thread 數")
+    parser.add_argument("--upsert", action="store_true", help="重新匯入時先刪除同名 entity 再寫入")
+    parser.add_argument("--bulk", action="store_true", help="初次建置改用 NumPy 檔 + Milvus bulk import")
+    parser.add_argument("--staging-root", default=None, help="bulk 模式下改用本地資料夾代替 MinIO")
+    args = parser.parse_args()
+
     connect_milvus()
     if not utility.has_collection(KGE_COLLECTION):
         print(f"Creating collection '{KGE_COLLECTION}'...")
@@ -57,4 +120,7 @@ if __name__ == "__main__":
     else:
         print(f"Collection '{KGE_COLLECTION}' already exists")
 
-    load_kge_and_insert()
+    if args.bulk:
+        load_kge_and_bulk_import(LocalStager(args.staging_root) if args.staging_root else MinioStager())
+    else:
+        load_kge_and_insert(batch_size=args.batch_size, workers=args.workers, upsert=args.upsert)
@@ -2,6 +2,8 @@ from backend.neo4j_connect import Neo4jConnection
 from backend.milvus_connection import (
     connect_milvus, create_collection
 )
+from backend.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.search_registry import get_search_param
 import json
 from sentence_transformers import SentenceTransformer
 from langchain_ollama import OllamaLLM
@@ -25,6 +27,7 @@ def extract_nodes():
 # === STEP 2: 建立 NLP 向量並寫入 Milvus（collection_text） ===
 def insert_text_embeddings(data, model, collection):
     vector_data = []
+    texts = []
     seen = set()
     for i, item in enumerate(data):
         path = item.get("path", [])
@@ -40,28 +43,35 @@ def insert_text_embeddings(data, model, collection):
         seen.add(key)
 
         text = f"{source_node['node_name']} {relation_type} {target_node['node_name']}"
-        embedding = model.encode(text).tolist()
+        texts.append(text)
 
         row = {
             "source_name": source_node["node_name"],
             "relation_type": relation_type,
             "target_name": target_node["node_name"],
-            "embedding": embedding
+            # collection_text 的 schema 有 triple_text（VARCHAR），insert 缺少此欄位會被 Milvus 拒絕
+            "triple_text": text
         }
         vector_data.append(row)
-    collection.insert(vector_data)
+
+    # 一次批次向量化（命中本地快取的句子不會重新計算）
+    embeddings = encode_with_cache(model, texts, "all-mpnet-base-v2")
+    for row, embedding in zip(vector_data, embeddings):
+        row["embedding"] = embedding.tolist()
+    if vector_data:
+        collection.insert(vector_data)
+    get_embedding_cache("all-mpnet-base-v2").report()
 
 # === STEP 3: 雙椛查詢（NLP + KGE）後給 LLM ===
 def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection):
     query_text = text_model.encode(query).tolist()
     query_kge = query_text  # 簡化處理
 
-    search_param = {"metric_type": "L2", "params": {"nprobe": 10}}
 
     text_results = text_collection.search(
         data=[query_text],
         anns_field="embedding",
-        param=search_param,
+        param=get_search_param(text_collection),
         limit=3,
         output_fields=["source_name", "relation_type", "target_name"]
     )
@@ -69,7 +79,7 @@ def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection)
     kge_results = kge_collection.search(
         data=[query_kge],
         anns_field="embedding",
-        param=search_param,
+        param=get_search_param(kge_collection),
         limit=3,
         output_fields=["entity_name"]
     )
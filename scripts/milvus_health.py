@@ -0,0 +1,50 @@
+# Milvus collection 健康 / 資源檢查
+#   python -m scripts.milvus_health                              → 檢查所有 collection
+#   python -m scripts.milvus_health --collection collection_text --json
+# 列出索引類型 / 參數、metric、segment 數量與大小（growing vs sealed）、載入狀態、記憶體與索引建置進度，並標示設定不一致
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+from backend.milvus_connection import connect_milvus
+from backend.milvus_health import health_report
+
+
+def print_report(report):
+    print(f"\n📦 {report['collection']}（alias：{', '.join(report['aliases']) or '無'}）")
+    live = f"（實際 {report['live_rows']}）" if report.get("live_rows") is not None else ""
+    print(f"   筆數 {report['num_entities']}{live}，{report['dim']} 維，partition {len(report['partitions'])} 個，狀態 {report['load_state']}")
+    for index in report["indexes"]:
+        progress = ""
+        if index.get("total_rows") is not None:
+            progress = f"，已建索引 {index['indexed_rows']} / {index['total_rows']}"
+        print(f"   索引 {index['field']}: {index['index_type']} {index['metric_type'] or ''} {index['params']}{progress}")
+    print(f"   搜尋參數：{report['search_param']}")
+    persistent = report["segments"]["persistent"]
+    print(f"   persistent segments：" + "，".join(f"{state} {v['count']} 個 / {v['rows']} 筆" for state, v in persistent.items()))
+    query = report["segments"]["query"]
+    if query:
+        print(f"   query segments：growing {query['growing']} 個 / {query['growing_rows']} 筆，"
+              f"sealed {query['sealed']} 個 / {query['sealed_rows']} 筆（小 segment {query['small_sealed']} 個）")
+    print(f"   記憶體（{report['memory_source']}）：{report['memory_bytes'] / 1e6:.1f} MB")
+    for issue in report["issues"]:
+        print(f"   ⚠️ {issue}")
+    if not report["issues"]:
+        print("   ✅ 沒有發現問題")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="檢查 Milvus collection 的索引、segment、載入狀態與記憶體")
+    parser.add_argument("--collection", nargs="*", default=None, help="預設檢查所有 collection")
+    parser.add_argument("--json", action="store_true", help="輸出 JSON")
+    args = parser.parse_args()
+
+    connect_milvus()
+    reports = health_report(args.collection)
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
@@ -0,0 +1,216 @@
+# Milvus collection 匯出 / 還原（snapshot），搬移機器或升級 Milvus 時不需從 Neo4j 重新向量化
+#   python -m scripts.milvus_snapshot export --collection collection_text collection_kge
+#   python -m scripts.milvus_snapshot restore --snapshot data/snapshots/collection_text_20250101_120000 --name collection_text_restored
+#   python -m scripts.milvus_snapshot restore --snapshot ... --bulk      → 改用 NumPy 檔 + do_bulk_insert 匯入
+# snapshot 格式：<dir>/manifest.json（schema、索引、partition、批次清單）＋ part_XXXXX.npz（每個欄位一個壓縮陣列）
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import numpy as np
+from pymilvus import Collection, CollectionSchema, FieldSchema, DataType, utility
+from backend.milvus_connection import connect_milvus
+from backend.milvus_bulk_import import wait_for_import, MinioStager, LocalStager, STAGING_DIR
+
+SNAPSHOT_ROOT = "data/snapshots"
+EXPORT_BATCH_SIZE = 10000
+RESTORE_BATCH_SIZE = 5000
+TEXT_FIELDS = {"source_name", "relation_type", "target_name", "triple_text"}
+
+
+def field_manifest(field):
+    return {
+        "name": field.name,
+        "dtype": field.dtype.name,
+        "is_primary": field.is_primary,
+        "auto_id": field.auto_id,
+        "params": dict(field.params),
+    }
+
+
+def to_array(values, dtype_name):
+    if dtype_name.endswith("VECTOR"):
+        return np.asarray(values, dtype=np.float32)
+    if dtype_name == "VARCHAR":
+        return np.array(values, dtype=str)
+    if dtype_name.startswith("INT"):
+        return np.asarray(values, dtype=np.int64)
+    if dtype_name in ("FLOAT", "DOUBLE"):
+        return np.asarray(values, dtype=np.float64)
+    return np.asarray(values)
+
+
+# === 匯出 ===
+def export_collection(name, out_root=SNAPSHOT_ROOT, batch_size=EXPORT_BATCH_SIZE):
+    collection = Collection(name)
+    collection.load()
+    fields = collection.schema.fields
+    field_names = [f.name for f in fields]
+    dtypes = {f.name: f.dtype.name for f in fields}
+
+    out_dir = os.path.join(out_root, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(out_dir, exist_ok=True)
+    batches = []
+    t0 = time.perf_counter()
+    for partition in collection.partitions:
+        iterator = collection.query_iterator(batch_size=batch_size, output_fields=field_names,
+                                             partition_names=[partition.name])
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            file_name = f"part_{len(batches):05d}.npz"
+            np.savez_compressed(os.path.join(out_dir, file_name),
+                                **{f: to_array([r[f] for r in rows], dtypes[f]) for f in field_names})
+            batches.append({"file": file_name, "rows": len(rows), "partition": partition.name})
+        iterator.close()
+        print(f"   {name}/{partition.name}: 累計 {sum(b['rows'] for b in batches)} 筆")
+
+    manifest = {
+        "collection": name,
+        "description": collection.schema.description,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "fields": [field_manifest(f) for f in fields],
+        "indexes": [{"field_name": index.field_name, "index_name": index.index_name, "params": dict(index.params)}
+                    for index in collection.indexes],
+        "partitions": [p.name for p in collection.partitions],
+        "num_rows": sum(b["rows"] for b in batches),
+        "batches": batches,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"✅ {name}: 匯出 {manifest['num_rows']} 筆 → {out_dir}（{time.perf_counter() - t0:.1f} 秒）")
+    return out_dir
+
+
+# === 還原 ===
+def create_from_manifest(manifest, name):
+    if utility.has_collection(name):
+        raise RuntimeError(f"{name} 已存在，請指定新的名稱或先刪除")
+    fields = [FieldSchema(f["name"], DataType[f["dtype"]], is_primary=f["is_primary"], auto_id=f["auto_id"], **f["params"])
+              for f in manifest["fields"]]
+    collection = Collection(name=name, schema=CollectionSchema(fields, description=manifest["description"]))
+    for partition in manifest["partitions"]:
+        if not collection.has_partition(partition):
+            collection.create_partition(partition)
+    return collection
+
+
+def insert_columns(collection, insert_fields, columns, partition, batch_size=RESTORE_BATCH_SIZE):
+    total = len(columns[insert_fields[0]])
+    for start in range(0, total, batch_size):
+        collection.insert([columns[f][start:start + batch_size] if columns[f].ndim == 2
+                           else columns[f][start:start + batch_size].tolist() for f in insert_fields],
+                          partition_name=partition)
+
+
+def write_partition_files(snapshot_dir, batches, insert_fields, out_dir):
+    """
+    把同一 partition 的所有批次合併成每個欄位一個 .npy（bulk import 一個 task 一組檔案）
+    以 open_memmap 逐批寫入，不需把整個 partition 讀進記憶體；VARCHAR 需固定寬度，先掃一次取最長字串
+    """
+    dtypes, tails = {}, {}
+    for batch in batches:
+        with np.load(os.path.join(snapshot_dir, batch["file"])) as data:
+            for f in insert_fields:
+                array = data[f]
+                dtypes[f] = np.result_type(dtypes.get(f, array.dtype), array.dtype)
+                tails[f] = array.shape[1:]
+
+    os.makedirs(out_dir, exist_ok=True)
+    total = sum(b["rows"] for b in batches)
+    outputs = {f: np.lib.format.open_memmap(os.path.join(out_dir, f"{f}.npy"), mode="w+",
+                                            dtype=dtypes[f], shape=(total,) + tails[f])
+               for f in insert_fields}
+    start = 0
+    for batch in batches:
+        with np.load(os.path.join(snapshot_dir, batch["file"])) as data:
+            for f in insert_fields:
+                outputs[f][start:start + batch["rows"]] = data[f]
+        start += batch["rows"]
+    for array in outputs.values():
+        array.flush()
+    return [os.path.join(out_dir, f"{f}.npy") for f in insert_fields]
+
+
+def bulk_restore(snapshot_dir, manifest, name, insert_fields, stager):
+    """每個 partition 只 stage 一次、送出一個 import task，全部送出後再一起等待"""
+    task_ids = []
+    for partition in manifest["partitions"]:
+        batches = [b for b in manifest["batches"] if b["partition"] == partition]
+        if not batches:
+            continue
+        files = write_partition_files(snapshot_dir, batches, insert_fields,
+                                      os.path.join(STAGING_DIR, name, partition))
+        keys = stager.stage(files, f"{name}/{partition}")
+        task_id = utility.do_bulk_insert(collection_name=name, files=keys, partition_name=partition)
+        task_ids.append(task_id)
+        print(f"🚚 {name}/{partition}: 已送出 bulk import task {task_id}（{sum(b['rows'] for b in batches)} 筆）")
+    return sum(wait_for_import(task_id) for task_id in task_ids)
+
+
+def restore_snapshot(snapshot_dir, name, bulk=False, stager=None):
+    with open(os.path.join(snapshot_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    collection = create_from_manifest(manifest, name)
+    # auto_id 主鍵由 Milvus 重新產生，其餘欄位原樣寫回
+    insert_fields = [f["name"] for f in manifest["fields"] if not (f["is_primary"] and f["auto_id"])]
+
+    t0 = time.perf_counter()
+    if bulk:
+        bulk_restore(snapshot_dir, manifest, name, insert_fields, stager or MinioStager())
+    else:
+        for batch in manifest["batches"]:
+            with np.load(os.path.join(snapshot_dir, batch["file"])) as data:
+                columns = {f: data[f] for f in insert_fields}
+            insert_columns(collection, insert_fields, columns, batch["partition"])
+    collection.flush()
+
+    for index in manifest["indexes"]:
+        collection.create_index(field_name=index["field_name"], index_name=index["index_name"],
+                                index_params=index["params"])
+    utility.wait_for_index_building_complete(name)
+    collection.load()
+
+    restored = collection.query(expr="", output_fields=["count(*)"])[0]["count(*)"]
+    print(f"✅ {manifest['collection']} → {name}: 還原 {restored} / {manifest['num_rows']} 筆（{time.perf_counter() - t0:.1f} 秒）")
+    if restored != manifest["num_rows"]:
+        raise RuntimeError(f"{name} 筆數不符：snapshot {manifest['num_rows']}，還原 {restored}")
+
+    # 三元組 collection 的主鍵已改變，重建 fingerprint / side table
+    if TEXT_FIELDS <= set(insert_fields):
+        from scripts.prepare_text_embeddings import bootstrap_fingerprints, save_fingerprints
+        save_fingerprints(name, bootstrap_fingerprints(collection))
+    return collection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Milvus collection 匯出 / 還原")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="以 query_iterator 匯出成壓縮 snapshot")
+    export_parser.add_argument("--collection", nargs="+", default=["collection_text", "collection_kge"])
+    export_parser.add_argument("--out", default=SNAPSHOT_ROOT)
+    export_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+
+    restore_parser = sub.add_parser("restore", help="將 snapshot 還原成新的 collection")
+    restore_parser.add_argument("--snapshot", required=True, help="snapshot 資料夾（含 manifest.json）")
+    restore_parser.add_argument("--name", default=None, help="還原後的 collection 名稱，預設與原 collection 相同")
+    restore_parser.add_argument("--bulk", action="store_true", help="改用 NumPy 檔 + bulk import 匯入")
+    restore_parser.add_argument("--staging-root", default=None, help="bulk 模式下改用本地資料夾代替 MinIO")
+    args = parser.parse_args()
+
+    connect_milvus()
+    if args.command == "export":
+        for name in args.collection:
+            export_collection(name, out_root=args.out, batch_size=args.batch_size)
+    else:
+        with open(os.path.join(args.snapshot, "manifest.json"), "r", encoding="utf-8") as f:
+            source = json.load(f)["collection"]
+        stager = None
+        if args.bulk:
+            stager = LocalStager(args.staging_root) if args.staging_root else MinioStager()
+        restore_snapshot(args.snapshot, args.name or source, bulk=args.bulk, stager=stager)
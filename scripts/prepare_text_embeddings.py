@@ -1,20 +1,45 @@
-# 建構 NLP 向量資料庫，僅在資料更新時執行 
+# 建構 NLP 向量資料庫，僅在資料更新時執行
 # 建立 collection_text (單 hop)
 # prepare_text_embeddings.py
+#   python scripts/prepare_text_embeddings.py               → 全量重建
+#   python scripts/prepare_text_embeddings.py --mode sync   → 增量同步（只處理新增 / 變動 / 消失的三元組）
+#   python scripts/prepare_text_embeddings.py --loader bulk → 全量重建時改用 Milvus 檔案式 bulk import
+#   python scripts/prepare_text_embeddings.py --reduce-dim 128 → 另外建立 PCA 降維的 collection_text_pca128
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from backend.neo4j_connect import Neo4jConnection
-from backend.milvus_connection import connect_milvus, create_collection
+from backend.milvus_connection import (
+    connect_milvus, create_collection, collection_artifact_dir, ensure_scalar_indexes, count_rows,
+    wait_until_loaded
+)
+from backend.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.milvus_bulk_import import bulk_import_columns, MinioStager, LocalStager
+from backend.text_retrieval import ensure_partition, TRIPLE_FIELDS
+from backend.side_table import write_side_table
+from backend.text_fingerprints import triple_fingerprint, build_text_rows, diff_fingerprints
+from backend.projection import (
+    fit_reducer, save_projection, load_projection, reduced_collection_name, reduced_collections, REDUCERS
+)
 from sentence_transformers import SentenceTransformer
+from pymilvus import Collection, utility
+import argparse
+from collections import defaultdict
 import json
+import time
+
+TRIPLES_PATH = "neo4j_triples.json"
+EMBED_MODEL = "all-mpnet-base-v2"
+FINGERPRINT_FILE = "fingerprints.json"
+INSERT_BATCH_SIZE = 1000
+DELETE_BATCH_SIZE = 1000
 
 # === Step 1: 從 Neo4j 查詢節點(disease,gene,drug) ===
 def extract_nodes():
     conn = Neo4jConnection()
     query = """
-        MATCH path=(n)-[r:bioprocess_protein|pathway_protein|disease_protein|drug_effect|indication|phenotype_protein|drug_protein]-(m)
+        MATCH path=(n)-[r:bioprocess_protein|pathway_protein|disease_protein|drug_effect|indication|phenotype_protein|drug_protein|disease_phenotype_positive|disease_phenotype_negative]-(m)
         RETURN n, r, m
     """
     data = conn.query(query)
@@ -44,111 +69,308 @@ def extract_nodes():
             "target_name": m["node_name"]
         })
 
-    with open("neo4j_triples.json", "w", encoding="utf-8") as f:
+    with open(TRIPLES_PATH, "w", encoding="utf-8") as f:
         json.dump(triples, f, ensure_ascii=False, indent=4)
 
     conn.close()
     print(f"✅ Saved {len(raw_results)} raw paths to neo4j_path.json")
-    print(f"✅ Saved {len(triples)} triples to neo4j_triples.json")
+    print(f"✅ Saved {len(triples)} triples to {TRIPLES_PATH}")
 
 
 # === Step 2: 將三元組轉向量並寫入 Milvus ===
 def insert_text_embeddings(data, model, collection):
-    vector_data = []
-    seen = set()
-
-    for item in data:
-        source_name = item["source_name"]
-        relation_type = item["relation_type"]
-        target_name = item["target_name"]
-
-        key = (source_name, relation_type, target_name)
-        if key in seen:
-            continue
-        seen.add(key)
-
-        # 🟢 Step 1: 建立自然語言化句子
-        if relation_type == "drug_protein":
-            text = f"The drug {source_name} targets the gene {target_name}."
-        elif relation_type == "indication":
-            text = f"The drug {source_name} is used to treat the disease {target_name}."
-        elif relation_type == "disease_protein":
-            text = f"The disease {source_name} is associated with the gene {target_name}."
-        else:
-            text = f"{source_name} {relation_type} {target_name}."
-
-        # 🟢 Step 2: 轉向量
-        embedding = model.encode(text).tolist()
-
-        # 🟢 Step 3: 存進 collection
-        row = {
-            "source_name": source_name,
-            "relation_type": relation_type,
-            "target_name": target_name,
-            "triple_text": text,
-            "embedding": embedding
-        }
-        vector_data.append(row)
+    # 去重、建立自然語言化句子、批次轉向量（命中本地快取的句子不會重新計算），依 relation_type 寫入 partition
+    vector_data = list(build_text_rows(data).values())
 
     # 插入 Milvus
     if vector_data:
-        collection.insert(vector_data)
+        embed_and_insert(vector_data, model, collection)
         collection.flush()
         print(f"✅ Inserted {len(vector_data)} text embeddings into Milvus.")
         print("當前 entities 數:", collection.num_entities)
     else:
         print("⚠️ 沒有要插入的資料！")
 
+
+def embed_and_insert(rows, model, collection, batch_size=INSERT_BATCH_SIZE, projection=None):
+    """
+    向量化 rows 並依 relation_type 分批插入對應的 partition
+    回傳與 rows 順序一致的 Milvus primary key（不 flush）
+    - projection: 降維 collection 使用的 backend.projection.Projection
+    """
+    if not rows:
+        return []
+    print(f"共 {len(rows)} 筆，開始向量化...")
+    embeddings = encode_with_cache(model, [r["triple_text"] for r in rows], EMBED_MODEL,
+                                   batch_size=64, show_progress_bar=True)
+    if projection is not None:
+        embeddings = projection.apply(embeddings)
+    embeddings = embeddings.tolist()
+
+    by_relation = defaultdict(list)
+    for i, r in enumerate(rows):
+        by_relation[r["relation_type"]].append(i)
+
+    print("開始插入 Milvus...")
+    ids = [None] * len(rows)
+    for relation_type, indices in by_relation.items():
+        partition = ensure_partition(collection, relation_type)
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start+batch_size]
+            batch = [
+                {
+                    "source_name": rows[i]["source_name"],
+                    "relation_type": rows[i]["relation_type"],
+                    "target_name": rows[i]["target_name"],
+                    "triple_text": rows[i]["triple_text"],
+                    "embedding": embeddings[i]
+                }
+                for i in chunk
+            ]
+            result = collection.insert(batch, partition_name=partition)
+            for i, pk in zip(chunk, result.primary_keys):
+                ids[i] = pk
+        print(f"   → partition {partition}: {len(indices)} 筆")
+    return ids
+
+
+def bulk_load_rows(rows, model, collection, stager=None):
+    """向量化後寫成 NumPy 檔，依 relation_type 分 partition 透過 MinIO + do_bulk_insert 匯入，略過逐批 gRPC insert"""
+    print(f"共 {len(rows)} 筆，開始向量化...")
+    embeddings = encode_with_cache(model, [r["triple_text"] for r in rows], EMBED_MODEL,
+                                   batch_size=64, show_progress_bar=True)
+
+    by_relation = defaultdict(list)
+    for i, r in enumerate(rows):
+        by_relation[r["relation_type"]].append(i)
+
+    imported = 0
+    for relation_type, indices in by_relation.items():
+        partition = ensure_partition(collection, relation_type)
+        columns = {
+            "source_name": [rows[i]["source_name"] for i in indices],
+            "relation_type": [rows[i]["relation_type"] for i in indices],
+            "target_name": [rows[i]["target_name"] for i in indices],
+            "triple_text": [rows[i]["triple_text"] for i in indices],
+            "embedding": embeddings[indices]
+        }
+        imported += bulk_import_columns(collection.name, columns, stager=stager, partition_name=partition)
+    return imported
+
+
+# === Fingerprint 狀態檔（與 collection 一起保存在 data/collections/<name>/） ===
+def fingerprint_path(collection_name):
+    return os.path.join(collection_artifact_dir(collection_name), FINGERPRINT_FILE)
+
+
+def load_fingerprints(collection_name):
+    """讀取 {(s, r, t): {"id", "hash", ...}}，沒有狀態檔時回傳 None"""
+    path = fingerprint_path(collection_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return {(r["source_name"], r["relation_type"], r["target_name"]): r for r in state["rows"]}
+
+
+def save_fingerprints(collection_name, state):
+    """原子寫入狀態檔，避免同步中斷時留下半份檔案"""
+    path = fingerprint_path(collection_name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "collection": collection_name,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "rows": list(state.values())
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"💾 已更新 fingerprint 狀態檔：{path}（{len(state)} 筆）")
+
+    # 同一份狀態重寫 ID-only 檢索用的 side table
+    rows = list(state.values())
+    write_side_table(collection_name, [r["id"] for r in rows],
+                     {field: [r[field] for r in rows] for field in TRIPLE_FIELDS})
+
+
+def bootstrap_fingerprints(collection, batch_size=5000, duplicates=None):
+    """
+    舊 collection 沒有狀態檔（或狀態檔與 collection 不一致）時，從 Milvus 讀回現有資料建立 fingerprint
+    - duplicates: 傳入 list 時，同一三元組重複寫入的多餘 id 會 append 到這裡，由呼叫端刪除
+    """
+    state = {}
+    iterator = collection.query_iterator(
+        batch_size=batch_size,
+        output_fields=["id", "source_name", "relation_type", "target_name", "triple_text"]
+    )
+    while True:
+        batch = iterator.next()
+        if not batch:
+            break
+        for r in batch:
+            key = (r["source_name"], r["relation_type"], r["target_name"])
+            if key in state:
+                if duplicates is not None:
+                    duplicates.append(r["id"])
+                continue
+            state[key] = {
+                "id": r["id"],
+                "source_name": key[0],
+                "relation_type": key[1],
+                "target_name": key[2],
+                "triple_text": r["triple_text"],
+                "hash": triple_fingerprint(*key, r["triple_text"])
+            }
+    iterator.close()
+    print(f"🔎 從 {collection.name} 讀回 {len(state)} 筆既有資料建立 fingerprint")
+    return state
+
+
+def delete_by_ids(collection, ids, batch_size=DELETE_BATCH_SIZE):
+    for i in range(0, len(ids), batch_size):
+        collection.delete(expr=f"id in {list(ids[i:i+batch_size])}")
+
+
+# === 全量重建 ===
+def build_full(data, model, collection, loader="insert", stager=None):
+    rows = list(build_text_rows(data).values())
+    if loader == "bulk":
+        # bulk import 不回傳 primary key，匯入的 segment 建好索引並載入後再從 Milvus 讀回建立 fingerprint
+        bulk_load_rows(rows, model, collection, stager=stager)
+        wait_until_loaded(collection)
+        save_fingerprints(collection.name, bootstrap_fingerprints(collection))
+    else:
+        ids = embed_and_insert(rows, model, collection)
+        collection.flush()
+
+        state = {}
+        for row, pk in zip(rows, ids):
+            row["id"] = pk
+            state[(row["source_name"], row["relation_type"], row["target_name"])] = row
+        save_fingerprints(collection.name, state)
+
+    print(f"✅ Inserted {len(rows)} text embeddings into Milvus.")
+    print("當前 entities 數:", collection.num_entities)
+
+
+# === 降維 collection：fit 投影 → 寫入 collection_text_pca{d}，查詢時由 search_text 自動套用同一投影 ===
+def build_reduced(data, model, source_name, dim, method="pca", index_profile=None):
+    rows = list(build_text_rows(data).values())
+    vectors = encode_with_cache(model, [r["triple_text"] for r in rows], EMBED_MODEL,
+                                batch_size=64, show_progress_bar=True)
+    projection, explained = fit_reducer(vectors, dim, method)
+    projection.source = source_name
+    if explained is not None:
+        print(f"📉 PCA {vectors.shape[1]} → {dim} 維，保留變異比例 {explained:.1%}")
+
+    name = reduced_collection_name(source_name, dim, method)
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    collection = create_collection(name=name, dim=dim, index_profile=index_profile)
+    ids = embed_and_insert(rows, model, collection, projection=projection)
+    collection.flush()
+    save_projection(name, projection)
+
+    state = {}
+    for row, pk in zip(rows, ids):
+        row["id"] = pk
+        state[(row["source_name"], row["relation_type"], row["target_name"])] = row
+    save_fingerprints(name, state)
+    print(f"✅ {name}: 寫入 {len(rows)} 筆 {dim} 維向量")
+    return name
+
+
+# === 增量同步：只向量化新增 / 變動的三元組，並刪除已消失的三元組 ===
+def sync_text_embeddings(data, model, collection, fresh=False, projection=None):
+    """
+    - fresh: collection 是這次才建立的（例如先 drop 再 sync），舊狀態檔一律捨棄
+    - projection: 同步降維 collection 時，新增的向量沿用建置時 fit 的投影
+    狀態檔筆數與 collection 實際筆數不一致時（手動刪改、中斷的同步），改從 Milvus 重新建立 fingerprint
+    """
+    current = build_text_rows(data)
+    state = None if fresh else load_fingerprints(collection.name)
+    stored = count_rows(collection)
+    duplicates = []
+    rebuilt = False
+    if state is None or len(state) != stored:
+        if state is not None:
+            print(f"⚠️ 狀態檔記錄 {len(state)} 筆，但 {collection.name} 實際有 {stored} 筆，改從 Milvus 重新建立 fingerprint")
+        state = bootstrap_fingerprints(collection, duplicates=duplicates) if stored > 0 else {}
+        rebuilt = True
+
+    changed, stale_ids, new_state = diff_fingerprints(current, state)
+    stale_ids += duplicates
+    print(f"🔁 增量同步：新增/變動 {len(changed)} 筆，刪除 {len(stale_ids)} 筆，未變動 {len(current) - len(changed)} 筆")
+
+    if not changed and not stale_ids:
+        if rebuilt:
+            save_fingerprints(collection.name, new_state)
+        print("✅ collection 已是最新狀態，無需同步")
+        return
+
+    # 先插入新版本再刪除舊版本，查詢端不會看到缺漏
+    ids = embed_and_insert(changed, model, collection, projection=projection)
+    delete_by_ids(collection, stale_ids)
+    collection.flush()
+
+    for row, pk in zip(changed, ids):
+        row["id"] = pk
+        new_state[(row["source_name"], row["relation_type"], row["target_name"])] = row
+    save_fingerprints(collection.name, new_state)
+    print("當前 entities 數:", collection.num_entities)
+
+
 # === Main 執行區 ===
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建構 / 同步 collection_text")
+    parser.add_argument("--mode", choices=["full", "sync"], default="full",
+                        help="full：重新建立並全量寫入；sync：依 fingerprint 只同步差異")
+    parser.add_argument("--collection", default="collection_text")
+    parser.add_argument("--loader", choices=["insert", "bulk"], default="insert",
+                        help="全量重建的寫入方式：insert（gRPC 分批）或 bulk（NumPy 檔 + bulk import）")
+    parser.add_argument("--staging-root", default=None,
+                        help="bulk 模式下改用本地資料夾代替 MinIO（Milvus 使用 local storage 時）")
+    parser.add_argument("--reduce-dim", type=int, nargs="*", default=[],
+                        help="另外建立降維的 sibling collection，例如 --reduce-dim 128 256")
+    parser.add_argument("--reducer", choices=REDUCERS, default="pca")
+    args = parser.parse_args()
+
     print("step 1 : 連線至 Neo4j 並擷取資料...")
     extract_nodes()
 
-    print("step 2 : 連線 Milvus 並建立 collection_text")
+    print(f"step 2 : 連線 Milvus 並準備 {args.collection}")
     connect_milvus()
-    collection_text = create_collection(name="collection_text", dim=768)
+    fresh = not (args.mode == "sync" and utility.has_collection(args.collection))
+    if fresh:
+        collection_text = create_collection(name=args.collection, dim=768)
+    else:
+        collection_text = Collection(args.collection)
+        ensure_scalar_indexes(collection_text)
     collection_text.load()
 
     print("step 3 : 向量化文字並寫入 Milvus")
-    with open("neo4j_triples.json", "r", encoding="utf-8") as f:
+    with open(TRIPLES_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    model = SentenceTransformer("all-mpnet-base-v2")
-
-    # 批次處理 + progress bar
-    texts = []
-    for item in data:
-        if item["relation_type"] == "drug_protein":
-            text = f"The drug {item['source_name']} targets the gene {item['target_name']}."
-        elif item["relation_type"] == "indication":
-            text = f"The drug {item['source_name']} is used to treat the disease {item['target_name']}."
-        elif item["relation_type"] == "disease_protein":
-            text = f"The disease {item['source_name']} is associated with the gene {item['target_name']}."
-        else:
-            text = f"{item['source_name']} {item['relation_type']} {item['target_name']}."
-        texts.append((item["source_name"], item["relation_type"], item["target_name"], text))
-
-    print(f"共 {len(texts)} 筆，開始向量化...")
-    embeddings = model.encode([t[3] for t in texts], batch_size=64, show_progress_bar=True).tolist()
-
-    vector_data = []
-    for (source_name, relation_type, target_name, text), emb in zip(texts, embeddings):
-        vector_data.append({
-            "source_name": source_name,
-            "relation_type": relation_type,
-            "target_name": target_name,
-            "triple_text": text,
-            "embedding": emb
-        })
-
-    # 分批插入 Milvus
-    print("開始插入 Milvus...")
-    batch_size = 1000
-    for i in range(0, len(vector_data), batch_size):
-        batch = vector_data[i:i+batch_size]
-        collection_text.insert(batch)
-    collection_text.flush()
+    model = SentenceTransformer(EMBED_MODEL)
 
-    print(f"✅ Inserted {len(vector_data)} text embeddings into Milvus.")
-    print("當前 entities 數:", collection_text.num_entities)
+    if args.mode == "sync":
+        sync_text_embeddings(data, model, collection_text, fresh=fresh)
+        # 既有的降維 collection 一併同步，否則 collection_text_pca* 仍停在上次建置時的三元組
+        rebuilt = {reduced_collection_name(args.collection, dim, args.reducer) for dim in args.reduce_dim}
+        for name in reduced_collections(args.collection):
+            if name in rebuilt or not utility.has_collection(name):
+                continue
+            print(f"step 3 : 同步降維 collection {name}（沿用既有投影，需重新 fit 請用 --reduce-dim）")
+            reduced = Collection(name)
+            reduced.load()
+            sync_text_embeddings(data, model, reduced, projection=load_projection(name))
+    else:
+        stager = None
+        if args.loader == "bulk":
+            stager = LocalStager(args.staging_root) if args.staging_root else MinioStager()
+        build_full(data, model, collection_text, loader=args.loader, stager=stager)
 
+    for dim in args.reduce_dim:
+        print(f"step 4 : 建立 {dim} 維降維 collection（{args.reducer}）")
+        build_reduced(data, model, args.collection, dim, method=args.reducer)
+    get_embedding_cache(EMBED_MODEL).report()
@@ -1,32 +1,16 @@
 # query_main.py 強化版，插入屬性推論模組
 import sys
 import os
-import csv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from backend.milvus_connection import connect_milvus
+from backend.search_registry import get_search_param
 from pymilvus import Collection
 from sentence_transformers import SentenceTransformer
 from langchain_ollama import OllamaLLM
-import json
 import numpy as np
 
-from attribute_pipeline.attribute_reasoner import infer_attributes_from_context as infer_attributes # ✅ 新增
-
-def load_entity_attributes_csv(file_path):
-    entity_attr_map = {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            entity = row["entity_id"]
-            attributes = []
-            for attr, value in row.items():
-                if attr == "entity_id":
-                    continue
-                if value == "1":
-                    attributes.append(attr)
-            entity_attr_map[entity] = attributes
-    return entity_attr_map
+from attribute_pipeline.reasoner_service import get_attribute_reasoner, format_reasoning # ✅ 新增
 
 # === ✅ 載入 sanitized → 原始名稱對應 ===
 DATA_DIR = "data"
@@ -47,12 +31,8 @@ entity_to_vec = {
     if safe_id in name_map
 }
 
-# === 載入實體屬性表格（原始 entity_attributes.csv） ===
-entity_attr_map = load_entity_attributes_csv(os.path.join(DATA_DIR, "entity_attributes.csv"))
-
-# === 載入 PAG 關聯圖 ===
-with open(os.path.join(DATA_DIR, "attribute_graph.json"), "r", encoding="utf-8") as f:
-    attribute_graph = json.load(f)
+# === 載入屬性推論（編譯後的 PAG 閉包 + 實體屬性 bitmask，只載入一次） ===
+attribute_reasoner = get_attribute_reasoner()
 
 
 def prompt_find_connections(context: str, query: str) -> str:
@@ -62,14 +42,13 @@ def prompt_find_connections(context: str, query: str) -> str:
 
 def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection):
     query_text = text_model.encode(query).tolist()
-    search_param = {"metric_type": "L2", "params": {"nprobe": 10}}
 
 
     # === Text Retrieval ===
     text_results = text_collection.search(
         data=[query_text],
         anns_field="embedding",
-        param=search_param,
+        param=get_search_param(text_collection),
         limit=3,
         output_fields=["source_name", "relation_type", "target_name"]
     )
@@ -87,18 +66,15 @@ def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection)
     kge_results = kge_collection.search(
         data=matched_vecs,
         anns_field="embedding",
-        param=search_param,
+        param=get_search_param(kge_collection),
         limit=3,
         output_fields=["entity_name"]
     )
 
-    # === 🧠 新增屬性推論部分 ===
-    # reasoning_output = ""
-    # for entity in related_entities:
-    #     if entity in entity_attr_map:
-    #         known_attrs = entity_attr_map[entity]
-    #         inferred_attrs = infer_attributes(known_attrs, attribute_graph)
-    #         reasoning_output += f"\nEntity: {entity}\nKnown: {known_attrs}\nInferred: {inferred_attrs}\n"
+    # === 🧠 新增屬性推論部分（整批相關實體一次推論） ===
+    reasoning_output = ""
+    if attribute_reasoner is not None:
+        reasoning_output = format_reasoning(attribute_reasoner.reason(related_entities))
 
     # === 拼接 context 給 LLM (Milvus + KGE) ===
     context = ""
@@ -107,7 +83,11 @@ def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection)
     for group in kge_results:
         for r in group:
             context += f"KGE Suggestion Entity: {r.entity.get('entity_name')}\n"
-    
+
+    # ✅ 插入屬性推論補充
+    if reasoning_output:
+        context += f"\n[屬性邏輯推論]\n{reasoning_output}"
+
     # === Prompt & LLM 回答 ===
     prompt = f"根據以下背景知識回答使用者問題：{context}\n問題：{query}\n請用簡明扼要的方式作答。"
     llm = OllamaLLM(model="gemma:2b")
@@ -115,9 +95,6 @@ def hybrid_retrieval_and_llm(query, text_model, kge_collection, text_collection)
 
     print("\n回答內容：\n")
     print(response)
-    
-    # ✅ 插入屬性推論補充
-    # context += f"\n[屬性邏輯推論]\n{reasoning_output}"
 
     # prompt = prompt_find_connections(context, query)
     # #llm = OllamaLLM(model="gemma:2b")
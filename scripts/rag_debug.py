@@ -5,6 +5,10 @@ from sentence_transformers import SentenceTransformer
 from langchain_ollama import OllamaLLM
 import numpy as np
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.search_registry import get_search_param
+from backend.text_retrieval import search_question, route_relations, extract_entities
 # ====== 初始化 ======
 app = Flask(__name__)
 
@@ -52,25 +56,20 @@ def debug_milvus():
 
     collection = Collection(COLLECTION_TEXT)
     collection.load()
-    results = collection.search(
-        data=[q_vec],
-        anns_field="embedding",
-        param={"metric_type": "IP", "params": {"nprobe": 64}},
-        limit=5,
-        output_fields=["source_name", "relation_type", "target_name"]
-    )
+    relations = route_relations(query)
+    results = search_question(collection, query, q_vec, top_k=5)
 
     hits = [
         {
-            "source": h.entity.get("source_name"),
-            "relation": h.entity.get("relation_type"),
-            "target": h.entity.get("target_name"),
-            "score": h.distance
+            "source": h["source_name"],
+            "relation": h["relation_type"],
+            "target": h["target_name"],
+            "score": h["score"]
         }
-        for h in results[0]
+        for h in results
     ]
 
-    return jsonify({"query": query, "milvus_hits": hits})
+    return jsonify({"query": query, "partitions": relations, "entities": extract_entities(query), "milvus_hits": hits})
 
 
 # ====== Route 2: KGE 檢索 ======
@@ -85,7 +84,7 @@ def debug_kge():
     results = collection.search(
         data=[q_vec],
         anns_field="embedding",
-        param={"metric_type": "IP", "params": {"nprobe": 64}},
+        param=get_search_param(collection),
         limit=5,
         output_fields=["source_name", "target_name"]
     )
@@ -103,7 +102,7 @@ def debug_kge():
     kge_results = collection_kge.search(
         data=matched_vecs,
         anns_field="embedding",
-        param={"metric_type": "IP", "params": {"nprobe": 64}},
+        param=get_search_param(collection_kge),
         limit=3,
         output_fields=["entity_name"]
     )
@@ -0,0 +1,99 @@
+# Blue/green 重建 collection_text：建到新版本 collection_text_v{n} → 等索引與載入完成 → 驗證 → 切換 alias → 清理舊版本
+#   python -m scripts.rebuild_collection_text                 → 重建並切換
+#   python -m scripts.rebuild_collection_text --migrate       → 第一次使用（collection_text 仍是實體 collection）
+#   python -m scripts.rebuild_collection_text --gc-only --grace-hours 0
+# rag_api.py 等讀取端繼續使用 collection_text（alias），重建期間不會看到未載入或寫到一半的 collection
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from backend.milvus_connection import connect_milvus, create_collection
+from backend.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.search_registry import get_search_param
+from backend.milvus_bulk_import import MinioStager, LocalStager
+from backend.collection_versions import (
+    next_version_name, alias_target, switch_alias, garbage_collect, DEFAULT_GRACE_HOURS
+)
+from scripts.prepare_text_embeddings import (
+    extract_nodes, build_full, build_text_rows, load_fingerprints, wait_until_loaded, count_rows,
+    TRIPLES_PATH, EMBED_MODEL
+)
+
+ALIAS = "collection_text"
+
+
+def self_recall(collection, model, sample, k, seed=42):
+    """抽樣已寫入的三元組，以其句子向量查詢，自己的 id 應出現在 top-k 內"""
+    rows = list(load_fingerprints(collection.name).values())
+    rng = np.random.default_rng(seed)
+    rows = [rows[i] for i in rng.permutation(len(rows))[:sample]]
+    vectors = encode_with_cache(model, [r["triple_text"] for r in rows], EMBED_MODEL)
+    results = collection.search(data=vectors.tolist(), anns_field="embedding",
+                                param=get_search_param(collection), limit=k)
+    found = sum(1 for row, hits in zip(rows, results) if row["id"] in {hit.id for hit in hits})
+    return found / max(len(rows), 1)
+
+
+def verify(collection, expected_rows, model, sample, k, min_recall):
+    actual = count_rows(collection)
+    if actual != expected_rows:
+        raise RuntimeError(f"{collection.name} 筆數不符：預期 {expected_rows}，實際 {actual}")
+    recall = self_recall(collection, model, sample, k)
+    print(f"🔎 {collection.name}: {actual} 筆，self-recall@{k} = {recall:.3f}")
+    if recall < min_recall:
+        raise RuntimeError(f"{collection.name} self-recall {recall:.3f} 低於門檻 {min_recall}，不切換 alias")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以 blue/green 方式重建 collection_text 並切換 alias")
+    parser.add_argument("--alias", default=ALIAS)
+    parser.add_argument("--index-profile", default=None)
+    parser.add_argument("--loader", choices=["insert", "bulk"], default="insert")
+    parser.add_argument("--staging-root", default=None)
+    parser.add_argument("--skip-extract", action="store_true", help=f"直接使用現有的 {TRIPLES_PATH}")
+    parser.add_argument("--verify-sample", type=int, default=200)
+    parser.add_argument("--verify-k", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--migrate", action="store_true",
+                        help="alias 名稱目前是實體 collection 時先刪除它（僅第一次需要，切換瞬間短暫不可用）")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_HOURS)
+    parser.add_argument("--gc-only", action="store_true", help="只清理超過保留期限的舊版本")
+    args = parser.parse_args()
+
+    connect_milvus()
+    if not args.gc_only:
+        if not args.skip_extract:
+            print("step 1 : 連線至 Neo4j 並擷取資料...")
+            extract_nodes()
+        with open(TRIPLES_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        expected_rows = len(build_text_rows(data))
+
+        name = next_version_name(args.alias)
+        print(f"step 2 : 建立新版本 {name}（目前 alias → {alias_target(args.alias) or '無'}）")
+        collection = create_collection(name=name, dim=768, index_profile=args.index_profile)
+        model = SentenceTransformer(EMBED_MODEL)
+        stager = None
+        if args.loader == "bulk":
+            stager = LocalStager(args.staging_root) if args.staging_root else MinioStager()
+        build_full(data, model, collection, loader=args.loader, stager=stager)
+
+        print("step 3 : 等待索引與載入完成並驗證")
+        wait_until_loaded(collection)
+        try:
+            verify(collection, expected_rows, model, args.verify_sample, args.verify_k, args.min_recall)
+        except RuntimeError as e:
+            print(f"❌ {e}；保留 {name} 供檢查，alias 維持不變")
+            sys.exit(1)
+
+        print(f"step 4 : 切換 alias {args.alias} → {name}")
+        previous = switch_alias(args.alias, name, drop_physical=args.migrate)
+        if previous:
+            print(f"ℹ️ 舊版本 {previous} 保留 {args.grace_hours} 小時，期間可用 utility.alter_alias 切回")
+        get_embedding_cache(EMBED_MODEL).report()
+
+    garbage_collect(args.alias, grace_hours=args.grace_hours)
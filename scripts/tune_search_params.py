@@ -0,0 +1,113 @@
+# 依 recall 目標自動調整 collection 的 nprobe / ef，結果寫入 backend/search_registry 的 registry
+#   python -m scripts.tune_search_params --collection collection_text --recall-target 0.95
+#   python -m scripts.tune_search_params --collection collection_kge --k 3
+# 文字 collection 使用 data/primekg_queries_expanded.jsonl 的真實問題；KGE collection 抽樣 entity 向量當查詢
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import numpy as np
+from pymilvus import Collection
+from backend.milvus_connection import connect_milvus
+from backend.search_registry import collection_index_info, save_registry_entry
+from backend.embedding_cache import encode_with_cache
+from backend.projection import load_projection
+
+QUERY_FILE = "data/primekg_queries_expanded.jsonl"
+KGE_EMBEDDING_FILE = "data/entity_embeddings.npy"
+EMBED_MODEL = "all-mpnet-base-v2"
+
+NPROBE_CANDIDATES = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096]
+EF_CANDIDATES = [16, 32, 64, 96, 128, 192, 256, 384, 512]
+
+
+def load_query_vectors(collection, sample, seed=42):
+    dim = next(f.params["dim"] for f in collection.schema.fields if f.name == "embedding")
+    rng = np.random.default_rng(seed)
+    projection = load_projection(collection.name)
+    if dim == 768 or projection is not None:
+        from sentence_transformers import SentenceTransformer
+        with open(QUERY_FILE, "r", encoding="utf-8") as f:
+            questions = [json.loads(line)["question"] for line in f if line.strip()]
+        questions = [questions[i] for i in rng.permutation(len(questions))[:sample]]
+        vectors = encode_with_cache(SentenceTransformer(EMBED_MODEL), questions, EMBED_MODEL)
+        return projection.apply(vectors) if projection is not None else vectors
+    embeddings = np.load(KGE_EMBEDDING_FILE, mmap_mode="r")
+    rows = np.sort(rng.choice(embeddings.shape[0], size=min(sample, embeddings.shape[0]), replace=False))
+    return np.asarray(embeddings[rows], dtype=np.float32)
+
+
+def search_ids(collection, vectors, k, param):
+    results = collection.search(data=vectors.tolist(), anns_field="embedding", param=param, limit=k)
+    return [[hit.id for hit in hits] for hits in results]
+
+
+def recall_at_k(found, truth):
+    scores = [len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)]
+    return float(np.mean(scores))
+
+
+def candidate_params(info, k):
+    """回傳 (參數名稱, 候選值由小到大, 作為 ground truth 的最大值)"""
+    index_type = info["index_type"]
+    if index_type.startswith("IVF"):
+        nlist = int(info["params"].get("nlist", 1024))
+        return "nprobe", [n for n in NPROBE_CANDIDATES if n < nlist] + [nlist], nlist
+    if index_type == "HNSW":
+        candidates = sorted({max(ef, k) for ef in EF_CANDIDATES})
+        return "ef", candidates, max(candidates[-1], 4 * k)
+    return None, [], None
+
+
+def tune_collection(collection, recall_target, k, sample):
+    info = collection_index_info(collection)
+    metric_type = info["metric_type"] or "L2"
+    param_name, candidates, exhaustive = candidate_params(info, k)
+    if param_name is None:
+        print(f"ℹ️ {collection.name} 使用 {info['index_type']}，為精確搜尋，不需調整")
+        save_registry_entry(collection.name, {"metric_type": metric_type, "index_type": info["index_type"],
+                                              "params": {}, "recall": 1.0, "recall_target": recall_target, "k": k})
+        return
+
+    vectors = load_query_vectors(collection, sample)
+    truth = search_ids(collection, vectors, k, {"metric_type": metric_type, "params": {param_name: exhaustive}})
+    print(f"🎯 {collection.name}: {info['index_type']} / {metric_type}，{len(vectors)} 筆查詢，目標 recall@{k} ≥ {recall_target}")
+
+    chosen, chosen_recall = candidates[-1], 1.0
+    for value in candidates:
+        param = {"metric_type": metric_type, "params": {param_name: value}}
+        t0 = time.perf_counter()
+        recall = recall_at_k(search_ids(collection, vectors, k, param), truth)
+        elapsed_ms = (time.perf_counter() - t0) * 1000 / len(vectors)
+        print(f"   {param_name}={value:<5} recall@{k}={recall:.3f}  {elapsed_ms:.2f} ms/query")
+        if recall >= recall_target:
+            chosen, chosen_recall = value, recall
+            break
+
+    save_registry_entry(collection.name, {
+        "metric_type": metric_type,
+        "index_type": info["index_type"],
+        "params": {param_name: chosen},
+        "recall": chosen_recall,
+        "recall_target": recall_target,
+        "k": k,
+        "num_queries": len(vectors),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="依 recall 目標挑選最小的 nprobe / ef")
+    parser.add_argument("--collection", nargs="+", default=["collection_text", "collection_kge"])
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=100, help="用來調校的查詢數")
+    args = parser.parse_args()
+
+    connect_milvus()
+    for name in args.collection:
+        collection = Collection(name)
+        collection.load()
+        tune_collection(collection, args.recall_target, args.k, args.sample)
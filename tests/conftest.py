@@ -0,0 +1,58 @@
+# 讓測試可以直接 import backend / attribute_pipeline，以及 Enhanced_RAG 底下以 apriori.* 匯入的模組
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (ROOT, os.path.join(ROOT, "Enhanced_RAG")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+ATTRIBUTES = ["a", "b", "c", "d", "e", "f", "g", "h", "z"]
+IMPLICATIONS = [("a", "b", 0.9), ("b", "c", 0.85), ("c", "d", 0.8), ("d", "b", 0.8), ("e", "f", 0.95),
+                ("f", "g", 0.9), ("a", "e", 0.82), ("h", "a", 0.88)]
+
+
+@pytest.fixture
+def attribute_data(tmp_path, monkeypatch):
+    """
+    小型屬性圖與實體屬性表：有環（b → c → d → b）、有不在圖上的屬性（z），
+    只取 2 個 root（a、b），h 不在任何 cluster 內，h → a 的推論會被 cluster 限制擋下
+    回傳各檔案路徑，並把 attribute_reasoner 的路徑常數指過去
+    """
+    import networkx as nx
+    from attribute_pipeline import attribute_reasoner
+    from attribute_pipeline.attribute_graph import compile_attribute_graph, load_attribute_graph
+
+    paths = {
+        "gml": str(tmp_path / "attribute_graph.gml"),
+        "npz": str(tmp_path / "attribute_graph.npz"),
+        "entity": str(tmp_path / "entity_attributes.csv"),
+        "clusters": str(tmp_path / "attribute_clusters.json"),
+        "output": str(tmp_path / "entity_attributes_inferred.csv"),
+    }
+    antecedents, consequents, confidences = zip(*IMPLICATIONS)
+    compile_attribute_graph(antecedents, consequents, confidences, path=paths["npz"], k=2)
+    G = nx.DiGraph()
+    for a, b, c in IMPLICATIONS:
+        G.add_edge(a, b, weight=c)
+    nx.write_gml(G, paths["gml"])
+    with open(paths["clusters"], "w", encoding="utf-8") as f:
+        json.dump(load_attribute_graph(paths["npz"]).clusters(), f)
+
+    rng = np.random.default_rng(0)
+    X = (rng.random((40, len(ATTRIBUTES))) < 0.2).astype(int)
+    df = pd.DataFrame(X, columns=ATTRIBUTES)
+    df.insert(0, "entity_id", [f"entity_{i}" for i in range(len(X))])
+    df.to_csv(paths["entity"], index=False)
+
+    monkeypatch.setattr(attribute_reasoner, "ATTR_GRAPH_PATH", paths["gml"])
+    monkeypatch.setattr(attribute_reasoner, "COMPILED_GRAPH_PATH", paths["npz"])
+    monkeypatch.setattr(attribute_reasoner, "ENTITY_ATTR_PATH", paths["entity"])
+    monkeypatch.setattr(attribute_reasoner, "CLUSTER_PATH", paths["clusters"])
+    monkeypatch.setattr(attribute_reasoner, "OUTPUT_PATH", paths["output"])
+    return paths
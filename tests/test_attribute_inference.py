@@ -0,0 +1,29 @@
+# 向量化屬性推論（infer_matrix）必須與原本逐 entity 走訪圖的 loop 模式寫出相同的 CSV
+import numpy as np
+import pandas as pd
+from attribute_pipeline import attribute_reasoner
+from attribute_pipeline.attribute_reasoner import cluster_mask, infer_matrix
+
+
+def read_output(path):
+    return pd.read_csv(path, dtype={"entity_id": str}).set_index("entity_id").sort_index()
+
+
+def test_vectorized_matches_loop(attribute_data):
+    attribute_reasoner.infer_attributes()
+    loop = read_output(attribute_data["output"])
+    attribute_reasoner.infer_attributes_vectorized()
+    vectorized = read_output(attribute_data["output"])
+
+    pd.testing.assert_frame_equal(vectorized, loop[vectorized.columns], check_dtype=False)
+    known = read_output(attribute_data["entity"]).to_numpy()
+    assert (vectorized.to_numpy() >= known).all()
+    assert vectorized.to_numpy().sum() > known.sum()  # 確實有推論出新屬性
+
+
+def test_infer_matrix_respects_clusters():
+    attrs = ["a", "b", "c"]
+    R = np.array([[0, 1, 1], [0, 0, 1], [0, 0, 0]], dtype=bool)
+    K = cluster_mask({"a": ["a", "b"]}, attrs)
+    X = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=bool)
+    np.testing.assert_array_equal(infer_matrix(X, R, K), [[1, 1, 0], [0, 1, 0], [0, 0, 1]])
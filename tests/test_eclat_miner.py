@@ -0,0 +1,58 @@
+# Eclat 規則必須與窮舉結果、以及原本的 mlxtend（apriori + association_rules）完全一致
+from itertools import combinations
+import numpy as np
+import pandas as pd
+import pytest
+from apriori.eclat_miner import mine_rules
+from apriori.benchmark_miners import mlxtend_rules, rule_keys
+
+
+def random_transactions(seed=0, n=60, items=8, p=0.5):
+    rng = np.random.default_rng(seed)
+    names = [f"item{i}" for i in range(items)]
+    return [[name for name in names if rng.random() < p] for _ in range(n)]
+
+
+def brute_force_rules(transactions, min_support, min_confidence, max_len=None):
+    sets = [set(t) for t in transactions]
+    items = sorted({i for t in sets for i in t})
+    count = lambda itemset: sum(1 for t in sets if itemset <= t)
+    rules = set()
+    for size in range(2, (max_len or len(items)) + 1):
+        for itemset in map(frozenset, combinations(items, size)):
+            support = count(itemset)
+            if support / len(sets) < min_support:
+                continue
+            for k in range(1, size):
+                for consequent in map(frozenset, combinations(sorted(itemset), k)):
+                    confidence = support / count(itemset - consequent)
+                    if confidence >= min_confidence:
+                        rules.add((itemset - consequent, consequent, round(confidence, 6)))
+    return rules
+
+
+@pytest.mark.parametrize("seed,min_support,min_confidence,max_len", [
+    (0, 0.1, 0.5, None), (1, 0.05, 0.7, 3), (2, 0.2, 0.3, 2),
+])
+def test_matches_brute_force(seed, min_support, min_confidence, max_len):
+    transactions = random_transactions(seed)
+    rules = mine_rules(transactions, min_support=min_support, min_confidence=min_confidence, max_len=max_len)
+    assert rule_keys(rules) == brute_force_rules(transactions, min_support, min_confidence, max_len)
+
+
+def test_onehot_input_matches_transactions():
+    transactions = random_transactions(3)
+    names = sorted({i for t in transactions for i in t})
+    onehot = pd.DataFrame([[int(n in t) for n in names] for t in transactions], columns=names)
+    assert rule_keys(mine_rules(onehot=onehot, min_support=0.1, min_confidence=0.5)) == \
+        rule_keys(mine_rules(transactions, min_support=0.1, min_confidence=0.5))
+
+
+@pytest.mark.parametrize("seed,min_support,min_confidence", [(0, 0.1, 0.5), (4, 0.05, 0.8)])
+def test_matches_mlxtend(seed, min_support, min_confidence):
+    pytest.importorskip("mlxtend")
+    transactions = random_transactions(seed)
+    rules = mine_rules(transactions, min_support=min_support, min_confidence=min_confidence)
+    reference = mlxtend_rules(transactions, min_support=min_support, min_confidence=min_confidence)
+    assert rule_keys(rules) == rule_keys(reference)
+    assert len(rules) == len(reference)
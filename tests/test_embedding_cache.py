@@ -0,0 +1,64 @@
+# 本地向量快取：重新映射、中斷寫入後的修復（backend/embedding_cache.py）
+import os
+import numpy as np
+from backend.embedding_cache import EmbeddingCache
+
+DIM = 4
+
+
+def fake_encode(texts, batch_size=64, show_progress_bar=False):
+    """每個句子固定對應一個向量，方便比對快取讀回的結果"""
+    return np.array([[len(t), sum(map(ord, t)) % 97, i, 1.0] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def expected(cache, texts):
+    return np.asarray(cache._vectors(max(cache.index[cache.key(t)] for t in texts))
+                      [[cache.index[cache.key(t)] for t in texts]], dtype=np.float32)
+
+
+def test_hits_after_reopen(tmp_path):
+    cache = EmbeddingCache("model", cache_root=str(tmp_path))
+    first = cache.get_or_compute(["a", "bb", "a"], fake_encode)
+    assert len(cache.index) == 2
+    np.testing.assert_array_equal(first[0], first[2])
+
+    reopened = EmbeddingCache("model", cache_root=str(tmp_path))
+    again = reopened.get_or_compute(["bb", "a"], lambda *a, **k: (_ for _ in ()).throw(AssertionError("不應重新計算")))
+    np.testing.assert_array_equal(again, first[[1, 0]])
+
+
+def test_remap_after_append_from_other_instance(tmp_path):
+    cache = EmbeddingCache("model", cache_root=str(tmp_path))
+    cache.get_or_compute(["a"], fake_encode)
+    # 另一個實例（模擬其他 process）append 後，原本的 mmap 已不夠大
+    other = EmbeddingCache("model", cache_root=str(tmp_path))
+    other.get_or_compute(["b", "c"], fake_encode)
+    out = cache.get_or_compute(["a", "d"], fake_encode)
+    assert out.shape == (2, DIM)
+    assert cache.index[cache.key("d")] == 3  # 補讀 index 後接在其他實例的資料之後
+    np.testing.assert_array_equal(out, expected(cache, ["a", "d"]))
+
+
+def test_recovers_orphan_rows_and_dangling_index(tmp_path):
+    cache = EmbeddingCache("model", cache_root=str(tmp_path))
+    base = cache.get_or_compute(["a", "b"], fake_encode)
+    row_bytes = DIM * 4
+
+    # 中斷的 append：向量寫了 1.5 列但 index 沒寫；另有一行 index 指向不存在的列
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\x00" * (row_bytes + row_bytes // 2))
+    with open(cache.index_path, "a", encoding="utf-8") as f:
+        f.write(f"{cache.key('ghost')}\t7\n{cache.key('half')}\t")
+
+    recovered = EmbeddingCache("model", cache_root=str(tmp_path))
+    assert os.path.getsize(recovered.vectors_path) == 2 * row_bytes
+    assert set(recovered.index) == {recovered.key("a"), recovered.key("b")}
+
+    out = recovered.get_or_compute(["a", "b", "c"], fake_encode)
+    np.testing.assert_array_equal(out[:2], base)
+    assert recovered.index[recovered.key("c")] == 2
+
+    # 再開一次，修復後的 index 與向量仍然對齊
+    reopened = EmbeddingCache("model", cache_root=str(tmp_path))
+    assert reopened.index == recovered.index
+    np.testing.assert_array_equal(reopened.get_or_compute(["c"], fake_encode), out[2:])
@@ -0,0 +1,80 @@
+# forward chaining 必須與逐規則、逐輪的純 Python 實作一致（Enhanced_RAG/apriori/forward_chaining.py）
+import csv
+import numpy as np
+import pytest
+from apriori.rule_index import load_rule_index
+from apriori.forward_chaining import ForwardChainer
+
+
+def write_rules(path, rules):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["antecedents", "consequents", "support", "confidence"])
+        for antecedents, consequents, confidence in rules:
+            writer.writerow([repr(list(antecedents)), repr(list(consequents)), 0.1, confidence])
+    return str(path)
+
+
+def reference_closure(rules, observed, max_depth, min_conf):
+    """每一輪：所有 antecedent 都已知的規則一起觸發，推論值 = 規則 confidence × antecedent 最弱項目，取最高者"""
+    conf = {item: 1.0 for item in observed}
+    depth = {item: 0 for item in observed}
+    for step in range(1, max_depth + 1):
+        best = {}
+        for antecedents, consequents, confidence in rules:
+            if not all(a in conf for a in antecedents):
+                continue
+            value = confidence * min(conf[a] for a in antecedents)
+            if value < min_conf:
+                continue
+            for c in consequents:
+                best[c] = max(best.get(c, 0.0), value)
+        better = {c: v for c, v in best.items() if v > conf.get(c, 0.0) + 1e-12}
+        if not better:
+            break
+        for c, v in better.items():
+            conf[c] = v
+            depth[c] = step
+    return {item: (conf[item], depth[item]) for item in conf if depth[item] > 0}
+
+
+def random_rules(seed, items=12, count=40):
+    rng = np.random.default_rng(seed)
+    names = [f"item{i}" for i in range(items)]
+    rules = []
+    for _ in range(count):
+        chosen = rng.choice(items, size=int(rng.integers(2, 4)), replace=False)
+        split = int(rng.integers(1, len(chosen)))
+        rules.append(([names[i] for i in chosen[:split]], [names[i] for i in chosen[split:]],
+                      round(float(rng.uniform(0.5, 1.0)), 3)))
+    return rules, names
+
+
+def test_chain_and_confidence(tmp_path):
+    rules = [(["Abdominal pain"], ["Nausea"], 0.9), (["Nausea"], ["Vomiting"], 0.8),
+             (["Nausea", "Fever"], ["Dehydration"], 0.95)]
+    chainer = ForwardChainer(load_rule_index(write_rules(tmp_path / "rules.csv", rules)))
+    result = {r["item"]: r for r in chainer.closure(["Abdominal pain"], max_depth=3, min_conf=0.5)}
+
+    assert set(result) == {"Nausea", "Vomiting"}
+    assert result["Vomiting"]["chain"] == ["Abdominal pain", "Nausea", "Vomiting"]
+    assert result["Vomiting"]["confidence"] == pytest.approx(0.9 * 0.8, rel=1e-6)
+    assert result["Vomiting"]["depth"] == 2
+    assert chainer.closure(["Abdominal pain"], max_depth=1, min_conf=0.5)[0]["item"] == "Nausea"
+    assert chainer.closure(["Unknown"]) == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_depth,min_conf", [(1, 0.5), (3, 0.4), (6, 0.2)])
+def test_matches_reference(tmp_path, seed, max_depth, min_conf):
+    rules, names = random_rules(seed)
+    chainer = ForwardChainer(load_rule_index(write_rules(tmp_path / f"rules_{seed}.csv", rules)))
+    observed = names[:2]
+    got = {r["item"]: (r["confidence"], r["depth"])
+           for r in chainer.closure(observed, max_depth=max_depth, min_conf=min_conf)}
+    expected = reference_closure(rules, observed, max_depth, min_conf)
+
+    assert set(got) == set(expected)
+    for item, (confidence, depth) in expected.items():
+        assert got[item][0] == pytest.approx(confidence, rel=1e-5)
+        assert got[item][1] == depth
@@ -0,0 +1,39 @@
+# 線上屬性推論的查表結果必須與批次推論（infer_attributes_vectorized）寫出的 CSV 一致
+import pandas as pd
+from attribute_pipeline import attribute_reasoner, reasoner_service
+from attribute_pipeline.reasoner_service import AttributeReasoner
+
+
+def test_lookup_table_matches_batch_csv(attribute_data):
+    attribute_reasoner.infer_attributes_vectorized()
+    batch = pd.read_csv(attribute_data["output"], dtype={"entity_id": str}).set_index("entity_id")
+
+    reasoner = AttributeReasoner(attribute_data["entity"], attribute_data["npz"], attribute_data["clusters"])
+    results = reasoner.reason(list(batch.index))
+    assert [r["entity"] for r in results] == list(batch.index)
+    for r in results:
+        expected = {attr for attr, value in batch.loc[r["entity"]].items() if value == 1}
+        assert set(r["known"]) | set(r["inferred"]) == expected
+        assert not set(r["known"]) & set(r["inferred"])
+
+
+def test_inference_stays_inside_root_clusters(attribute_data):
+    reasoner = AttributeReasoner(attribute_data["entity"], attribute_data["npz"], attribute_data["clusters"])
+    # h 不在任何 root cluster 內：全閉包會推論出 a 的所有後代，與批次推論一致時則不推論
+    assert reasoner.graph.descendants("h")
+    mask = 1 << reasoner.columns.index("h")
+    assert reasoner.matrix.attributes_of_mask(int(reasoner.inferred_table[mask])) == []
+    mask = 1 << reasoner.columns.index("a")
+    assert set(reasoner.matrix.attributes_of_mask(int(reasoner.inferred_table[mask]))) == {"b", "c", "d", "e", "f", "g"}
+
+
+def test_missing_graph_is_cached(attribute_data, monkeypatch, capsys):
+    missing = attribute_data["npz"] + ".missing"
+    monkeypatch.setattr(reasoner_service, "GRAPH_PATH", missing)
+    monkeypatch.setattr(reasoner_service, "ENTITY_ATTR_PATH", attribute_data["entity"])
+    monkeypatch.setattr(reasoner_service, "_reasoner", None)
+    assert reasoner_service.get_attribute_reasoner() is None
+    assert reasoner_service.get_attribute_reasoner() is None
+    # 檔案沒有變動時不重新檢查，也不重複印出警告
+    assert capsys.readouterr().out.count("找不到") == 1
+
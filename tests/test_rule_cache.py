@@ -0,0 +1,52 @@
+# 動態規則快取：不同三元組檔互不清除，同一個檔案更新後只清掉自己的舊版本（Enhanced_RAG/apriori/rule_cache.py）
+import os
+import pandas as pd
+import pytest
+from apriori import rule_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(rule_cache, "CACHE_DIR", str(tmp_path / "rule_cache"))
+    monkeypatch.setattr(rule_cache, "_memory", type(rule_cache._memory)())
+    mined = []
+
+    def fake_mine(triple_path, relation_filter, entity_keyword=None, min_support=0.01, min_conf=0.8):
+        mined.append(triple_path)
+        return pd.DataFrame([{"antecedents": "A", "consequents": "B", "support": 0.5, "confidence": 0.9}])
+
+    monkeypatch.setattr(rule_cache, "mine_rules_from_json", fake_mine)
+    return mined
+
+
+def write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def test_other_triple_files_keep_their_cache(tmp_path, cache):
+    a = write(tmp_path / "a.json", "[]", 10**18)
+    b = write(tmp_path / "b.json", "[]", 10**18)
+    assert rule_cache.cached_mine_rules(a, "indication")[1] == "mined"
+    assert rule_cache.cached_mine_rules(b, "indication")[1] == "mined"
+
+    rule_cache._memory.clear()
+    assert rule_cache.cached_mine_rules(a, "indication")[1] == "disk"
+    assert rule_cache.cached_mine_rules(b, "indication")[1] == "disk"
+
+
+def test_updated_file_evicts_only_its_old_version(tmp_path, cache):
+    a = write(tmp_path / "a.json", "[]", 10**18)
+    b = write(tmp_path / "b.json", "[]", 10**18)
+    rule_cache.cached_mine_rules(a, "indication")
+    rule_cache.cached_mine_rules(b, "indication")
+    old_version = os.path.join(rule_cache.source_dir(a), rule_cache.triple_fingerprint(a))
+
+    write(tmp_path / "a.json", "[ ]", 2 * 10**18)
+    assert rule_cache.cached_mine_rules(a, "indication")[1] == "mined"
+    assert not os.path.exists(old_version)
+    assert os.listdir(rule_cache.source_dir(a)) == [rule_cache.triple_fingerprint(a)]
+
+    rule_cache._memory.clear()
+    assert rule_cache.cached_mine_rules(b, "indication")[1] == "disk"
@@ -0,0 +1,46 @@
+# 增量同步的 fingerprint 差異計算（backend/text_fingerprints.py）
+from backend.text_fingerprints import build_text_rows, diff_fingerprints, triple_to_text
+
+
+def triple(s, r, t):
+    return {"source_name": s, "relation_type": r, "target_name": t}
+
+
+def stored_state(data, start_id=1):
+    state = build_text_rows(data)
+    for pk, row in enumerate(state.values(), start=start_id):
+        row["id"] = pk
+    return state
+
+
+def test_build_text_rows_dedups_and_uses_template():
+    rows = build_text_rows([triple("aspirin", "indication", "pain"), triple("aspirin", "indication", "pain")])
+    assert list(rows) == [("aspirin", "indication", "pain")]
+    assert rows[("aspirin", "indication", "pain")]["triple_text"] == triple_to_text("aspirin", "indication", "pain")
+
+
+def test_diff_unchanged_state_is_noop():
+    data = [triple("aspirin", "indication", "pain"), triple("TP53", "disease_protein", "cancer")]
+    changed, stale_ids, kept = diff_fingerprints(build_text_rows(data), stored_state(data))
+    assert changed == [] and stale_ids == []
+    assert set(kept) == {("aspirin", "indication", "pain"), ("TP53", "disease_protein", "cancer")}
+
+
+def test_diff_added_removed_and_changed():
+    old = [triple("aspirin", "indication", "pain"), triple("TP53", "disease_protein", "cancer")]
+    state = stored_state(old)
+    state[("TP53", "disease_protein", "cancer")]["hash"] = "outdated-template"
+    new = [triple("TP53", "disease_protein", "cancer"), triple("imatinib", "drug_protein", "ABL1")]
+
+    changed, stale_ids, kept = diff_fingerprints(build_text_rows(new), state)
+
+    assert {(r["source_name"], r["relation_type"], r["target_name"]) for r in changed} == {
+        ("TP53", "disease_protein", "cancer"), ("imatinib", "drug_protein", "ABL1")}
+    assert sorted(stale_ids) == [1, 2]
+    assert kept == {}
+
+
+def test_diff_empty_state_inserts_everything():
+    data = [triple("aspirin", "indication", "pain")]
+    changed, stale_ids, kept = diff_fingerprints(build_text_rows(data), {})
+    assert len(changed) == 1 and stale_ids == [] and kept == {}